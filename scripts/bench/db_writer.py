@@ -0,0 +1,157 @@
+"""
+Benchmark: mixed concurrent writes against one SQLite file, each thread
+committing its own session (as before) vs every write going through the
+DatabaseWriter queue (group commit, one writer connection).
+
+Load, per run:
+  trade threads     - one TradeLog insert per write (TradeExecutor._log_trade)
+  manual threads    - read a ManualAsset, change it, refresh today's snapshot row
+  snapshot thread   - bulk ingest of --holdings rows every --snapshot-interval s (snapshot_assets)
+Every write is waited on (durable) in both modes.
+
+Usage (from project root):
+    python scripts/bench/db_writer.py --seconds 5 --trade-threads 8 --manual-threads 4
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.database.engine import Base, make_engine
+from src.database.migrations import migrate
+from src.database.models import AssetType, ManualAsset, TradeLog
+from src.database.utils import ingest_snapshots, refresh_manual_asset_snapshot
+from src.database.writer import DatabaseWriter
+
+MANUAL_ASSETS = 20
+
+
+def holdings(count):
+    return [
+        dict(symbol=f"{100000 + i:06d}", name=f"Instrument {i}", asset_type=AssetType.STOCK_DOMESTIC,
+             currency="KRW", brokerage="Korea Investment", exchange="KRX",
+             quantity=10.0, close_price=1000.0 + random.random(), avg_buy_price=1000.0,
+             exchange_rate=1.0, value_krw=10000.0 + random.random(), profit_loss_krw=0.0)
+        for i in range(count)
+    ]
+
+
+def log_trade(db, n):
+    db.add(TradeLog(timestamp=datetime.datetime.utcnow(), asset_type=AssetType.STOCK_DOMESTIC,
+                    symbol=f"{n:06d}", side="BUY", quantity=1.0, price=1000.0, result_msg="bench"))
+
+
+def update_manual(db, asset_id):
+    asset = db.get(ManualAsset, asset_id)
+    asset.current_price = 100.0 + random.random()
+    refresh_manual_asset_snapshot(db, asset)
+
+
+def snapshot(db, rows):
+    ingest_snapshots(db, datetime.date.today(), datetime.datetime.now(), rows)
+
+
+def setup(path, size):
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    db = sessionmaker(bind=engine)()
+    snapshot(db, holdings(size))
+    db.add_all(ManualAsset(asset_type="CRYPTO", name=f"Coin {i}", symbol=f"C{i}", quantity=1.0,
+                           buy_price=100.0, current_price=100.0) for i in range(MANUAL_ASSETS))
+    db.commit()
+    db.close()
+    return engine
+
+
+def run(mode, args, tmp):
+    path = os.path.join(tmp, f"{mode}.db")
+    engine = setup(path, args.holdings)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    writer = DatabaseWriter(url=f"sqlite:///{path}") if mode == "writer" else None
+
+    def write(fn, *fn_args):
+        if writer:
+            return writer.run(fn, *fn_args)
+        db = Session()
+        try:
+            fn(db, *fn_args)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    counts = {"trade": 0, "manual": 0, "snapshot": 0, "locked": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + args.seconds
+
+    def worker(kind, make_call, interval=0.0):
+        n = 0
+        while time.monotonic() < stop:
+            time.sleep(interval)
+            n += 1
+            try:
+                write(*make_call(n))
+                key = kind
+            except OperationalError as e:
+                key = "locked" if "locked" in str(e) or "busy" in str(e) else "errors"
+            except Exception:
+                key = "errors"
+            with lock:
+                counts[key] += 1
+
+    rows = holdings(args.holdings)
+    threads = (
+        [threading.Thread(target=worker, args=("trade", lambda n: (log_trade, n)))
+         for _ in range(args.trade_threads)]
+        + [threading.Thread(target=worker, args=("manual", lambda n: (update_manual, random.randint(1, MANUAL_ASSETS))))
+           for _ in range(args.manual_threads)]
+        + [threading.Thread(target=worker, args=("snapshot", lambda n: (snapshot, rows), args.snapshot_interval))]
+    )
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    writes = counts["trade"] + counts["manual"] + counts["snapshot"]
+    extra = ""
+    if writer:
+        metrics = writer.get_metrics()
+        extra = f"  avg batch {metrics['avg_batch']}"
+        writer.stop()
+    engine.dispose()
+    print(f"{mode:<8}{writes / elapsed:>12.0f}{counts['trade']:>8}{counts['manual']:>8}{counts['snapshot']:>10}"
+          f"{counts['locked']:>8}{counts['errors']:>8}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-thread commits with the single writer queue")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--trade-threads", type=int, default=8)
+    parser.add_argument("--manual-threads", type=int, default=4)
+    parser.add_argument("--holdings", type=int, default=500)
+    parser.add_argument("--snapshot-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'writes/s':>12}{'trade':>8}{'manual':>8}{'snapshot':>10}{'locked':>8}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        run("direct", args, tmp)
+        run("writer", args, tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: typed decoders (src/api/responses.py) vs the old ad-hoc dict parsing.
+
+Builds synthetic TTTC8434R / CTRP6504R / CTRP6548R responses with the fake
+KIS server and, for each approach, reports decode time and the memory
+retained by the parsed rows.
+
+Usage (from project root):
+    python scripts/bench/kis_decode.py --holdings 2000 --repeat 50
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+# Add project root to path
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "scripts", "fake_kis"))
+
+from src.api.responses import decode_domestic_balance, decode_overseas_present, decode_account_balance
+
+
+def legacy_parse(dom_res, ov_res, integ_res):
+    """The per-field float(item.get(...)) parsing snapshot_assets and the dashboard used to do."""
+    dom = []
+    for item in dom_res.get("output1", []):
+        qty = float(item.get("hldg_qty", 0))
+        if qty > 0:
+            dom.append({
+                "symbol": item.get("pdno"),
+                "name": item.get("prdt_name"),
+                "quantity": qty,
+                "avg_price": float(item.get("pchs_avg_pric", 0)),
+                "current_price": float(item.get("prpr", 0)),
+                "eval_amount": float(item.get("evlu_amt", 0)),
+                "pl_amount": float(item.get("evlu_pfls_amt", 0)),
+                "return_rate": float(item.get("evlu_pfls_rt", 0)),
+            })
+    ov = []
+    for item in ov_res.get("output1", []):
+        qty = float(item.get("ccld_qty_smtl1", 0))
+        if qty > 0:
+            ov.append({
+                "symbol": item.get("pdno"),
+                "name": item.get("prdt_name"),
+                "quantity": qty,
+                "avg_price": float(item.get("avg_unpr3", 0)),
+                "current_price": float(item.get("ovrs_now_pric1", 0)),
+                "pl_amount": float(item.get("evlu_pfls_amt2", 0)),
+                "return_rate": float(item.get("evlu_pfls_rt1", 0)),
+                "realized_pl_krw": float(item.get("ovrs_rlzt_pfls_amt2", 0)),
+            })
+    out2 = integ_res.get("output2", {})
+    totals = {
+        "total_asset": float(out2.get("tot_asst_amt", 0)),
+        "total_pl": float(out2.get("evlu_pfls_amt_smtl", 0)),
+        "total_purchase": float(out2.get("pchs_amt_smtl", 0)),
+    }
+    categories = [{
+        "amount": float(item.get("evlu_amt", 0)),
+        "profit": float(item.get("evlu_pfls_amt", 0)),
+        "percent": float(item.get("whol_weit_rt", 0)),
+    } for item in integ_res.get("output1", [])]
+    return dom, ov, totals, categories
+
+
+def typed_parse(dom_res, ov_res, integ_res):
+    dom = [h for h in decode_domestic_balance(dom_res).holdings if h.quantity > 0]
+    ov = [h for h in decode_overseas_present(ov_res).holdings if h.quantity > 0]
+    return dom, ov, decode_account_balance(integ_res)
+
+
+def measure(name, fn, responses, repeat):
+    fn(*responses)  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*responses)
+    per_call = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn(*responses)
+    retained = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+    del result
+    print(f"{name:<8}{per_call * 1000:>12.3f}{retained / 1024:>16.1f}")
+    return per_call, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare typed KIS decoders against dict parsing")
+    parser.add_argument("--holdings", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    import server as fake_server
+    fake = fake_server.FakeKIS(fake_server.parse_args(["--holdings", str(args.holdings),
+                                                       "--page-size", str(args.holdings)]))
+    responses = (
+        fake.domestic_balance({}, {}, {})[1],
+        fake.overseas_present({}, {}, {})[1],
+        fake.account_balance({}, {}, {})[1],
+    )
+
+    print(f"{args.holdings} holdings, {args.repeat} runs")
+    print(f"{'parser':<8}{'ms/decode':>12}{'retained KiB':>16}")
+    legacy_time, legacy_mem = measure("dict", legacy_parse, responses, args.repeat)
+    typed_time, typed_mem = measure("typed", typed_parse, responses, args.repeat)
+    print(f"\ntyped/dict: time x{typed_time / legacy_time:.2f}, memory x{typed_mem / max(legacy_mem, 1):.2f}")
+
+
+if __name__ == "__main__":
+    main()
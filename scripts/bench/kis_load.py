@@ -0,0 +1,187 @@
+"""
+Load test for the KIS client stack (rate limiter, cache, retries, pooling)
+against the local fake server in scripts/fake_kis/server.py.
+
+Starts the fake server in-process (or uses --url), points the API clients at
+it, drives a mixed workload from N threads for a fixed duration and reports
+throughput and p50/p95/p99 latency per call type.
+
+Usage (from project root):
+    python scripts/bench/kis_load.py --threads 8 --duration 10 --latency-ms 30
+    python scripts/bench/kis_load.py --no-cache --client-rate 1000 --error-rate 0.05
+    python scripts/bench/kis_load.py --replay kis_cassette.jsonl
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "scripts", "fake_kis"))
+
+import src.config_loader as config_loader
+
+WORKLOAD = {  # call type -> relative weight
+    "domestic_balance": 3,
+    "overseas_present": 2,
+    "account_balance": 2,
+    "overseas_balance": 2,
+    "domestic_price": 6,
+    "overseas_price": 6,
+}
+CACHED_TR_IDS = ("CTRP6548R", "CTRP6504R", "TTTC8434R", "TTZC3013R", "FHKST01010100", "HHDFS00000300")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def configure(base_url, args):
+    """Points the client config at the fake server (config overrides survive reloads)."""
+    kis = config_loader.config_service.kis
+    api = {"base_url": base_url}
+    if args.client_rate:
+        api["rate_limit"] = {
+            "quotation": {"rate": args.client_rate, "burst": args.client_rate},
+            "trading": {"rate": args.client_rate, "burst": args.client_rate},
+        }
+    if args.no_cache:
+        api["cache"] = {"ttl": {tr_id: 0 for tr_id in CACHED_TR_IDS}}
+    config_loader.config_service.override({
+        "kis": {
+            "app_key": kis.app_key or "bench-app-key",
+            "app_secret": kis.app_secret or "bench-app-secret",
+            "account_no": kis.account_no or "12345678",
+            "account_code": kis.account_code or "01",
+        },
+        "api": api,
+    })
+
+    # Keep the real token.json untouched: the fake server issues its own token
+    import src.auth.token_manager as token_module
+    token_module.TOKEN_FILE = os.path.join(tempfile.mkdtemp(prefix="kis-bench-"), "token.json")
+
+
+def run_workload(args):
+    from src.api.domestic import DomesticAPI
+    from src.api.overseas import OverseasAPI
+
+    dom_api = DomesticAPI()
+    ov_api = OverseasAPI()
+    calls = {
+        "domestic_balance": lambda: list(dom_api.iter_balance_pages()),
+        "overseas_present": ov_api.get_balance_present,
+        "account_balance": dom_api.get_account_balance,
+        "overseas_balance": lambda: list(ov_api.iter_balance_realtime_pages()),
+        "domestic_price": lambda: dom_api.get_current_price(f"{100000 + random.randrange(args.symbols):06d}"),
+        "overseas_price": lambda: ov_api.get_current_price(f"SYM{random.randrange(args.symbols)}"),
+    }
+    names = list(WORKLOAD)
+    weights = [WORKLOAD[n] for n in names]
+
+    samples = {name: [] for name in names}
+    failures = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = bool(calls[name]())
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples[name].append(elapsed)
+                if not ok:
+                    failures[name] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, failures, time.perf_counter() - started
+
+
+def report(samples, failures, wall):
+    from src.api.cache import response_cache
+    from src.api.rate_limit import rate_limiter
+    from src.api.resilience import circuit_breaker
+
+    print(f"\n{'call':<18}{'n':>7}{'fail':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    everything = []
+    total_failures = 0
+    for name, values in samples.items():
+        values.sort()
+        everything.extend(values)
+        total_failures += failures[name]
+        print(f"{name:<18}{len(values):>7}{failures[name]:>6}{len(values) / wall:>9.1f}"
+              f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}"
+              f"{percentile(values, 99) * 1000:>9.1f}")
+    everything.sort()
+    print(f"{'TOTAL':<18}{len(everything):>7}{total_failures:>6}{len(everything) / wall:>9.1f}"
+          f"{percentile(everything, 50) * 1000:>9.1f}{percentile(everything, 95) * 1000:>9.1f}"
+          f"{percentile(everything, 99) * 1000:>9.1f}")
+    print(f"\ncache: {response_cache.get_metrics()}")
+    print(f"rate limit: {rate_limiter.get_metrics()}")
+    print(f"circuit: {circuit_breaker.get_metrics()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the KIS client against the fake server")
+    parser.add_argument("--url", help="Use an already running server instead of starting one")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    parser.add_argument("--symbols", type=int, default=50, help="Distinct symbols for price calls")
+    parser.add_argument("--client-rate", type=int, default=0,
+                        help="Override the client rate limit (req/s per class); 0 keeps settings.yaml")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    # Passed through to the in-process fake server
+    parser.add_argument("--holdings", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="Server-side EGW00201 limit (req/s)")
+    parser.add_argument("--replay", help="Serve responses from a recorded cassette")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        import server as fake_server
+        server_args = fake_server.parse_args([
+            "--port", "0",
+            "--holdings", str(args.holdings),
+            "--page-size", str(args.page_size),
+            "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate),
+            "--rate-limit", str(args.rate_limit),
+        ] + (["--replay", args.replay] if args.replay else []))
+        server, _ = fake_server.create_server(server_args)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    configure(base_url, args)
+    print(f"Benchmarking {base_url} with {args.threads} threads for {args.duration}s")
+    samples, failures, wall = run_workload(args)
+    report(samples, failures, wall)
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
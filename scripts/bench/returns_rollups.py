@@ -0,0 +1,84 @@
+"""
+Benchmark: /api/returns/period over multi-year ranges with the daily series
+(every DailySummary row) vs the week/month/year rollups picked by max_points.
+Benchmarks are disabled so only the database path is measured.
+
+Usage (from project root):
+    python scripts/bench/returns_rollups.py --years 10
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.engine import Base, make_engine, make_async_engine, get_async_db
+from src.database.migrations import migrate
+from src.database.models import DailySummary
+from src.web.routers import returns
+
+
+def seed(engine, start, end):
+    rows = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            rows.append({"date": day, "total_asset_krw": 1e8 + random.random() * 1e7,
+                         "total_cost_krw": 9e7, "net_investment_krw": 9e7, "kospi_close": 2500.0})
+        day += datetime.timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(insert(DailySummary), rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare daily and rollup returns series")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        days = seed(engine, start, end)
+        migrate(engine)  # Backfills the rollups from the seeded summaries
+        async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+
+        async def bench_db():
+            async with AsyncSession(async_engine) as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(returns.router)
+        app.dependency_overrides[get_async_db] = bench_db
+        client = TestClient(app)
+
+        print(f"{days} daily summaries over {args.years}y")
+        print(f"{'max_points':>10}{'resolution':>12}{'points':>8}{'ms':>8}")
+        for max_points in (5000, 1000, 400, 50):
+            url = (f"/api/returns/period?period=custom&start_date={start}&end_date={end}"
+                   f"&benchmark=none&max_points={max_points}")
+            client.get(url)  # warm up
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                body = client.get(url).json()
+            elapsed = (time.perf_counter() - started) / args.repeat
+            print(f"{max_points:>10}{body['resolution']:>12}{len(body['daily_series']):>8}{elapsed * 1000:>8.0f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: returns breakdowns over multi-year snapshot history, read through
+the ORM row by row (the previous per-instrument queries) vs SnapshotArchive
+with SQLite only and with closed months exported to Parquet.
+
+Usage (from project root):
+    python scripts/bench/snapshot_archive.py --years 3 --instruments 300
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.database.archive import SnapshotArchive
+from src.database.engine import Base, make_engine, make_async_engine
+from src.database.migrations import migrate
+from src.database.models import Instrument, DailyPortfolioSnapshot, AssetType
+import src.web.routers.returns as returns
+
+
+def seed(engine, instruments, start, end):
+    with engine.begin() as conn:
+        conn.execute(insert(Instrument), [
+            {"symbol": f"S{i:05d}", "name": f"Instrument {i}", "asset_type": AssetType.STOCK_DOMESTIC,
+             "brokerage": ("Korea Investment", "Mirae", "Upbit")[i % 3]}
+            for i in range(instruments)
+        ])
+        now = datetime.datetime.now()
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                conn.execute(insert(DailyPortfolioSnapshot), [
+                    {"date": day, "instrument_id": i + 1, "snapshot_time": now, "quantity": 10.0,
+                     "close_price": 1000.0 + i + day.toordinal() % 97, "avg_buy_price": 1000.0,
+                     "exchange_rate": 1.0, "value_krw": 10.0 * (1000.0 + i + day.toordinal() % 97),
+                     "profit_loss_krw": 0.0}
+                    for i in range(instruments)
+                ])
+            day += datetime.timedelta(days=1)
+
+
+def legacy_instrument_breakdown(db, start, end):
+    """The per-instrument ORM queries returns.py ran before the archive reader."""
+    result = {}
+    for inst in db.query(Instrument).all():
+        start_snap = db.query(DailyPortfolioSnapshot).filter(
+            DailyPortfolioSnapshot.instrument_id == inst.id,
+            DailyPortfolioSnapshot.date >= start
+        ).order_by(DailyPortfolioSnapshot.date).first()
+        end_snap = db.query(DailyPortfolioSnapshot).filter(
+            DailyPortfolioSnapshot.instrument_id == inst.id,
+            DailyPortfolioSnapshot.date <= end
+        ).order_by(DailyPortfolioSnapshot.date.desc()).first()
+        if start_snap and end_snap:
+            result[inst.symbol] = (start_snap.value_krw, end_snap.value_krw)
+    return result
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare snapshot history read paths")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--instruments", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        migrate(engine)
+        print(f"Seeding {args.years}y x {args.instruments} instruments...")
+        seed(engine, args.instruments, start, end)
+        db = sessionmaker(bind=engine)()
+
+        archive = SnapshotArchive(root=os.path.join(tmp, "archive"), engine=engine)
+        returns.snapshot_archive = archive
+        async_engine = make_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        def breakdown(fn):
+            async def run():
+                async with AsyncSession(async_engine) as async_db:
+                    return await fn(async_db, start, end)
+            return asyncio.run(run())
+
+        legacy, expected = timed(lambda: legacy_instrument_breakdown(db, start, end), args.repeat)
+        sqlite_only, _ = timed(lambda: breakdown(returns.get_instrument_breakdown), args.repeat)
+        brokerage_sqlite, _ = timed(lambda: breakdown(returns.get_brokerage_breakdown), args.repeat)
+
+        started = time.perf_counter()
+        exported = archive.archive_closed_periods()
+        export_time = time.perf_counter() - started
+        archived, by_instrument = timed(lambda: breakdown(returns.get_instrument_breakdown), args.repeat)
+        brokerage_archived, _ = timed(lambda: breakdown(returns.get_brokerage_breakdown), args.repeat)
+
+        got = {b["symbol"]: (b["start_value"], b["end_value"]) for b in by_instrument}
+        assert got == expected, "archive breakdown differs from the ORM breakdown"
+        size = sum(os.path.getsize(os.path.join(root, f))
+                   for root, _, files in os.walk(archive.root) for f in files if f.endswith(".parquet"))
+        print(f"Exported {sum(exported.values())} rows in {len(exported)} partitions "
+              f"({size / 1e6:.1f} MB) in {export_time:.2f}s; SQLite {os.path.getsize(os.path.join(tmp, 'bench.db')) / 1e6:.1f} MB")
+        print(f"\n{'instrument breakdown':<34}{'ms':>8}")
+        print(f"{'ORM, per-instrument queries':<34}{legacy * 1000:>8.0f}")
+        print(f"{'SnapshotArchive, SQLite only':<34}{sqlite_only * 1000:>8.0f}")
+        print(f"{'SnapshotArchive, Parquet':<34}{archived * 1000:>8.0f}")
+        print(f"\n{'brokerage breakdown':<34}{'ms':>8}")
+        print(f"{'SnapshotArchive, SQLite only':<34}{brokerage_sqlite * 1000:>8.0f}")
+        print(f"{'SnapshotArchive, Parquet':<34}{brokerage_archived * 1000:>8.0f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
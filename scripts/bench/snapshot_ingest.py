@@ -0,0 +1,114 @@
+"""
+Benchmark: per-row snapshot ingestion (get_or_create_instrument + SELECT/INSERT
+per holding, as snapshot_assets used to do) vs the bulk path in
+src/database/utils.py (resolve_instruments + one ON CONFLICT executemany).
+
+Each size runs on a fresh temp database with the tuned engine profile:
+  first day   - every instrument is new
+  next day    - instruments exist, snapshot rows are new
+  same day    - re-run of the next day, every row is an update
+
+Usage (from project root):
+    python scripts/bench/snapshot_ingest.py --sizes 1000 10000
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import and_
+from sqlalchemy.orm import sessionmaker
+
+from src.database.engine import Base, make_engine
+from src.database.models import DailyPortfolioSnapshot, AssetType
+from src.database.utils import get_or_create_instrument, ingest_snapshots
+
+DAY_1 = datetime.date(2024, 1, 2)
+DAY_2 = datetime.date(2024, 1, 3)
+
+
+def make_holdings(count, day_no):
+    return [
+        dict(
+            symbol=f"{100000 + i:06d}", name=f"Instrument {i}",
+            asset_type=AssetType.STOCK_DOMESTIC,
+            currency="KRW", brokerage="Korea Investment", exchange="KRX",
+            quantity=10.0, close_price=1000.0 + i + day_no, avg_buy_price=1000.0,
+            exchange_rate=1.0, value_krw=10.0 * (1000.0 + i + day_no), profit_loss_krw=10.0 * (i + day_no)
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_ingest(db, date, snapshot_time, holdings):
+    """The per-row path snapshot_assets used before bulk ingestion."""
+    for h in holdings:
+        instrument = get_or_create_instrument(
+            db, symbol=h["symbol"], name=h["name"], asset_type=h["asset_type"],
+            currency=h["currency"], brokerage=h["brokerage"], exchange=h["exchange"]
+        )
+        existing = db.query(DailyPortfolioSnapshot).filter(
+            and_(
+                DailyPortfolioSnapshot.date == date,
+                DailyPortfolioSnapshot.instrument_id == instrument.id
+            )
+        ).first()
+        values = {k: h[k] for k in ("quantity", "close_price", "avg_buy_price",
+                                    "exchange_rate", "value_krw", "profit_loss_krw")}
+        if existing:
+            existing.snapshot_time = snapshot_time
+            for key, value in values.items():
+                setattr(existing, key, value)
+        else:
+            db.add(DailyPortfolioSnapshot(date=date, instrument_id=instrument.id,
+                                          snapshot_time=snapshot_time, **values))
+
+
+def timed(Session, ingest, date, holdings):
+    db = Session()
+    start = time.perf_counter()
+    ingest(db, date, datetime.datetime.now(), holdings)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def run(name, ingest, size, tmp):
+    engine = make_engine(f"sqlite:///{os.path.join(tmp, f'{name}-{size}.db')}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    first = timed(Session, ingest, DAY_1, make_holdings(size, 1))
+    next_day = timed(Session, ingest, DAY_2, make_holdings(size, 2))
+    same_day = timed(Session, ingest, DAY_2, make_holdings(size, 3))
+
+    db = Session()
+    rows = db.query(DailyPortfolioSnapshot).count()
+    db.close()
+    engine.dispose()
+    assert rows == 2 * size, f"{name}: expected {2 * size} snapshot rows, found {rows}"
+    print(f"{name:<8}{size:>8}{first * 1000:>14.0f}{next_day * 1000:>14.0f}{same_day * 1000:>14.0f}")
+    return next_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and bulk snapshot ingestion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Instruments per day")
+    args = parser.parse_args()
+
+    print(f"{'path':<8}{'size':>8}{'first day ms':>14}{'next day ms':>14}{'same day ms':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            legacy = run("per-row", legacy_ingest, size, tmp)
+            bulk = run("bulk", ingest_snapshots, size, tmp)
+            print(f"{'':<8}{'':>8}  next day speedup: {legacy / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: snapshot retention on multi-year history. Reports the dry run,
+then compacts, and checks that breakdowns (read through SnapshotArchive)
+are unchanged while the SQLite file shrinks.
+
+Usage (from project root):
+    python scripts/bench/snapshot_retention.py --years 3 --instruments 300
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import func, select
+
+from src.database.archive import SnapshotArchive
+from src.database.engine import Base, make_engine
+from src.database.migrations import migrate
+from src.database.models import DailyPortfolioSnapshot
+from src.database.retention import SnapshotRetention
+from scripts.bench.snapshot_archive import seed
+
+
+def breakdown(archive, start, end):
+    frame = archive.load(start, end, ("instrument_id", "value_krw"))
+    values = frame.groupby("instrument_id")["value_krw"]
+    return values.first().to_dict(), values.last().to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure snapshot retention compaction")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--instruments", type=int, default=300)
+    parser.add_argument("--detail-days", type=int, default=400)
+    args = parser.parse_args()
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        migrate(engine)
+        print(f"Seeding {args.years}y x {args.instruments} instruments...")
+        seed(engine, args.instruments, start, end)
+
+        archive = SnapshotArchive(root=os.path.join(tmp, "archive"), engine=engine)
+        retention = SnapshotRetention(engine=engine, archive=archive)
+        expected = breakdown(archive, start, end)
+
+        started = time.perf_counter()
+        report = retention.run(dry_run=True, detail_days=args.detail_days)
+        print(f"Dry run ({time.perf_counter() - started:.2f}s, includes archive export):")
+        print(json.dumps({k: v for k, v in report.items() if k != "months"}, indent=2))
+
+        started = time.perf_counter()
+        report = retention.run(dry_run=False, detail_days=args.detail_days)
+        elapsed = time.perf_counter() - started
+        with engine.connect() as conn:
+            remaining = conn.execute(select(func.count()).select_from(DailyPortfolioSnapshot)).scalar()
+
+        assert breakdown(archive, start, end) == expected, "breakdown changed after compaction"
+        assert retention.run(dry_run=True, detail_days=args.detail_days)["rows_deleted"] == 0, "not idempotent"
+        print(f"\nCompacted {len(report['months'])} months in {elapsed:.2f}s (incl. VACUUM/ANALYZE)")
+        print(f"rows  {report['rows_before']:>12} -> {remaining}")
+        print(f"bytes {report['file_bytes_before']:>12} -> {report['file_bytes_after']} "
+              f"(estimated reclaim {report['estimated_bytes_reclaimed']})")
+        retention.writer.stop()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
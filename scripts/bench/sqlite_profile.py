@@ -0,0 +1,135 @@
+"""
+Benchmark: bare SQLite engine vs the tuned profile in src/database/engine.py.
+
+One writer thread upserts a day of snapshots per transaction (like
+snapshot_assets) while reader threads run period queries (like
+/api/returns/period). Reports write and read throughput, p95 read latency
+and "database is locked" errors for each profile on a fresh temp database.
+
+Usage (from project root):
+    python scripts/bench/sqlite_profile.py --readers 4 --duration 5 --instruments 300
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.database.engine import Base, make_engine
+from src.database.models import Instrument, DailyPortfolioSnapshot, DailySummary, AssetType
+
+START_DATE = datetime.date(2020, 1, 1)
+
+
+def seed(Session, instruments, days):
+    db = Session()
+    for i in range(instruments):
+        db.add(Instrument(symbol=f"S{i:05d}", name=f"Instrument {i}", asset_type=AssetType.STOCK_DOMESTIC))
+    db.flush()
+    for d in range(days):
+        write_day(db, START_DATE + datetime.timedelta(days=d), instruments)
+    db.commit()
+    db.close()
+
+
+def write_day(db, day, instruments):
+    """One snapshot day as INSERT OR REPLACE batches (Core, so the storage layer dominates)."""
+    now = datetime.datetime.now()
+    rows = [{
+        "id": day.toordinal() * 100000 + i, "date": day, "instrument_id": i + 1, "snapshot_time": now,
+        "quantity": 1.0, "close_price": 1000.0 + i, "avg_buy_price": 1000.0, "exchange_rate": 1.0,
+        "value_krw": 1000.0 + i, "profit_loss_krw": float(i),
+    } for i in range(instruments)]
+    db.execute(insert(DailyPortfolioSnapshot).prefix_with("OR REPLACE"), rows)
+    total = sum(r["value_krw"] for r in rows)
+    db.execute(insert(DailySummary).prefix_with("OR REPLACE"), [{
+        "date": day, "snapshot_time": now, "total_asset_krw": total, "total_cost_krw": total,
+    }])
+
+
+def run_profile(name, engine, args):
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session, args.instruments, args.seed_days)
+
+    stats = {"writes": 0, "reads": 0, "write_errors": 0, "read_errors": 0, "read_latency": []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def writer():
+        day_no = args.seed_days
+        while time.perf_counter() < deadline:
+            db = Session()
+            try:
+                write_day(db, START_DATE + datetime.timedelta(days=day_no), args.instruments)
+                db.commit()
+                day_no += 1
+                with lock:
+                    stats["writes"] += 1
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    stats["write_errors"] += 1
+            finally:
+                db.close()
+
+    def reader():
+        while time.perf_counter() < deadline:
+            db = Session()
+            start = time.perf_counter()
+            try:
+                db.query(DailySummary).filter(
+                    DailySummary.date.between(START_DATE, START_DATE + datetime.timedelta(days=365))
+                ).order_by(DailySummary.date).all()
+                db.query(DailyPortfolioSnapshot.date, func.sum(DailyPortfolioSnapshot.value_krw)).group_by(
+                    DailyPortfolioSnapshot.date).all()
+                with lock:
+                    stats["reads"] += 1
+                    stats["read_latency"].append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    stats["read_errors"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    latency = sorted(stats["read_latency"])
+    p95 = latency[int(len(latency) * 0.95)] * 1000 if latency else 0.0
+    print(f"{name:<8}{stats['writes'] / args.duration:>12.1f}{stats['reads'] / args.duration:>12.1f}"
+          f"{p95:>14.1f}{stats['write_errors']:>10}{stats['read_errors']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite storage profiles under concurrent load")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--instruments", type=int, default=300, help="Rows written per snapshot day")
+    parser.add_argument("--seed-days", type=int, default=60)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers + 1 writer, {args.instruments} rows/day, {args.duration}s per profile")
+    print(f"{'profile':<8}{'days/s':>12}{'reads/s':>12}{'p95 read ms':>14}{'w errors':>10}{'r errors':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        bare = create_engine(f"sqlite:///{os.path.join(tmp, 'bare.db')}")
+        run_profile("bare", bare, args)
+        tuned = make_engine(f"sqlite:///{os.path.join(tmp, 'tuned.db')}")
+        run_profile("tuned", tuned, args)
+
+
+if __name__ == "__main__":
+    main()
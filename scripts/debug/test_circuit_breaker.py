@@ -0,0 +1,81 @@
+"""
+Circuit breaker recovery checks: a half-open probe that raises, is
+cancelled, or is lost must not leave every later KIS call rejected.
+No network or credentials needed.
+
+Usage (from project root):
+    python scripts/debug/test_circuit_breaker.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from src.api import async_client, base
+from src.api.resilience import CircuitBreaker
+
+RESET_TIMEOUT = 0.05
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker({"failure_threshold": 1, "reset_timeout": RESET_TIMEOUT})
+    breaker.record_failure()
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+def test_probe_raises():
+    breaker = half_open_breaker()
+    base.circuit_breaker = breaker
+    api = base.BaseAPI.__new__(base.BaseAPI)
+    api._send_once = lambda *args: (_ for _ in ()).throw(Exception("Failed to get access token"))
+    try:
+        api._send("/probe", tr_id="TEST")
+    except Exception:
+        pass
+    # The raise counted as a failure: open again, then a fresh probe after the timeout
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.allow_request()
+
+
+def test_probe_cancelled():
+    breaker = half_open_breaker()
+    async_client.circuit_breaker = breaker
+    api = async_client.AsyncBaseAPI.__new__(async_client.AsyncBaseAPI)
+
+    async def hang(*args):
+        await asyncio.sleep(10)
+
+    api._send_once = hang
+
+    async def run():
+        probe = asyncio.create_task(api._send("/probe", tr_id="TEST"))
+        await asyncio.sleep(0)
+        probe.cancel()
+        try:
+            await probe
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_lost_probe_expires():
+    breaker = half_open_breaker()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # Probe in flight
+    time.sleep(RESET_TIMEOUT * 1.5)
+    assert breaker.allow_request()  # Never reported back; a new probe is let through
+
+
+if __name__ == "__main__":
+    for check in (test_probe_raises, test_probe_cancelled, test_lost_probe_expires):
+        check()
+        print(f"[INFO] {check.__name__}: ok")
@@ -0,0 +1,357 @@
+"""
+Local stand-in for the KIS REST API, for load tests and offline development.
+
+Serves the endpoints this project calls, with a synthetic portfolio of
+configurable size (paginated with tr_cont / CTX_AREA_* like the real API):
+    POST /oauth2/tokenP, /oauth2/Approval
+    GET  inquire-balance (TTTC8434R), inquire-present-balance (CTRP6504R),
+         inquire-account-balance (CTRP6548R), overseas inquire-balance (TTZC3013R),
+         inquire-price (FHKST01010100), overseas price (HHDFS00000300)
+    POST order-cash (TTTC0802U/0801U), overseas order (JTTT1002U/1006U)
+    GET  /__stats  (request counters)
+
+Faults: --latency-ms/--jitter-ms, --error-rate (HTTP 500), --logic-error-rate
+(rt_cd=1), --rate-limit (req/s; excess gets EGW00201 like the real gateway).
+
+Record / replay:
+    --record https://openapi.koreainvestment.com:9443 --cassette kis.jsonl
+        proxies to the real API and appends every exchange to the cassette
+    --replay kis.jsonl
+        serves recorded responses (matched on method, path, tr_id, query, tr_cont)
+
+Usage (from project root):
+    python scripts/fake_kis/server.py --port 18443 --holdings 500 --latency-ms 40
+Point the app at it with api.base_url: "http://127.0.0.1:18443".
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+
+US_EXCHANGES = ("NASD", "NYSE", "AMEX")
+OVERSEAS_MARKETS = (  # (exchange, currency) used for synthetic overseas holdings
+    ("NASD", "USD"), ("NYSE", "USD"), ("AMEX", "USD"), ("SEHK", "HKD"), ("TKSE", "JPY"),
+)
+FX_RATES = {"USD": 1350.0, "HKD": 173.0, "JPY": 9.1}
+
+RATE_LIMIT_BODY = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+
+ROUTES = {
+    ("POST", "/oauth2/tokenP"): "token",
+    ("POST", "/oauth2/Approval"): "approval",
+    ("GET", "/uapi/domestic-stock/v1/trading/inquire-balance"): "domestic_balance",
+    ("GET", "/uapi/overseas-stock/v1/trading/inquire-present-balance"): "overseas_present",
+    ("GET", "/uapi/domestic-stock/v1/trading/inquire-account-balance"): "account_balance",
+    ("GET", "/uapi/overseas-stock/v1/trading/inquire-balance"): "overseas_balance",
+    ("GET", "/uapi/domestic-stock/v1/quotations/inquire-price"): "domestic_price",
+    ("GET", "/uapi/overseas-price/v1/quotations/price"): "overseas_price",
+    ("POST", "/uapi/domestic-stock/v1/trading/order-cash"): "order",
+    ("POST", "/uapi/overseas-stock/v1/trading/order"): "order",
+}
+
+
+def build_portfolio(holdings, seed):
+    """Deterministic synthetic holdings: half domestic, half overseas across several markets."""
+    rng = random.Random(seed)
+    domestic, overseas = [], []
+    for i in range(holdings // 2 + holdings % 2):
+        price = rng.randint(1000, 900000)
+        qty = rng.randint(1, 500)
+        avg = round(price * rng.uniform(0.7, 1.3))
+        domestic.append({
+            "pdno": f"{100000 + i:06d}",
+            "prdt_name": f"국내종목{i}",
+            "hldg_qty": str(qty),
+            "pchs_avg_pric": f"{avg:.4f}",
+            "prpr": str(price),
+            "evlu_amt": str(price * qty),
+            "evlu_pfls_amt": str((price - avg) * qty),
+            "evlu_pfls_rt": f"{(price / avg - 1) * 100:.2f}",
+        })
+    for i in range(holdings // 2):
+        exchange, currency = OVERSEAS_MARKETS[i % len(OVERSEAS_MARKETS)]
+        price = round(rng.uniform(5, 900), 2)
+        qty = rng.randint(1, 200)
+        avg = round(price * rng.uniform(0.7, 1.3), 4)
+        pl = (price - avg) * qty
+        overseas.append({
+            "symbol": f"SYM{i}",
+            "name": f"Overseas Co {i}",
+            "exchange": exchange,
+            "currency": currency,
+            "qty": qty,
+            "price": price,
+            "avg": avg,
+            "pl": pl,
+        })
+    return domestic, overseas
+
+
+class FakeKIS:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.domestic, self.overseas = build_portfolio(args.holdings, args.seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0, "by_tr_id": {}}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._order_no = 0
+        self.cassette = {}
+        if args.replay:
+            with open(args.replay, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.cassette[self.cassette_key(entry["method"], entry["path"], entry["tr_id"],
+                                                        entry["query"], entry["tr_cont"])] = entry
+
+    @staticmethod
+    def cassette_key(method, path, tr_id, query, tr_cont):
+        return (method, path, tr_id or "", tuple(sorted(query.items())), tr_cont or "")
+
+    # ── Fault injection ──
+
+    def admit(self, tr_id):
+        """Counts the request; returns an injected (status, body) or None to proceed."""
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_tr_id"][tr_id or "-"] = self.stats["by_tr_id"].get(tr_id or "-", 0) + 1
+            if self.args.rate_limit:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.args.rate_limit:
+                    self.stats["rate_limited"] += 1
+                    return 500, RATE_LIMIT_BODY
+            roll = self.rng.random()
+            if roll < self.args.error_rate:
+                self.stats["errors_injected"] += 1
+                return 500, {"rt_cd": "1", "msg_cd": "EGW00000", "msg1": "Injected server error"}
+            if roll < self.args.error_rate + self.args.logic_error_rate:
+                self.stats["errors_injected"] += 1
+                return 200, {"rt_cd": "1", "msg_cd": "APBK0000", "msg1": "Injected logic error"}
+        return None
+
+    def sleep_latency(self):
+        if self.args.latency_ms or self.args.jitter_ms:
+            delay = self.args.latency_ms + self.rng.uniform(-self.args.jitter_ms, self.args.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000.0)
+
+    # ── Handlers: return (status, body, extra headers) ──
+
+    def token(self, query, body, headers):
+        return 200, {"access_token": "fake-access-token", "token_type": "Bearer", "expires_in": 86400}, {}
+
+    def approval(self, query, body, headers):
+        return 200, {"approval_key": "fake-approval-key"}, {}
+
+    def _page(self, rows, query, fk, nk):
+        start = int(query.get(nk) or 0)
+        end = start + self.args.page_size
+        more = end < len(rows)
+        body = {fk.lower(): "FAKE" if more else "", nk.lower(): str(end) if more else ""}
+        return rows[start:end], body, {"tr_cont": "M" if more else "D"}
+
+    def domestic_balance(self, query, body, headers):
+        rows, ctx, extra = self._page(self.domestic, query, "CTX_AREA_FK100", "CTX_AREA_NK100")
+        total = sum(float(r["evlu_amt"]) for r in self.domestic)
+        res = {"rt_cd": "0", "msg_cd": "KIOK0510", "msg1": "조회가 완료되었습니다", "output1": rows,
+               "output2": [{"cma_evlu_amt": "1500000", "tot_evlu_amt": str(total)}], **ctx}
+        return 200, res, extra
+
+    def overseas_present(self, query, body, headers):
+        output1 = [{
+            "pdno": h["symbol"],
+            "prdt_name": h["name"],
+            "ccld_qty_smtl1": str(h["qty"]),
+            "ovrs_now_pric1": f"{h['price']:.4f}",
+            "avg_unpr3": f"{h['avg']:.4f}",
+            "evlu_pfls_amt2": f"{h['pl']:.2f}",
+            "evlu_pfls_rt1": f"{(h['price'] / h['avg'] - 1) * 100:.2f}",
+            "ovrs_rlzt_pfls_amt2": f"{h['pl'] * FX_RATES[h['currency']]:.0f}",
+            "ovrs_excg_cd": h["exchange"],
+            "buy_crcy_cd": h["currency"],
+        } for h in self.overseas]
+        output2 = [{"crcy_cd": c, "frst_bltn_exrt": f"{r:.2f}"} for c, r in FX_RATES.items()]
+        return 200, {"rt_cd": "0", "msg1": "조회가 완료되었습니다", "output1": output1, "output2": output2,
+                     "output3": {}}, {}
+
+    def account_balance(self, query, body, headers):
+        dom_total = sum(float(r["evlu_amt"]) for r in self.domestic)
+        ov_total = sum(h["price"] * h["qty"] * FX_RATES[h["currency"]] for h in self.overseas)
+        output1 = [{"evlu_amt": "0", "evlu_pfls_amt": "0", "whol_weit_rt": "0"} for _ in range(20)]
+        output1[0]["evlu_amt"] = f"{dom_total:.0f}"
+        output1[7]["evlu_amt"] = "1500000"
+        output1[8]["evlu_amt"] = f"{ov_total:.0f}"
+        total = dom_total + ov_total + 1500000
+        output2 = {"tot_asst_amt": f"{total:.0f}", "evlu_pfls_amt_smtl": "0", "pchs_amt_smtl": f"{total:.0f}"}
+        return 200, {"rt_cd": "0", "msg1": "조회가 완료되었습니다", "output1": output1, "output2": output2}, {}
+
+    def overseas_balance(self, query, body, headers):
+        exchange = query.get("OVRS_EXCG_CD", "NASD")
+        # Like the real API, NASD means "all US exchanges"
+        wanted = US_EXCHANGES if exchange == "NASD" else (exchange,)
+        rows = [{
+            "ovrs_pdno": h["symbol"],
+            "ovrs_item_name": h["name"],
+            "ovrs_cblc_qty": str(h["qty"]),
+            "ord_psbl_qty": str(h["qty"]),
+            "pchs_avg_pric": f"{h['avg']:.4f}",
+            "now_pric2": f"{h['price']:.4f}",
+            "ovrs_stck_evlu_amt": f"{h['price'] * h['qty']:.2f}",
+            "frcr_evlu_pfls_amt": f"{h['pl']:.2f}",
+            "evlu_pfls_rt": f"{(h['price'] / h['avg'] - 1) * 100:.2f}",
+            "ovrs_excg_cd": h["exchange"],
+            "tr_crcy_cd": h["currency"],
+        } for h in self.overseas if h["exchange"] in wanted]
+        page, ctx, extra = self._page(rows, query, "CTX_AREA_FK200", "CTX_AREA_NK200")
+        return 200, {"rt_cd": "0", "msg1": "조회가 완료되었습니다", "output1": page, "output2": {}, **ctx}, extra
+
+    def domestic_price(self, query, body, headers):
+        price = 50000 + self.rng.randint(-500, 500)
+        return 200, {"rt_cd": "0", "msg1": "정상처리 되었습니다.", "output": {
+            "stck_prpr": str(price), "prdy_vrss": "100", "prdy_ctrt": "0.20", "acml_vol": "123456"}}, {}
+
+    def overseas_price(self, query, body, headers):
+        price = 150 + self.rng.uniform(-1, 1)
+        return 200, {"rt_cd": "0", "msg1": "정상처리 되었습니다.", "output": {
+            "rsym": f"D{query.get('EXCD', '')}{query.get('SYMB', '')}", "last": f"{price:.4f}",
+            "diff": "0.50", "rate": "0.33", "tvol": "1000000"}}, {}
+
+    def order(self, query, body, headers):
+        with self.lock:
+            self._order_no += 1
+            order_no = f"{self._order_no:010d}"
+        return 200, {"rt_cd": "0", "msg_cd": "APBK0013", "msg1": "주문 전송 완료 되었습니다.",
+                     "output": {"KRX_FWDG_ORD_ORGNO": "91252", "ODNO": order_no, "ORD_TMD": time.strftime("%H%M%S")}}, {}
+
+
+def make_handler(fake, args):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+        def log_message(self, *a):
+            if args.verbose:
+                super().log_message(*a)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def send_json(self, status, body, extra_headers=None):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def handle_request(self, method):
+            url = urlparse(self.path)
+            query = dict(parse_qsl(url.query, keep_blank_values=True))
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length else b""
+            tr_id = self.headers.get("tr_id")
+            tr_cont = self.headers.get("tr_cont") or ""
+
+            if url.path == "/__stats":
+                with fake.lock:  # Handler threads keep counting while it is serialized
+                    stats = {**fake.stats, "by_tr_id": dict(fake.stats["by_tr_id"])}
+                return self.send_json(200, stats)
+
+            if args.record:
+                return self.proxy(method, url, query, raw_body, tr_id, tr_cont)
+            if args.replay and not url.path.startswith("/oauth2/"):  # Tokens are never recorded
+                entry = fake.cassette.get(fake.cassette_key(method, url.path, tr_id, query, tr_cont))
+                if entry is None:
+                    return self.send_json(404, {"rt_cd": "1", "msg1": f"No recording for {method} {url.path} {tr_id}"})
+                fake.sleep_latency()
+                return self.send_json(entry["status"], entry["body"], entry.get("headers"))
+
+            route = ROUTES.get((method, url.path))
+            if route is None:
+                return self.send_json(404, {"rt_cd": "1", "msg1": f"Unknown endpoint {method} {url.path}"})
+
+            fake.sleep_latency()
+            if not url.path.startswith("/oauth2/"):
+                injected = fake.admit(tr_id)
+                if injected:
+                    return self.send_json(*injected)
+
+            body = json.loads(raw_body) if raw_body else {}
+            status, res, extra = getattr(fake, route)(query, body, self.headers)
+            self.send_json(status, res, extra)
+
+        def proxy(self, method, url, query, raw_body, tr_id, tr_cont):
+            """Forwards to the real API and appends the exchange to the cassette."""
+            forward = {k: v for k, v in self.headers.items() if k.lower() not in ("host", "content-length", "connection")}
+            target = args.record.rstrip("/") + self.path
+            req = urllib.request.Request(target, data=raw_body or None, headers=forward, method=method)
+            try:
+                with urllib.request.urlopen(req, timeout=30) as res:
+                    status, res_headers, payload = res.status, res.headers, res.read()
+            except urllib.error.HTTPError as e:
+                status, res_headers, payload = e.code, e.headers, e.read()
+            body = json.loads(payload.decode("utf-8"))
+            extra = {"tr_cont": res_headers.get("tr_cont")} if res_headers.get("tr_cont") else {}
+            if not url.path.startswith("/oauth2/"):  # Never persist credentials
+                with fake.lock, open(args.cassette, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"method": method, "path": url.path, "tr_id": tr_id or "",
+                                        "query": query, "tr_cont": tr_cont, "status": status,
+                                        "headers": extra, "body": body}, ensure_ascii=False) + "\n")
+            self.send_json(status, body, extra)
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake KIS REST server (synthetic, record or replay)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18443)
+    parser.add_argument("--holdings", type=int, default=40, help="Synthetic positions (half domestic, half overseas)")
+    parser.add_argument("--page-size", type=int, default=50, help="Rows per page for paginated inquiries")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--logic-error-rate", type=float, default=0, help="Fraction answered with rt_cd=1")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Max requests/sec before EGW00201 (0 = off)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--record", metavar="BASE_URL", help="Proxy to the real API and record responses")
+    parser.add_argument("--cassette", default="kis_cassette.jsonl", help="Cassette file written in record mode")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve responses from a recorded cassette")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def create_server(args):
+    fake = FakeKIS(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake, args))
+    server.daemon_threads = True
+    return server, fake
+
+
+def main():
+    args = parse_args()
+    server, _ = create_server(args)
+    mode = "record" if args.record else "replay" if args.replay else "synthetic"
+    print(f"Fake KIS ({mode}) listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
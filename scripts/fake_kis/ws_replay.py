@@ -0,0 +1,128 @@
+"""
+Local stand-in for the KIS realtime WebSocket that replays recorded frames.
+
+Recordings are plain text, one frame per line, as written by
+RealtimeClient(record_path=...). A line may start with "<delay_ms>\t" to
+control pacing; without it frames are sent back to back. JSON control
+messages in a recording are skipped.
+
+Usage (from project root):
+    python scripts/fake_kis/ws_replay.py frames.txt --port 21000 --loop
+    python scripts/fake_kis/ws_replay.py --synthetic 005930,AAPL --rate 200
+
+Then:
+    client = RealtimeClient(url="ws://127.0.0.1:21000", approval_key="test")
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import websockets
+
+
+def load_frames(path):
+    frames = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            delay_ms = 0.0
+            if "\t" in line:
+                prefix, line = line.split("\t", 1)
+                delay_ms = float(prefix)
+            if line[:1] in ("0", "1"):
+                frames.append((delay_ms / 1000.0, line))
+    return frames
+
+
+def synthetic_frames(symbols, count=1000):
+    """Random-walk ticks in KIS wire format for the given symbols."""
+    prices = {s: 100.0 for s in symbols}
+    frames = []
+    for _ in range(count):
+        symbol = random.choice(symbols)
+        prices[symbol] = max(1.0, prices[symbol] * (1 + random.uniform(-0.002, 0.002)))
+        price = f"{prices[symbol]:.2f}"
+        if symbol.isdigit():
+            fields = [""] * 46
+            fields[0], fields[2], fields[5], fields[13] = symbol, price, "0.00", "1000"
+            frames.append((0.0, "0|H0STCNT0|001|" + "^".join(fields)))
+        else:
+            fields = [""] * 26
+            fields[0], fields[1], fields[11], fields[14], fields[20] = f"DNAS{symbol}", symbol, price, "0.00", "1000"
+            frames.append((0.0, "0|HDFSCNT0|001|" + "^".join(fields)))
+    return frames
+
+
+def ack(tr_id, tr_key):
+    return json.dumps({
+        "header": {"tr_id": tr_id, "tr_key": tr_key, "encrypt": "N"},
+        "body": {"rt_cd": "0", "msg_cd": "OPSP0000", "msg1": "SUBSCRIBE SUCCESS"},
+    })
+
+
+async def serve(frames, host, port, loop_frames, rate, ping_every):
+    async def handler(ws, *args):
+        subscribed = asyncio.Event()
+
+        async def receive():
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("header", {}).get("tr_id") == "PINGPONG":
+                    continue
+                body = msg.get("body", {}).get("input", {})
+                await ws.send(ack(body.get("tr_id"), body.get("tr_key")))
+                subscribed.set()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            await subscribed.wait()
+            sent = 0
+            while True:
+                for delay, frame in frames:
+                    if delay:
+                        await asyncio.sleep(delay)
+                    elif rate:
+                        await asyncio.sleep(1.0 / rate)
+                    await ws.send(frame)
+                    sent += 1
+                    if ping_every and sent % ping_every == 0:
+                        await ws.send(json.dumps({"header": {"tr_id": "PINGPONG", "datetime": "20240101000000"}}))
+                if not loop_frames:
+                    break
+            await ws.close()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            receiver.cancel()
+
+    async with websockets.serve(handler, host, port):
+        print(f"Replaying {len(frames)} frames on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded KIS realtime frames over WebSocket")
+    parser.add_argument("recording", nargs="?", help="Recorded frames file")
+    parser.add_argument("--synthetic", help="Comma-separated symbols to generate random ticks for")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=21000)
+    parser.add_argument("--loop", action="store_true", help="Replay the recording forever")
+    parser.add_argument("--rate", type=float, default=0, help="Frames/sec when the recording has no delays (0 = unthrottled)")
+    parser.add_argument("--ping-every", type=int, default=500, help="Send a PINGPONG every N frames")
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording)
+    elif args.synthetic:
+        frames = synthetic_frames(args.synthetic.split(","))
+    else:
+        parser.error("give a recording file or --synthetic SYMBOLS")
+
+    asyncio.run(serve(frames, args.host, args.port, args.loop, args.rate, args.ping_every))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Asyncio-native KIS clients for use inside FastAPI routes.
+
+AsyncDomesticAPI / AsyncOverseasAPI expose the same methods as their
+blocking counterparts. The request-building methods in DomesticAPI and
+OverseasAPI only *return* self.call_api(...) / self.iter_pages(...) /
+self.collect_pages(...) / self._fan_out(...), so swapping in async
+versions of those makes every one of them awaitable (or async-iterable)
+without duplicating params.
+"""
+import asyncio
+import threading
+
+import httpx
+
+from src.api.base import BaseAPI, PaginationError, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from src.api.cache import response_cache
+from src.api.resilience import retry_policy, circuit_breaker, Outcome
+from src.api.domestic import DomesticAPI
+from src.api.overseas import OverseasAPI
+from src.config_loader import get_http_config
+
+try:
+    import h2  # noqa: F401  (optional, enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class AsyncBaseAPI(BaseAPI):
+    # One async connection pool per event loop, shared by every async API instance there
+    _clients = {}  # event loop -> httpx.AsyncClient
+    _client_lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls):
+        """Returns the shared httpx.AsyncClient bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with cls._client_lock:
+            client = AsyncBaseAPI._clients.get(loop)
+            if client is None:
+                # A closed loop's client can no longer be awaited; its sockets go with it
+                for stale in [l for l in AsyncBaseAPI._clients if l.is_closed()]:
+                    del AsyncBaseAPI._clients[stale]
+                pool_size = int(get_http_config().get("pool_size", DEFAULT_POOL_SIZE))
+                client = httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                )
+                AsyncBaseAPI._clients[loop] = client
+            return client
+
+    @classmethod
+    async def aclose(cls):
+        """Closes every shared async client (call on application shutdown)."""
+        loop = asyncio.get_running_loop()
+        with cls._client_lock:
+            clients = list(AsyncBaseAPI._clients.items())
+            AsyncBaseAPI._clients.clear()
+        for client_loop, client in clients:
+            if client_loop is loop:
+                await client.aclose()
+            elif client_loop.is_running():
+                # Each client's connections belong to its own loop; close it there
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), client_loop))
+
+    async def call_api(self, path, params=None, data=None, method="GET", tr_id=None, priority=None):
+        """Standard API call with error handling (non-blocking)."""
+        res_json, _ = await self._request(path, params, data, method, tr_id, priority)
+        return res_json
+
+    async def iter_pages(self, path, params, tr_id, ctx_keys, priority=None, max_pages=DEFAULT_MAX_PAGES):
+        """Async generator counterpart of BaseAPI.iter_pages."""
+        tr_cont = None
+        for page_no in range(max_pages):
+            res_json, res_headers = await self._request(path, params, None, "GET", tr_id, priority, tr_cont)
+            if res_json is None:
+                if page_no == 0:
+                    return
+                raise PaginationError(f"Page {page_no + 1} of {path} ({tr_id}) failed")
+            yield res_json
+            params = self._next_page_params(res_json, res_headers, params, ctx_keys)
+            if params is None:
+                return
+            tr_cont = "N"
+        print(f"[WARN] Stopped paging {path} ({tr_id}) after {max_pages} pages")
+
+    async def collect_pages(self, path, params, tr_id, ctx_keys, priority=None, max_pages=DEFAULT_MAX_PAGES):
+        """Async counterpart of BaseAPI.collect_pages."""
+        pages = [page async for page in self.iter_pages(path, params, tr_id, ctx_keys, priority, max_pages)]
+        return pages or None
+
+    async def _request(self, path, params=None, data=None, method="GET", tr_id=None, priority=None, tr_cont=None):
+        """_send behind the TTL response cache (read-only tr_ids only)."""
+        ttl = response_cache.ttl_for(method, tr_id)
+        if not ttl:
+            return await self._send(path, params, data, method, tr_id, priority, tr_cont)
+        key = response_cache.make_key(f"{self.base_url}{path}", params, tr_id, tr_cont)
+        result = await response_cache.aget_or_call(
+            key, ttl, lambda: self._send(path, params, data, method, tr_id, priority, tr_cont))
+        return self._stale_fallback(key, result, path, tr_id)
+
+    async def _fan_out(self, calls, parse):
+        """Async counterpart of BaseAPI._fan_out (asyncio.gather instead of threads)."""
+        results, errors = {}, {}
+        keys = list(calls)
+        responses = await asyncio.gather(*(fn(*args) for fn, args in calls.values()), return_exceptions=True)
+        for key, res in zip(keys, responses):
+            if isinstance(res, BaseException):
+                errors[key] = str(res)
+            else:
+                self._collect(key, res, parse, results, errors)
+        return results, errors
+
+    async def _send(self, path, params=None, data=None, method="GET", tr_id=None, priority=None, tr_cont=None):
+        """Async counterpart of BaseAPI._send (bounded retries, circuit breaker)."""
+        attempt = 0
+        while True:
+            attempt += 1
+            if not circuit_breaker.allow_request():
+                print(f"[WARN] KIS circuit open, skipping {path} ({tr_id})")
+                return None, None
+
+            try:
+                outcome, res_json, res_headers = await self._send_once(path, params, data, method, tr_id, priority, tr_cont)
+            except Exception:
+                # e.g. no access token: no answer from KIS counts as a failure
+                circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled: no outcome, but a half-open probe slot must not stay taken
+                circuit_breaker.release_trial()
+                raise
+            self._record_outcome(outcome)
+            if outcome == Outcome.OK:
+                return res_json, res_headers
+            if not retry_policy.should_retry(outcome, method, attempt):
+                return None, None
+
+            delay = retry_policy.delay(attempt)
+            print(f"[WARN] Retrying {path} ({tr_id}) in {delay:.2f}s (attempt {attempt + 1}/{retry_policy.max_attempts})")
+            await asyncio.sleep(delay)
+
+    async def _send_once(self, path, params, data, method, tr_id, priority, tr_cont):
+        """Single HTTP round trip. Returns (Outcome, json, response headers)."""
+        url = f"{self.base_url}{path}"
+        # Queueing on the rate limiter and token lookup both block; keep them off the loop
+        headers = await asyncio.to_thread(self._prepare_request, path, method, tr_id, priority, tr_cont)
+        client = self.get_client()
+        timeout = httpx.Timeout(self.timeout[1], connect=self.timeout[0])
+
+        try:
+            if method == "GET":
+                response = await client.get(url, headers=headers, params=params, timeout=timeout)
+            elif method == "POST":
+                if headers.get("content-type") == "application/json" and data:
+                    response = await client.post(url, headers=headers, json=data, timeout=timeout)
+                elif data:
+                    response = await client.post(url, headers=headers, data=data, timeout=timeout)
+                else:
+                    response = await client.post(url, headers=headers, timeout=timeout)
+            else:
+                raise ValueError(f"Unsupported method: {method}")
+
+            outcome, res_json = self._parse_response(response, path)
+            return outcome, res_json, response.headers
+
+        except httpx.TransportError as e:
+            print(f"[ERROR] Request Exception: {e}")
+            return Outcome.TRANSIENT, None, None
+        except httpx.HTTPError as e:
+            print(f"[ERROR] Request Exception: {e}")
+            return Outcome.ERROR, None, None
+
+
+class AsyncDomesticAPI(AsyncBaseAPI, DomesticAPI):
+    """Awaitable DomesticAPI: get_balance, get_current_price, get_prices, get_account_balance, order_cash.
+    iter_balance_pages() is an async generator."""
+
+
+class AsyncOverseasAPI(AsyncBaseAPI, OverseasAPI):
+    """Awaitable OverseasAPI: get_balance_present, get_balance_realtime, get_current_price, get_prices, order.
+    iter_balance_realtime_pages() is an async generator."""
@@ -1,76 +1,293 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from src.auth.token_manager import get_access_token
-from src.config_loader import get_app_key, get_app_secret, get_base_url, get_account_no, get_account_code
+from src.api.rate_limit import rate_limiter, Priority
+from src.api.cache import response_cache
+from src.api.resilience import retry_policy, circuit_breaker, Outcome
+from src.config_loader import get_app_key, get_app_secret, get_base_url, get_account_no, get_account_code, get_http_config
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10
+
+# tr_cont values in a KIS response header that mean "more data follows"
+MORE_PAGES = ("F", "M")
+# Safety cap so a misbehaving continuation key can't loop forever
+DEFAULT_MAX_PAGES = 100
+
+
+class PaginationError(Exception):
+    """A continuation page failed after earlier pages were already yielded."""
 
 class BaseAPI:
-    def __init__(self):
+    # Shared across every API instance so the TCP+TLS handshake
+    # to the KIS host is paid once per process, not once per call.
+    _session = None
+    _session_lock = threading.Lock()
+
+    def __init__(self, priority=None, allow_stale=True):
+        # Default queue lane for this client's calls (orders always go HIGH)
+        self.priority = priority
+        # False: a failed call returns None instead of the last good cached response
+        self.allow_stale = allow_stale
         self.app_key = get_app_key()
         self.app_secret = get_app_secret()
         self.base_url = get_base_url()
         self.account_no = get_account_no()
         self.account_code = get_account_code()
-        
-    def _get_headers(self, tr_id=None, content_type="application/json"):
+
+        http_config = get_http_config()
+        self.timeout = (
+            float(http_config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)),
+            float(http_config.get("read_timeout", DEFAULT_READ_TIMEOUT)),
+        )
+
+    @classmethod
+    def get_session(cls):
+        """Returns the process-wide pooled keep-alive session (created lazily)."""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    pool_size = int(get_http_config().get("pool_size", DEFAULT_POOL_SIZE))
+                    session = requests.Session()
+                    # requests has no HTTP/2 support; keep-alive pooling is what saves the handshake.
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    BaseAPI._session = session
+        return BaseAPI._session
+
+    @staticmethod
+    def is_available():
+        """False while the KIS circuit breaker is open (calls fail fast)."""
+        return circuit_breaker.is_available()
+
+    @classmethod
+    def close_session(cls):
+        """Closes the shared session. A new one is created on the next call."""
+        with cls._session_lock:
+            if BaseAPI._session is not None:
+                BaseAPI._session.close()
+                BaseAPI._session = None
+
+    def _get_headers(self, tr_id=None, content_type="application/json", tr_cont=None):
         access_token = get_access_token()
         if not access_token:
             raise Exception("Failed to get access token")
-            
+
         headers = {
             "content-type": content_type,
             "authorization": f"Bearer {access_token}",
             "appkey": self.app_key,
             "appsecret": self.app_secret,
         }
-        
+
         if tr_id:
             headers["tr_id"] = tr_id
-            
+        if tr_cont:
+            headers["tr_cont"] = tr_cont
+
         return headers
 
-    def call_api(self, path, params=None, data=None, method="GET", tr_id=None):
-        """Standard API call with error handling."""
+    def _resolve_priority(self, method, priority=None):
+        if priority is not None:
+            return priority
+        if method == "POST":
+            return Priority.HIGH
+        return self.priority if self.priority is not None else Priority.NORMAL
+
+    def _prepare_request(self, path, method="GET", tr_id=None, priority=None, tr_cont=None):
+        """Waits for a rate-limit slot, then returns the request headers."""
+        rate_limiter.acquire(path, self._resolve_priority(method, priority))
+        return self._get_headers(tr_id=tr_id, tr_cont=tr_cont)
+
+    def _parse_response(self, response, path):
+        """
+        Validates an HTTP response. Returns (Outcome, json body or None).
+        Works for any response object exposing status_code, text and json().
+        """
+        # Check for specific API errors in response body even if HTTP 200
+        # KIS API often returns 200 but with error code in body
+        res_json = None
+        try:
+            res_json = response.json()
+        except json.JSONDecodeError:
+             print(f"[WARN] Non-JSON response from {path}: {response.text}")
+             return retry_policy.classify(response.status_code, None), None
+
+        outcome = retry_policy.classify(response.status_code, res_json)
+        if outcome == Outcome.OK:
+            return outcome, res_json
+
+        if response.status_code != 200:
+            print(f"[ERROR] API Call Failed ({response.status_code}): {res_json}")
+        else:
+            # KIS-specific error codes
+            msg = res_json.get("msg1")
+            print(f"[ERROR] Logic Error (rt_cd={res_json.get('rt_cd')}): {msg} in {path}")
+        return outcome, None
+
+    def _record_outcome(self, outcome):
+        """Feeds the circuit breaker. Only transport-level failures count against KIS."""
+        if outcome == Outcome.TRANSIENT:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+
+    def call_api(self, path, params=None, data=None, method="GET", tr_id=None, priority=None):
+        """Standard API call with error handling. Queues on the shared rate limiter."""
+        res_json, _ = self._request(path, params, data, method, tr_id, priority)
+        return res_json
+
+    def iter_pages(self, path, params, tr_id, ctx_keys, priority=None, max_pages=DEFAULT_MAX_PAGES):
+        """
+        Yields each page of a paginated inquiry, following the tr_cont header.
+        ctx_keys: request param names of the continuation pair, e.g. ("CTX_AREA_FK100", "CTX_AREA_NK100").
+        The response echoes them in lower case; they are sent back with tr_cont=N.
+        """
+        tr_cont = None
+        for page_no in range(max_pages):
+            res_json, res_headers = self._request(path, params, None, "GET", tr_id, priority, tr_cont)
+            if res_json is None:
+                if page_no == 0:
+                    return  # Same contract as call_api returning None
+                raise PaginationError(f"Page {page_no + 1} of {path} ({tr_id}) failed")
+            yield res_json
+            params = self._next_page_params(res_json, res_headers, params, ctx_keys)
+            if params is None:
+                return
+            tr_cont = "N"
+        print(f"[WARN] Stopped paging {path} ({tr_id}) after {max_pages} pages")
+
+    def collect_pages(self, path, params, tr_id, ctx_keys, priority=None, max_pages=DEFAULT_MAX_PAGES):
+        """Every page of a paginated inquiry as a list, or None if the first page failed."""
+        pages = list(self.iter_pages(path, params, tr_id, ctx_keys, priority, max_pages))
+        return pages or None
+
+    def _next_page_params(self, res_json, res_headers, params, ctx_keys):
+        """Returns the params for the next page, or None if this was the last one."""
+        if res_headers.get("tr_cont") not in MORE_PAGES:
+            return None
+        params = dict(params)
+        for key in ctx_keys:
+            params[key] = res_json.get(key.lower(), "")
+        return params
+
+    def _request(self, path, params=None, data=None, method="GET", tr_id=None, priority=None, tr_cont=None):
+        """_send behind the TTL response cache (read-only tr_ids only)."""
+        ttl = response_cache.ttl_for(method, tr_id)
+        if not ttl:
+            return self._send(path, params, data, method, tr_id, priority, tr_cont)
+        key = response_cache.make_key(f"{self.base_url}{path}", params, tr_id, tr_cont)
+        result = response_cache.get_or_call(
+            key, ttl, lambda: self._send(path, params, data, method, tr_id, priority, tr_cont))
+        return self._stale_fallback(key, result, path, tr_id)
+
+    def _stale_fallback(self, key, result, path, tr_id):
+        """
+        On failure, serve the last good response (within api.cache.stale_ttl) rather than nothing.
+        Clients created with allow_stale=False (e.g. the snapshot writer) get the failure instead.
+        """
+        if result[0] is not None or not self.allow_stale:
+            return result
+        stale = response_cache.get_stale(key)
+        if stale is None:
+            return result
+        print(f"[WARN] Serving stale cached response for {path} ({tr_id})")
+        return stale
+
+    def _fan_out(self, calls, parse):
+        """
+        Runs independent calls concurrently (bounded by the HTTP pool, paced by the rate limiter).
+        calls: {key: (fn, args)}. Returns ({key: parse(response)}, {key: error message}),
+        so one failing key never fails the whole batch.
+        """
+        results, errors = {}, {}
+        if not calls:
+            return results, errors
+        workers = min(len(calls), int(get_http_config().get("pool_size", DEFAULT_POOL_SIZE)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kis-fanout") as pool:
+            futures = {key: pool.submit(fn, *args) for key, (fn, args) in calls.items()}
+            for key, future in futures.items():
+                try:
+                    self._collect(key, future.result(), parse, results, errors)
+                except Exception as e:
+                    errors[key] = str(e)
+        return results, errors
+
+    @staticmethod
+    def _collect(key, res, parse, results, errors):
+        if res is None:
+            errors[key] = "KIS request failed"
+            return
+        try:
+            results[key] = parse(res)
+        except (KeyError, TypeError, ValueError) as e:
+            errors[key] = f"Unparseable response: {e}"
+
+    def _send(self, path, params=None, data=None, method="GET", tr_id=None, priority=None, tr_cont=None):
+        """
+        Performs one logical request with bounded retries.
+        Returns (json, response headers), or (None, None) on error or while the breaker is open.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if not circuit_breaker.allow_request():
+                print(f"[WARN] KIS circuit open, skipping {path} ({tr_id})")
+                return None, None
+
+            try:
+                outcome, res_json, res_headers = self._send_once(path, params, data, method, tr_id, priority, tr_cont)
+            except Exception:
+                # e.g. no access token: no answer from KIS counts as a failure
+                circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled: no outcome, but a half-open probe slot must not stay taken
+                circuit_breaker.release_trial()
+                raise
+            self._record_outcome(outcome)
+            if outcome == Outcome.OK:
+                return res_json, res_headers
+            if not retry_policy.should_retry(outcome, method, attempt):
+                return None, None
+
+            delay = retry_policy.delay(attempt)
+            print(f"[WARN] Retrying {path} ({tr_id}) in {delay:.2f}s (attempt {attempt + 1}/{retry_policy.max_attempts})")
+            time.sleep(delay)
+
+    def _send_once(self, path, params, data, method, tr_id, priority, tr_cont):
+        """Single HTTP round trip. Returns (Outcome, json, response headers)."""
         url = f"{self.base_url}{path}"
-        headers = self._get_headers(tr_id=tr_id)
-        
+        headers = self._prepare_request(path, method, tr_id, priority, tr_cont)
+        session = self.get_session()
+
         try:
             if method == "GET":
-                response = requests.get(url, headers=headers, params=params)
+                response = session.get(url, headers=headers, params=params, timeout=self.timeout)
             elif method == "POST":
                 # POST usually takes JSON body
                 if headers.get("content-type") == "application/json" and data:
-                    response = requests.post(url, headers=headers, json=data)
+                    response = session.post(url, headers=headers, json=data, timeout=self.timeout)
                 elif data:
                      # Form data if not JSON
-                    response = requests.post(url, headers=headers, data=data)
+                    response = session.post(url, headers=headers, data=data, timeout=self.timeout)
                 else:
-                    response = requests.post(url, headers=headers)
+                    response = session.post(url, headers=headers, timeout=self.timeout)
             else:
                 raise ValueError(f"Unsupported method: {method}")
 
-            # Check for specific API errors in response body even if HTTP 200
-            # KIS API often returns 200 but with error code in body
-            res_json = None
-            try:
-                res_json = response.json()
-            except json.JSONDecodeError:
-                 print(f"[WARN] Non-JSON response from {path}: {response.text}")
-                 return None
-
-            if response.status_code != 200:
-                print(f"[ERROR] API Call Failed ({response.status_code}): {res_json}")
-                return None
-            
-            # Check KIS-specific error codes
-            rt_cd = res_json.get("rt_cd")
-            if rt_cd and rt_cd != "0":
-                msg = res_json.get("msg1")
-                print(f"[ERROR] Logic Error (rt_cd={rt_cd}): {msg} in {path}")
-                return None
-                
-            return res_json
+            outcome, res_json = self._parse_response(response, path)
+            return outcome, res_json, response.headers
 
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            print(f"[ERROR] Request Exception: {e}")
+            return Outcome.TRANSIENT, None, None
         except requests.exceptions.RequestException as e:
             print(f"[ERROR] Request Exception: {e}")
-            return None
+            return Outcome.ERROR, None, None
@@ -0,0 +1,204 @@
+"""
+TTL response cache with single-flight coalescing for read-only KIS calls.
+
+Entries are keyed on (url, params, tr_id, tr_cont) and expire after a
+per-tr_id TTL. Concurrent identical requests share one in-flight call
+instead of each hitting KIS. Cached responses are shared between callers
+and must be treated as read-only.
+"""
+import asyncio
+import threading
+import time
+
+from src.config_loader import config_service, get_cache_config
+
+# Order tr_ids (real + VTS). These are never cached, whatever the config says.
+ORDER_TR_IDS = frozenset({
+    "TTTC0802U", "TTTC0801U",   # Domestic buy / sell
+    "VTTC0802U", "VTTC0801U",   # Domestic buy / sell (VTS)
+    "JTTT1002U", "JTTT1006U",   # Overseas (US) buy / sell
+    "VTTT1002U", "VTTT1001U",   # Overseas (US) buy / sell (VTS)
+})
+
+# Seconds per read-only tr_id when settings.yaml has no api.cache.ttl section
+DEFAULT_TTLS = {
+    "CTRP6548R": 10,        # Integrated account balance
+    "CTRP6504R": 10,        # Overseas present balance
+    "TTTC8434R": 10,        # Domestic balance
+    "TTZC3013R": 10,        # Overseas realtime balance
+    "FHKST01010100": 2,     # Domestic current price
+    "HHDFS00000300": 2,     # Overseas current price
+}
+DEFAULT_MAX_ENTRIES = 256
+# How long an expired entry may still be served when KIS is failing
+DEFAULT_STALE_TTL = 300
+
+
+class _Flight:
+    """An in-progress call that other threads can wait on."""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _LeaderCancelled(Exception):
+    """Set on an async flight whose leading caller was cancelled; followers retry."""
+
+
+class ResponseCache:
+    def __init__(self, config=None):
+        self.configure(config)
+        self._entries = {}          # key -> (expires_at, stored_at, (res_json, headers))
+        self._inflight = {}         # key -> _Flight (threads)
+        self._async_inflight = {}   # key -> asyncio.Future (event loop)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_served = 0
+
+    def configure(self, config=None):
+        """Applies api.cache (on startup and on config reload). Existing entries keep their expiry."""
+        config = config or {}
+        self.ttls = {**DEFAULT_TTLS, **(config.get("ttl") or {})}
+        self.max_entries = int(config.get("max_entries", DEFAULT_MAX_ENTRIES))
+        self.stale_ttl = float(config.get("stale_ttl", DEFAULT_STALE_TTL))
+
+    def ttl_for(self, method, tr_id):
+        """TTL in seconds for a request, or 0 if it must not be cached."""
+        if method != "GET" or not tr_id or tr_id in ORDER_TR_IDS:
+            return 0
+        return self.ttls.get(tr_id, 0)
+
+    @staticmethod
+    def make_key(url, params, tr_id, tr_cont=None):
+        return (url, tuple(sorted((params or {}).items())), tr_id, tr_cont or "")
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            self.hits += 1
+            return entry[2]
+        return None
+
+    def _store(self, key, ttl, result):
+        # Only successful responses are cached; errors must be retried by the next caller
+        if result is None or result[0] is None:
+            return
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + ttl, now, result)
+        if len(self._entries) > self.max_entries:
+            for dead in [k for k, (_, stored, _) in self._entries.items() if now - stored >= self.stale_ttl]:
+                del self._entries[dead]
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def get_or_call(self, key, ttl, fn):
+        """Returns a fresh cached result, joins an identical in-flight call, or runs fn()."""
+        with self._lock:
+            cached = self._lookup(key, time.monotonic())
+            if cached is not None:
+                return cached
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._store(key, ttl, flight.result)
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    async def aget_or_call(self, key, ttl, coro_fn):
+        """Async counterpart of get_or_call; coalesces callers on the same event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                cached = self._lookup(key, time.monotonic())
+                if cached is not None:
+                    return cached
+                future = self._async_inflight.get(key)
+                leader = future is None or future.get_loop() is not loop
+                if leader:
+                    future = loop.create_future()
+                    self._async_inflight[key] = future
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                break
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # The flight is gone; the first follower back leads the retry
+                continue
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            # Only the leader was cancelled, not the followers' requests
+            future.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            future.exception()  # Mark retrieved; followers (if any) still see it
+            raise
+        finally:
+            with self._lock:
+                if self._async_inflight.get(key) is future:
+                    del self._async_inflight[key]
+        with self._lock:
+            self._store(key, ttl, result)
+        future.set_result(result)
+        return result
+
+    def get_stale(self, key):
+        """Last good result for key, even if expired, as long as it is within stale_ttl."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] < self.stale_ttl:
+                self.stale_served += 1
+                return entry[2]
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "stale_served": self.stale_served,
+                "in_flight": len(self._inflight) + len(self._async_inflight),
+            }
+
+
+# Singleton instance
+response_cache = ResponseCache(get_cache_config())
+config_service.on_reload(lambda config: response_cache.configure(config.api.cache))
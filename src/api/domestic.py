@@ -1,21 +1,46 @@
 from src.api.base import BaseAPI
 from src.config_loader import get_account_no, get_account_code
 
+def parse_domestic_quote(res):
+    """Compact quote from an FHKST01010100 response."""
+    out = res["output"]
+    return {
+        "price": float(out["stck_prpr"]),
+        "change": float(out.get("prdy_vrss") or 0),
+        "change_rate": float(out.get("prdy_ctrt") or 0),
+        "volume": float(out.get("acml_vol") or 0),
+    }
+
+
 class DomesticAPI(BaseAPI):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, priority=None, allow_stale=True):
+        super().__init__(priority=priority, allow_stale=allow_stale)
         self.cano = get_account_no()
         self.acnt_prdt_cd = get_account_code()
 
     def get_balance(self):
-        """Domestic Stock Balance Inquiry (TTTC8434R)"""
+        """Domestic Stock Balance Inquiry (TTTC8434R) - first page only"""
         path = "/uapi/domestic-stock/v1/trading/inquire-balance"
         tr_id = "TTTC8434R"
         
         # Check if virtual trading? (Base URL handles it but TR_ID might differ)
         # For now assume real trading
         
-        params = {
+        return self.call_api(path, params=self._balance_params(), tr_id=tr_id)
+
+    def iter_balance_pages(self):
+        """
+        Domestic Stock Balance Inquiry (TTTC8434R), one page at a time.
+        Follows tr_cont + CTX_AREA_FK100/NK100 so large accounts aren't truncated.
+        """
+        path = "/uapi/domestic-stock/v1/trading/inquire-balance"
+        tr_id = "TTTC8434R"
+
+        return self.iter_pages(path, self._balance_params(), tr_id=tr_id,
+                               ctx_keys=("CTX_AREA_FK100", "CTX_AREA_NK100"))
+
+    def _balance_params(self):
+        return {
             "CANO": self.cano,
             "ACNT_PRDT_CD": self.acnt_prdt_cd,
             "AFHR_FLPR_YN": "N",
@@ -28,8 +53,6 @@ class DomesticAPI(BaseAPI):
             "CTX_AREA_FK100": "",
             "CTX_AREA_NK100": ""
         }
-        
-        return self.call_api(path, params=params, tr_id=tr_id)
 
     def get_current_price(self, code):
         """Domestic Stock Current Price Inquiry (FHKST01010100)"""
@@ -43,6 +66,14 @@ class DomesticAPI(BaseAPI):
         
         return self.call_api(path, params=params, tr_id=tr_id)
 
+    def get_prices(self, codes):
+        """
+        Current prices for many domestic codes, fetched concurrently (FHKST01010100 each).
+        Returns (quotes, errors): {code: quote dict}, {code: error message}.
+        """
+        calls = {code: (self.get_current_price, (code,)) for code in dict.fromkeys(codes)}
+        return self._fan_out(calls, parse_domestic_quote)
+
     def order_cash(self, code, quantity, price, side="BUY"):
         """
         Domestic Stock Cash Order
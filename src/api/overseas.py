@@ -1,9 +1,75 @@
 from src.api.base import BaseAPI
-from src.config_loader import get_account_no, get_account_code
+from src.api.responses import decode_overseas_balance
+from src.config_loader import get_account_no, get_account_code, get_overseas_markets
+
+# The quotation API uses its own 3-letter exchange codes (order/balance use NASD, NYSE, ...)
+PRICE_EXCHANGE_CODES = {
+    "NASD": "NAS", "NYSE": "NYS", "AMEX": "AMS",
+    "SEHK": "HKS", "TKSE": "TSE", "SHAA": "SHS", "SZAA": "SZS",
+    "HASE": "HSX", "VNSE": "HNX",
+}
+
+# (exchange, currency) pairs queried for holdings when settings.yaml has no api.overseas_markets.
+# US only: a market the account can't trade fails the query, and any failed market aborts the snapshot
+DEFAULT_OVERSEAS_MARKETS = (
+    ("NASD", "USD"), ("NYSE", "USD"), ("AMEX", "USD"),
+)
+
+
+def configured_markets():
+    markets = get_overseas_markets()
+    if not markets:
+        return DEFAULT_OVERSEAS_MARKETS
+    return tuple((m["exchange"], m.get("currency", "USD")) for m in markets)
+
+
+def decode_balance_pages(pages):
+    """Flattens every TTZC3013R page of one market into OverseasBalanceHolding records."""
+    return [h for page in pages for h in decode_overseas_balance(page)]
+
+
+def merge_overseas_holdings(by_market):
+    """
+    Merges get_holdings_by_market() results into one holding per (symbol, currency).
+    The same position can come back from several queries (NASD covers all US
+    exchanges on real accounts); the row's own ovrs_excg_cd wins over the
+    exchange it was queried under.
+    """
+    merged = {}
+    inferred = set()  # Keys whose exchange came from the query, not the row
+    for (exchange, currency), holdings in by_market.items():
+        for h in holdings:
+            if h.quantity <= 0:
+                continue
+            h.currency = h.currency or currency
+            key = (h.symbol, h.currency)
+            if key in merged and key not in inferred:
+                continue
+            if h.exchange:
+                inferred.discard(key)
+            elif key in merged:
+                continue
+            else:
+                h.exchange = exchange
+                inferred.add(key)
+            merged[key] = h
+    return list(merged.values())
+
+
+def parse_overseas_quote(res):
+    """Compact quote from an HHDFS00000300 response."""
+    out = res["output"]
+    return {
+        "price": float(out["last"]),
+        "change": float(out.get("diff") or 0),
+        "change_rate": float(out.get("rate") or 0),
+        "volume": float(out.get("tvol") or 0),
+    }
+
 
 class OverseasAPI(BaseAPI):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, priority=None, allow_stale=True):
+        super().__init__(priority=priority, allow_stale=allow_stale)
         self.cano = get_account_no()
         self.acnt_prdt_cd = get_account_code()
 
@@ -24,11 +90,45 @@ class OverseasAPI(BaseAPI):
         return self.call_api(path, params=params, tr_id=tr_id)
 
     def get_balance_realtime(self, exchange="NASD", currency="USD"):
-        """Overseas Stock Realtime Balance Inquiry (TTZC3013R)"""
+        """Overseas Stock Realtime Balance Inquiry (TTZC3013R) - first page only"""
         path = "/uapi/overseas-stock/v1/trading/inquire-balance"
         tr_id = "TTZC3013R"
         
-        params = {
+        return self.call_api(path, params=self._balance_realtime_params(exchange, currency), tr_id=tr_id)
+
+    def iter_balance_realtime_pages(self, exchange="NASD", currency="USD"):
+        """
+        Overseas Stock Realtime Balance Inquiry (TTZC3013R), one page at a time.
+        Follows tr_cont + CTX_AREA_FK200/NK200 so large accounts aren't truncated.
+        """
+        path = "/uapi/overseas-stock/v1/trading/inquire-balance"
+        tr_id = "TTZC3013R"
+
+        return self.iter_pages(path, self._balance_realtime_params(exchange, currency), tr_id=tr_id,
+                               ctx_keys=("CTX_AREA_FK200", "CTX_AREA_NK200"))
+
+    def get_balance_realtime_all(self, exchange="NASD", currency="USD"):
+        """Every TTZC3013R page for one exchange/currency (None if the first page failed)."""
+        path = "/uapi/overseas-stock/v1/trading/inquire-balance"
+        tr_id = "TTZC3013R"
+
+        return self.collect_pages(path, self._balance_realtime_params(exchange, currency), tr_id=tr_id,
+                                  ctx_keys=("CTX_AREA_FK200", "CTX_AREA_NK200"))
+
+    def get_holdings_by_market(self, markets=None):
+        """
+        Holdings for every configured (exchange, currency) pair, queried concurrently.
+        Returns (holdings, errors): {(exchange, currency): [OverseasBalanceHolding]},
+        {(exchange, currency): error message}. Combine with merge_overseas_holdings().
+        """
+        calls = {
+            (exchange, currency): (self.get_balance_realtime_all, (exchange, currency))
+            for exchange, currency in (markets or configured_markets())
+        }
+        return self._fan_out(calls, decode_balance_pages)
+
+    def _balance_realtime_params(self, exchange, currency):
+        return {
             "CANO": self.cano,
             "ACNT_PRDT_CD": self.acnt_prdt_cd,
             "OVRS_EXCG_CD": exchange,
@@ -36,9 +136,32 @@ class OverseasAPI(BaseAPI):
             "CTX_AREA_FK200": "",
             "CTX_AREA_NK200": ""
         }
-        
+
+    def get_current_price(self, symbol, exchange="NASD"):
+        """Overseas Stock Current Price Inquiry (HHDFS00000300)"""
+        path = "/uapi/overseas-price/v1/quotations/price"
+        tr_id = "HHDFS00000300"
+
+        params = {
+            "AUTH": "",
+            "EXCD": PRICE_EXCHANGE_CODES.get(exchange, exchange),
+            "SYMB": symbol
+        }
+
         return self.call_api(path, params=params, tr_id=tr_id)
 
+    def get_prices(self, symbols, exchange="NASD"):
+        """
+        Current prices for many overseas symbols, fetched concurrently (HHDFS00000300 each).
+        symbols: iterable of symbols (all on `exchange`) or of (symbol, exchange) pairs.
+        Returns (quotes, errors): {symbol: quote dict}, {symbol: error message}.
+        """
+        calls = {}
+        for entry in symbols:
+            symbol, excg = entry if isinstance(entry, (tuple, list)) else (entry, exchange)
+            calls[symbol] = (self.get_current_price, (symbol, excg))
+        return self._fan_out(calls, parse_overseas_quote)
+
     def order(self, symbol, quantity, price, side="BUY", exchange="NASD"):
         """
         Overseas Stock Order (USA)
@@ -0,0 +1,157 @@
+"""
+Process-wide rate limiting for KIS API calls.
+
+KIS throttles per app key, so every call from the scheduler, the strategy
+job and the web routes draws from the same token buckets. Callers that
+arrive when a bucket is empty are queued (not rejected) and served in
+priority order, so orders go out ahead of dashboard refreshes.
+"""
+import enum
+import heapq
+import itertools
+import threading
+import time
+
+from src.config_loader import config_service, get_rate_limit_config
+
+QUOTATION = "quotation"
+TRADING = "trading"
+
+# Requests per second / burst size when settings.yaml has no api.rate_limit section
+DEFAULT_LIMITS = {
+    QUOTATION: {"rate": 15, "burst": 15},
+    TRADING: {"rate": 5, "burst": 5},
+}
+
+
+class Priority(enum.IntEnum):
+    """Queue lanes. Lower value is served first."""
+    HIGH = 0     # Orders
+    NORMAL = 1   # Scheduler snapshots, strategy checks
+    LOW = 2      # Dashboard refreshes
+
+
+def classify_endpoint(path):
+    """Maps a KIS path to its rate-limit class (quotation vs trading)."""
+    return QUOTATION if "/quotations/" in path else TRADING
+
+
+class TokenBucket:
+    """Thread-safe token bucket with a priority-ordered wait queue."""
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority, seq) tickets
+        self._seq = itertools.count()
+
+        # Metrics
+        self.acquired = {p.name: 0 for p in Priority}
+        self.queued = 0            # Acquisitions that had to wait
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    def set_limits(self, rate, burst):
+        """Changes rate/burst in place; queued callers keep their place."""
+        with self._cond:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            self.capacity = float(burst)
+            self.tokens = min(self.tokens, self.capacity)
+            self._cond.notify_all()
+
+    def acquire(self, priority=Priority.NORMAL):
+        """Blocks until a token is available for this caller. Returns seconds waited."""
+        start = time.monotonic()
+        ticket = (int(priority), next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill(time.monotonic())
+                    if self._waiters[0] == ticket:
+                        if self.tokens >= 1:
+                            heapq.heappop(self._waiters)
+                            self.tokens -= 1
+                            break
+                        # Head of the queue: sleep until the next token drips in
+                        self._cond.wait((1 - self.tokens) / self.rate)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                raise
+            finally:
+                # Let the next ticket re-check the head of the queue
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.acquired[Priority(ticket[0]).name] += 1
+            if waited > 0.001:
+                self.queued += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+        return waited
+
+    def get_metrics(self):
+        with self._cond:
+            depth = {p.name: 0 for p in Priority}
+            for prio, _ in self._waiters:
+                depth[Priority(prio).name] += 1
+            total = sum(self.acquired.values())
+            return {
+                "rate": self.rate,
+                "burst": self.capacity,
+                "tokens": round(self.tokens, 2),
+                "queue_depth": len(self._waiters),
+                "queue_depth_by_priority": depth,
+                "acquired": total,
+                "acquired_by_priority": dict(self.acquired),
+                "queued": self.queued,
+                "avg_wait_sec": round(self.total_wait / total, 4) if total else 0.0,
+                "max_wait_sec": round(self.max_wait, 4),
+            }
+
+
+class RateLimiter:
+    """One token bucket per endpoint class, shared by every KIS call in the process."""
+
+    def __init__(self, config=None):
+        self.buckets = {}
+        self.configure(config)
+
+    def configure(self, config=None):
+        """Applies api.rate_limit (on startup and on config reload)."""
+        config = config or {}
+        for name, defaults in DEFAULT_LIMITS.items():
+            limits = {**defaults, **(config.get(name) or {})}
+            if name in self.buckets:
+                self.buckets[name].set_limits(limits["rate"], limits["burst"])
+            else:
+                self.buckets[name] = TokenBucket(name, limits["rate"], limits["burst"])
+
+    def acquire(self, path, priority=Priority.NORMAL):
+        """Waits for a slot on the bucket that serves `path`. Returns seconds waited."""
+        return self.buckets[classify_endpoint(path)].acquire(priority)
+
+    def get_metrics(self):
+        return {name: bucket.get_metrics() for name, bucket in self.buckets.items()}
+
+
+# Singleton instance
+rate_limiter = RateLimiter(get_rate_limit_config())
+config_service.on_reload(lambda config: rate_limiter.configure(config.api.rate_limit))
@@ -0,0 +1,326 @@
+"""
+Realtime price streaming from the KIS WebSocket feed.
+
+RealtimeClient keeps one WebSocket session open on a background thread.
+It subscribes to domestic (H0STCNT0) and overseas (HDFSCNT0) execution
+feeds and writes every tick into a PriceTable. The dashboard and
+run_strategy read that table in O(1) instead of polling REST endpoints.
+
+- Approval key: issued once per session via /oauth2/Approval.
+- Resubscription: every subscription is replayed after a reconnect.
+- Backpressure: frames go through a bounded queue. When the parser falls
+  behind, the oldest frames are dropped, since only the latest price matters.
+
+To test offline, point it at scripts/fake_kis/ws_replay.py:
+    RealtimeClient(url="ws://127.0.0.1:21000", approval_key="test")
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+
+import websockets
+
+from src.api.base import BaseAPI
+from src.api.overseas import PRICE_EXCHANGE_CODES
+from src.config_loader import get_realtime_config
+
+DEFAULT_WS_URL = "ws://ops.koreainvestment.com:21000"
+DEFAULT_QUEUE_SIZE = 1000
+MAX_SUBSCRIPTIONS = 41  # KIS limit per WebSocket session
+MAX_RECONNECT_DELAY = 30.0
+
+DOMESTIC_TR_ID = "H0STCNT0"   # 국내주식 실시간체결가
+OVERSEAS_TR_ID = "HDFSCNT0"   # 해외주식 실시간지연체결가
+
+# (symbol, price, change_rate, volume) field positions per record
+FIELD_MAP = {
+    DOMESTIC_TR_ID: (0, 2, 5, 13),    # MKSC_SHRN_ISCD, STCK_PRPR, PRDY_CTRT, ACML_VOL
+    OVERSEAS_TR_ID: (1, 11, 14, 20),  # SYMB, LAST, RATE, TVOL
+}
+
+
+class LatestPrice:
+    __slots__ = ("symbol", "price", "change_rate", "volume", "updated_at")
+
+    def __init__(self, symbol, price, change_rate, volume, updated_at):
+        self.symbol = symbol
+        self.price = price
+        self.change_rate = change_rate
+        self.volume = volume
+        self.updated_at = updated_at
+
+    def to_dict(self):
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "change_rate": self.change_rate,
+            "volume": self.volume,
+            "updated_at": self.updated_at,
+        }
+
+
+class PriceTable:
+    """Latest tick per symbol. Single writer (the stream thread), lock-free O(1) reads."""
+
+    def __init__(self):
+        self._prices = {}
+
+    def update(self, symbol, price, change_rate, volume):
+        # Replacing the whole entry keeps readers from ever seeing a half-written tick
+        self._prices[symbol] = LatestPrice(symbol, price, change_rate, volume, time.time())
+
+    def get(self, symbol, max_age=None):
+        """Latest price for symbol, or None if unknown (or older than max_age seconds)."""
+        entry = self._prices.get(symbol)
+        if entry is None or (max_age is not None and time.time() - entry.updated_at > max_age):
+            return None
+        return entry
+
+    def snapshot(self):
+        return {symbol: entry.to_dict() for symbol, entry in list(self._prices.items())}
+
+    def __len__(self):
+        return len(self._prices)
+
+
+def issue_approval_key():
+    """Issues a WebSocket approval key (/oauth2/Approval)."""
+    api = BaseAPI()
+    res = api.get_session().post(
+        f"{api.base_url}/oauth2/Approval",
+        headers={"content-type": "application/json"},
+        json={"grant_type": "client_credentials", "appkey": api.app_key, "secretkey": api.app_secret},
+        timeout=api.timeout,
+    )
+    res.raise_for_status()
+    key = res.json().get("approval_key")
+    if not key:
+        raise Exception(f"Approval response missing approval_key: {res.text}")
+    return key
+
+
+def overseas_tr_key(symbol, exchange="NASD"):
+    """HDFSCNT0 key: 'D' (delayed, no paid feed) + quotation exchange code + symbol."""
+    return f"D{PRICE_EXCHANGE_CODES.get(exchange, exchange)}{symbol}"
+
+
+class RealtimeClient:
+    def __init__(self, url=None, approval_key=None, table=None, queue_size=None, record_path=None):
+        config = get_realtime_config()
+        self.url = url or config.get("ws_url", DEFAULT_WS_URL)
+        self.table = table if table is not None else price_table
+        self.queue_size = int(queue_size or config.get("queue_size", DEFAULT_QUEUE_SIZE))
+        self.record_path = record_path  # Append raw frames here for later replay
+        self._fixed_approval_key = approval_key
+        self._approval_key = approval_key
+
+        self._subscriptions = {}  # (tr_id, tr_key) -> True, in subscription order
+        self._loop = None
+        self._ws = None
+        self._thread = None
+        self._stopping = False
+
+        # Metrics
+        self.connected = False
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.last_frame_at = None
+        self.last_error = None
+
+    # ── Subscriptions (callable from any thread) ──
+
+    def subscribe_domestic(self, code):
+        self._subscribe(DOMESTIC_TR_ID, code)
+
+    def subscribe_overseas(self, symbol, exchange="NASD"):
+        self._subscribe(OVERSEAS_TR_ID, overseas_tr_key(symbol, exchange))
+
+    def _subscribe(self, tr_id, tr_key):
+        if (tr_id, tr_key) in self._subscriptions:
+            return
+        if len(self._subscriptions) >= MAX_SUBSCRIPTIONS:
+            print(f"[WARN] Realtime subscription limit ({MAX_SUBSCRIPTIONS}) reached; ignoring {tr_key}")
+            return
+        self._subscriptions[(tr_id, tr_key)] = True
+        if self._loop is not None and self.connected:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(tr_id, tr_key), self._loop)
+
+    # ── Lifecycle ──
+
+    def start(self):
+        """Starts streaming on a daemon thread (returns immediately)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._thread_main, name="kis-realtime", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self.run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def run(self):
+        """Connect, (re)subscribe and stream until stop(); reconnects with backoff."""
+        delay = 1.0
+        while not self._stopping:
+            try:
+                approval_key = self._fixed_approval_key or await asyncio.to_thread(issue_approval_key)
+                self._approval_key = approval_key
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    delay = 1.0
+                    for tr_id, tr_key in list(self._subscriptions):
+                        await self._send_subscribe(tr_id, tr_key)
+                    await self._stream(ws)
+            except Exception as e:
+                self.last_error = str(e)
+                if not self._stopping:
+                    print(f"[WARN] Realtime stream error: {e}")
+            finally:
+                self.connected = False
+                self._ws = None
+
+            if self._stopping:
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def _send_subscribe(self, tr_id, tr_key):
+        await self._ws.send(json.dumps({
+            "header": {
+                "approval_key": self._approval_key,
+                "custtype": "P",
+                "tr_type": "1",  # 1: register, 2: unregister
+                "content-type": "utf-8",
+            },
+            "body": {"input": {"tr_id": tr_id, "tr_key": tr_key}},
+        }))
+
+    # ── Stream processing ──
+
+    async def _stream(self, ws):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        parser = asyncio.create_task(self._parse_loop(queue))
+        record = open(self.record_path, "a", encoding="utf-8") if self.record_path else None
+        try:
+            async for raw in ws:
+                if isinstance(raw, bytes):
+                    raw = raw.decode("utf-8")
+                if record:
+                    record.write(raw.replace("\n", " ") + "\n")
+
+                if raw[:1] in ("0", "1"):
+                    self.frames_received += 1
+                    self.last_frame_at = time.time()
+                    if queue.full():
+                        # Backpressure: drop the oldest tick, the newer one supersedes it
+                        queue.get_nowait()
+                        self.frames_dropped += 1
+                    queue.put_nowait(raw)
+                else:
+                    await self._handle_control(ws, raw)
+        finally:
+            parser.cancel()
+            if record:
+                record.close()
+
+    async def _handle_control(self, ws, raw):
+        """JSON control messages: PINGPONG keep-alives and subscribe acknowledgements."""
+        try:
+            msg = json.loads(raw)
+        except json.JSONDecodeError:
+            print(f"[WARN] Unexpected realtime message: {raw[:200]}")
+            return
+        header = msg.get("header", {})
+        if header.get("tr_id") == "PINGPONG":
+            await ws.send(raw)
+            return
+        body = msg.get("body", {})
+        if body.get("rt_cd") not in (None, "0"):
+            print(f"[ERROR] Realtime subscribe failed ({header.get('tr_key')}): {body.get('msg1')}")
+
+    async def _parse_loop(self, queue):
+        while True:
+            raw = await queue.get()
+            try:
+                self.handle_frame(raw)
+            except (ValueError, IndexError) as e:
+                print(f"[WARN] Bad realtime frame ({e}): {raw[:120]}")
+
+    def handle_frame(self, raw):
+        """Parses one data frame ('0|TR_ID|count|f0^f1^...') into the price table."""
+        encrypted, tr_id, count, payload = raw.split("|", 3)
+        fields_map = FIELD_MAP.get(tr_id)
+        if encrypted == "1" or fields_map is None:
+            return  # Execution notices (encrypted) and unknown feeds are not price ticks
+        fields = payload.split("^")
+        count = int(count)
+        width = len(fields) // count
+        sym_i, price_i, rate_i, vol_i = fields_map
+        for n in range(count):
+            rec = fields[n * width:(n + 1) * width]
+            self.table.update(
+                rec[sym_i],
+                float(rec[price_i]),
+                float(rec[rate_i] or 0),
+                float(rec[vol_i] or 0),
+            )
+
+    def get_metrics(self):
+        return {
+            "connected": self.connected,
+            "subscriptions": len(self._subscriptions),
+            "symbols": len(self.table),
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "reconnects": self.reconnects,
+            "last_frame_at": self.last_frame_at,
+            "last_error": self.last_error,
+        }
+
+
+# Singleton instances
+price_table = PriceTable()
+realtime_client = None
+
+
+def start_realtime_stream():
+    """Starts the shared stream for the symbols in api.realtime (no-op unless enabled)."""
+    global realtime_client
+    config = get_realtime_config()
+    if not config.get("enabled"):
+        return None
+    if realtime_client is None:
+        realtime_client = RealtimeClient()
+        for code in config.get("domestic") or []:
+            realtime_client.subscribe_domestic(str(code))
+        for item in config.get("overseas") or []:
+            realtime_client.subscribe_overseas(item["symbol"], item.get("exchange", "NASD"))
+    realtime_client.start()
+    return realtime_client
+
+
+def stop_realtime_stream():
+    if realtime_client is not None:
+        realtime_client.stop()
+
+
+def get_latest_price(symbol, max_age=None):
+    """O(1) lookup of the latest streamed price (LatestPrice or None)."""
+    return price_table.get(symbol, max_age)
@@ -0,0 +1,170 @@
+"""
+Retry/backoff policy and circuit breaker for the KIS transport.
+
+Every response is classified into an Outcome. Transient failures are
+retried with jittered exponential backoff, and a run of them opens the
+circuit breaker. While the breaker is open, calls fail fast instead of
+waiting on a broker that is down.
+"""
+import enum
+import random
+import threading
+import time
+
+from src.config_loader import config_service, get_retry_config, get_circuit_breaker_config
+
+# KIS msg_cd values that mean "try again shortly"
+DEFAULT_RETRY_MSG_CODES = (
+    "EGW00201",  # 초당 거래건수를 초과하였습니다 (rate limit exceeded)
+)
+
+
+class Outcome(enum.Enum):
+    OK = "ok"
+    ERROR = "error"            # Permanent (bad params, business-rule rejection); never retried
+    THROTTLED = "throttled"    # KIS is up but asked us to slow down; retried, breaker unaffected
+    TRANSIENT = "transient"    # 5xx, timeout, connection reset; retried and counted by the breaker
+
+
+class RetryPolicy:
+    def __init__(self, config=None):
+        self.configure(config)
+
+    def configure(self, config=None):
+        config = config or {}
+        self.max_attempts = max(1, int(config.get("max_attempts", 3)))
+        self.base_delay = float(config.get("base_delay", 0.5))
+        self.max_delay = float(config.get("max_delay", 4.0))
+        self.retry_msg_codes = frozenset(config.get("retry_msg_codes") or DEFAULT_RETRY_MSG_CODES)
+
+    def classify(self, status_code, res_json):
+        """Outcome of a KIS HTTP response (res_json may be None for non-JSON bodies)."""
+        msg_cd = (res_json or {}).get("msg_cd")
+        if msg_cd in self.retry_msg_codes:
+            return Outcome.THROTTLED
+        if status_code >= 500:
+            return Outcome.TRANSIENT
+        if status_code != 200 or res_json is None:
+            return Outcome.ERROR
+        rt_cd = res_json.get("rt_cd")
+        if rt_cd and rt_cd != "0":
+            return Outcome.ERROR
+        return Outcome.OK
+
+    def should_retry(self, outcome, method, attempt):
+        if attempt >= self.max_attempts:
+            return False
+        if outcome == Outcome.THROTTLED:
+            # The gateway rejected the request outright, so even an order is safe to resend
+            return True
+        # Only idempotent inquiries are retried after a transport failure
+        return outcome == Outcome.TRANSIENT and method == "GET"
+
+    def delay(self, attempt):
+        """Full-jitter exponential backoff for the given (1-based) attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, config=None):
+        self.configure(config)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.times_opened = 0
+        self.rejected = 0
+
+    def configure(self, config=None):
+        config = config or {}
+        self.failure_threshold = int(config.get("failure_threshold", 5))
+        self.reset_timeout = float(config.get("reset_timeout", 30))
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def is_available(self):
+        """False while KIS calls are being short-circuited; callers should use cached data."""
+        return self.state != self.OPEN
+
+    def allow_request(self):
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # A probe that never reported back (lost thread, missed release) expires
+            if state == self.HALF_OPEN and (not self._trial_in_flight
+                                            or now - self._trial_started >= self.reset_timeout):
+                # Let exactly one probe through to see whether KIS is back
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def release_trial(self):
+        """
+        Ends a guarded call that recorded no outcome (e.g. it was cancelled),
+        so the next caller can probe. No-op once record_* has run.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"[WARN] KIS circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_metrics(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_in_sec": round(max(0.0, self.reset_timeout - (now - self._opened_at)), 1)
+                                if state == self.OPEN else 0.0,
+            }
+
+
+# Singleton instances
+retry_policy = RetryPolicy(get_retry_config())
+circuit_breaker = CircuitBreaker(get_circuit_breaker_config())
+
+
+@config_service.on_reload
+def _apply_config(config):
+    retry_policy.configure(config.api.retry)
+    circuit_breaker.configure(config.api.circuit_breaker)
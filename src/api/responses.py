@@ -0,0 +1,196 @@
+"""
+Typed decoders for KIS balance responses.
+
+Each decode_* function turns one tr_id's raw JSON into compact slot-based
+records with numbers already converted, so the snapshot job and the
+dashboard read fields once instead of re-parsing output1/output2 with
+scattered float(item.get(...)) calls. Decoders keep every row; callers
+decide what to skip (e.g. quantity == 0).
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+def to_float(value, default=0.0):
+    """KIS sends numbers as strings, sometimes empty; anything unparseable becomes default."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# ── TTTC8434R: Domestic balance ──
+
+@dataclass(slots=True)
+class DomesticHolding:
+    symbol: str
+    name: str
+    quantity: float
+    avg_price: float
+    current_price: float
+    eval_amount: float
+    pl_amount: float
+    return_rate: float
+
+    @classmethod
+    def from_item(cls, item):
+        symbol = item.get("pdno", "")
+        return cls(
+            symbol,
+            item.get("prdt_name") or symbol,
+            to_float(item.get("hldg_qty")),
+            to_float(item.get("pchs_avg_pric")),
+            to_float(item.get("prpr")),
+            to_float(item.get("evlu_amt")),
+            to_float(item.get("evlu_pfls_amt")),
+            to_float(item.get("evlu_pfls_rt")),
+        )
+
+
+@dataclass(slots=True)
+class DomesticBalancePage:
+    holdings: List[DomesticHolding]
+    rp_amount: float  # CMA/RP evaluation (output2, repeated on every page)
+
+
+def decode_domestic_balance(res):
+    out2 = res.get("output2") or []
+    if isinstance(out2, dict):
+        out2 = [out2]
+    return DomesticBalancePage(
+        holdings=[DomesticHolding.from_item(item) for item in res.get("output1") or []],
+        rp_amount=to_float(out2[0].get("cma_evlu_amt")) if out2 else 0.0,
+    )
+
+
+# ── CTRP6504R: Overseas present balance ──
+
+@dataclass(slots=True)
+class OverseasHolding:
+    symbol: str
+    name: str
+    quantity: float
+    avg_price: float
+    current_price: float       # Foreign currency
+    pl_amount: float           # Foreign currency
+    return_rate: float
+    realized_pl_krw: float
+    exchange: str              # Order exchange code (NASD, NYSE, SEHK, ...)
+    currency: str
+
+    @classmethod
+    def from_item(cls, item):
+        symbol = item.get("pdno", "")
+        return cls(
+            symbol,
+            item.get("prdt_name") or symbol,
+            to_float(item.get("ccld_qty_smtl1")),
+            to_float(item.get("avg_unpr3")),
+            to_float(item.get("ovrs_now_pric1")),
+            to_float(item.get("evlu_pfls_amt2")),
+            to_float(item.get("evlu_pfls_rt1")),
+            to_float(item.get("ovrs_rlzt_pfls_amt2")),
+            item.get("ovrs_excg_cd") or "",
+            item.get("buy_crcy_cd") or "USD",
+        )
+
+
+@dataclass(slots=True)
+class OverseasPresentBalance:
+    holdings: List[OverseasHolding]
+    fx_rates: Dict[str, float] = field(default_factory=dict)  # currency -> KRW first-posted rate
+
+    def rate_for(self, currency, default=None):
+        return self.fx_rates.get(currency, default)
+
+
+def decode_overseas_present(res):
+    fx_rates = {}
+    for curr in res.get("output2") or []:
+        rate = to_float(curr.get("frst_bltn_exrt"))
+        if curr.get("crcy_cd") and rate > 0:
+            fx_rates[curr["crcy_cd"]] = rate
+    return OverseasPresentBalance(
+        holdings=[OverseasHolding.from_item(item) for item in res.get("output1") or []],
+        fx_rates=fx_rates,
+    )
+
+
+# ── TTZC3013R: Overseas balance (per exchange, paginated) ──
+
+@dataclass(slots=True)
+class OverseasBalanceHolding:
+    symbol: str
+    name: str
+    quantity: float
+    avg_price: float
+    current_price: float
+    eval_amount: float         # Foreign currency
+    pl_amount: float           # Foreign currency
+    return_rate: float
+    exchange: str
+    currency: str
+
+    @classmethod
+    def from_item(cls, item):
+        symbol = item.get("ovrs_pdno", "")
+        return cls(
+            symbol,
+            item.get("ovrs_item_name") or symbol,
+            to_float(item.get("ovrs_cblc_qty")),
+            to_float(item.get("pchs_avg_pric")),
+            to_float(item.get("now_pric2")),
+            to_float(item.get("ovrs_stck_evlu_amt")),
+            to_float(item.get("frcr_evlu_pfls_amt")),
+            to_float(item.get("evlu_pfls_rt")),
+            item.get("ovrs_excg_cd") or "",
+            item.get("tr_crcy_cd") or "",
+        )
+
+
+def decode_overseas_balance(res):
+    return [OverseasBalanceHolding.from_item(item) for item in res.get("output1") or []]
+
+
+# ── CTRP6548R: Integrated account balance ──
+
+@dataclass(slots=True)
+class AccountCategory:
+    amount: float
+    profit: float
+    weight: float
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(
+            to_float(item.get("evlu_amt")),
+            to_float(item.get("evlu_pfls_amt")),
+            to_float(item.get("whol_weit_rt")),
+        )
+
+
+@dataclass(slots=True)
+class AccountBalance:
+    total_asset: float
+    total_pl: float
+    total_purchase: float
+    categories: List[AccountCategory]  # output1 rows, by KIS category index
+
+    # output1 row indices for the categories the dashboard shows
+    DOMESTIC_STOCK = 0
+    RP = 7
+    OVERSEAS_STOCK = 8
+    FOREIGN_CURRENCY = 16
+
+    def category(self, index):
+        return self.categories[index] if index < len(self.categories) else None
+
+
+def decode_account_balance(res):
+    out2 = res.get("output2") or {}
+    return AccountBalance(
+        total_asset=to_float(out2.get("tot_asst_amt")),
+        total_pl=to_float(out2.get("evlu_pfls_amt_smtl")),
+        total_purchase=to_float(out2.get("pchs_amt_smtl")),
+        categories=[AccountCategory.from_item(item) for item in res.get("output1") or []],
+    )
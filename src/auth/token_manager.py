@@ -1,18 +1,96 @@
+import errno
 import json
 import time
 import os
+import random
+import threading
 import requests
-from src.config_loader import get_app_key, get_app_secret, get_base_url, PROJECT_ROOT
+from src.config_loader import (
+    config_service, get_app_key, get_app_secret, get_base_url, get_http_config, get_token_config, PROJECT_ROOT,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 TOKEN_FILE = os.path.join(PROJECT_ROOT, "token.json")
+TOKEN_VALIDITY = 23 * 3600  # KIS tokens last 24h; renew an hour early to be safe
+
+# Background renewal defaults when settings.yaml has no api.token section (seconds)
+DEFAULT_RENEW_LEAD = 1800     # Renew this long before TOKEN_VALIDITY runs out
+DEFAULT_RENEW_JITTER = 600    # Random extra lead so workers don't all wake at once
+DEFAULT_RETRY_DELAY = 30      # First retry after a failed renewal (doubles, capped)
+MAX_RETRY_DELAY = 600
+
+
+class TokenFileLock:
+    """
+    Advisory exclusive lock shared by every process using the same token file.
+    Uses a sidecar "<token file>.lock" so the token file itself can be replaced.
+    """
+
+    def __init__(self, token_file):
+        self.path = f"{token_file}.lock"
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a+")
+        if fcntl:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        else:
+            self._fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10s; keep waiting for the holder
+                    time.sleep(0.1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+
 
 class TokenManager:
     def __init__(self):
+        self._access_token = None
+        self._issued_at = 0
+        # Threads of this process queue here; other processes queue on the file lock
+        self._refresh_lock = threading.Lock()
+        self.configure()
+        self._renewer = None
+        self._stop_event = threading.Event()
+
+        # Metrics
+        self.issued = 0               # Tokens issued by this process (inline or background)
+        self.issue_failures = 0
+        self.adopted = 0              # Renewals satisfied by a token another process issued
+        self.renewals = 0
+        self.renewal_failures = 0
+        self.last_renewal_at = None
+        self.last_renewal_ms = None
+        self.next_renewal_at = None
+        self.last_error = None
+
+    def configure(self):
+        """Reads credentials and renewal timing (on startup and on config reload)."""
         self.app_key = get_app_key()
         self.app_secret = get_app_secret()
         self.url_base = get_base_url()
-        self._access_token = None
-        self._issued_at = 0
+        config = get_token_config()
+        self.renew_lead = float(config.get("renew_lead", DEFAULT_RENEW_LEAD))
+        self.renew_jitter = float(config.get("renew_jitter", DEFAULT_RENEW_JITTER))
 
     def get_token(self):
         """Returns a valid access token. Checks cache first."""
@@ -20,33 +98,159 @@ class TokenManager:
         if self._is_token_valid():
             return self._access_token
 
-        # 2. Check file cache
-        if os.path.exists(TOKEN_FILE):
-            try:
-                with open(TOKEN_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    token = data.get("access_token")
-                    issued_at = data.get("issued_at")
-                    
-                    if token and issued_at:
-                        # Check expiry (strictly < 23 hours to be safe)
-                        if time.time() - issued_at < 23 * 3600:
-                            self._access_token = token
-                            self._issued_at = issued_at
-                            return token
-            except Exception as e:
-                print(f"[WARN] Failed to read token file: {e}")
+        with self._refresh_lock:
+            # Another thread may have refreshed while we waited
+            if self._is_token_valid():
+                return self._access_token
 
-        # 3. Issue new token
-        return self._issue_new_token()
+            # 2. Check file cache (another process may have issued one)
+            if self._load_token_file():
+                return self._access_token
+
+            # 3. Issue new token, single-flight across processes
+            with TokenFileLock(TOKEN_FILE):
+                # Re-read: the lock holder before us has probably just written a fresh token
+                if self._load_token_file():
+                    return self._access_token
+                return self._issue_new_token()
 
     def _is_token_valid(self):
         """Checks if the in-memory token is valid."""
         if self._access_token and self._issued_at:
-             if time.time() - self._issued_at < 23 * 3600:
+             if time.time() - self._issued_at < TOKEN_VALIDITY:
                  return True
         return False
 
+    def refresh(self):
+        """
+        Renews the token ahead of expiry, single-flight across threads and processes.
+        If another process already renewed it, its token is adopted instead.
+        """
+        with self._refresh_lock:
+            with TokenFileLock(TOKEN_FILE):
+                previous = self._issued_at
+                if self._load_token_file() and self._issued_at > previous and not self._renewal_due():
+                    self.adopted += 1
+                    return self._access_token
+                return self._issue_new_token()
+
+    def _renewal_due(self):
+        return time.time() >= self._issued_at + TOKEN_VALIDITY - self.renew_lead - self.renew_jitter
+
+    # ── Background renewal ──
+
+    def start_renewal(self):
+        """Starts the background renewal thread (idempotent)."""
+        if self._renewer and self._renewer.is_alive():
+            return
+        self._stop_event.clear()
+        self._renewer = threading.Thread(target=self._renewal_loop, name="kis-token-renewal", daemon=True)
+        self._renewer.start()
+
+    def stop_renewal(self, timeout=5):
+        self._stop_event.set()
+        if self._renewer:
+            self._renewer.join(timeout)
+            self._renewer = None
+        self.next_renewal_at = None
+
+    def _renewal_loop(self):
+        retry_delay = DEFAULT_RETRY_DELAY
+        # Warm up first, so the first request doesn't pay for issuance either
+        try:
+            ok = self.get_token() is not None
+        except Exception as e:
+            ok = False
+            self.last_error = str(e)
+        while not self._stop_event.is_set():
+            if ok:
+                retry_delay = DEFAULT_RETRY_DELAY
+                lead = self.renew_lead + random.uniform(0, self.renew_jitter)
+                delay = max(0.0, self._issued_at + TOKEN_VALIDITY - lead - time.time())
+            else:
+                delay = retry_delay
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+
+            self.next_renewal_at = time.time() + delay
+            if self._stop_event.wait(delay):
+                break
+
+            started = time.monotonic()
+            try:
+                ok = self.refresh() is not None
+            except Exception as e:
+                ok = False
+                self.last_error = str(e)
+            if ok:
+                self.renewals += 1
+                self.last_renewal_at = time.time()
+                self.last_renewal_ms = round((time.monotonic() - started) * 1000, 1)
+            else:
+                self.renewal_failures += 1
+                print(f"[WARN] Background token renewal failed; retrying in {retry_delay}s")
+
+    def get_metrics(self):
+        now = time.time()
+        return {
+            "token_age_sec": round(now - self._issued_at) if self._issued_at else None,
+            "expires_in_sec": round(self._issued_at + TOKEN_VALIDITY - now) if self._issued_at else None,
+            "renewal_running": bool(self._renewer and self._renewer.is_alive()),
+            "next_renewal_in_sec": round(self.next_renewal_at - now) if self.next_renewal_at else None,
+            "renewals": self.renewals,
+            "renewal_failures": self.renewal_failures,
+            "last_renewal_at": self.last_renewal_at,
+            "last_renewal_ms": self.last_renewal_ms,
+            "issued": self.issued,
+            "issue_failures": self.issue_failures,
+            "adopted": self.adopted,
+            "last_error": self.last_error,
+        }
+
+    def _load_token_file(self):
+        """Adopts the token in TOKEN_FILE if it is still valid. Returns True on success."""
+        if not os.path.isfile(TOKEN_FILE):
+            return False
+        try:
+            with open(TOKEN_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            # Empty or half-written (in-place fallback write); the file lock sorts it out
+            print(f"[WARN] Failed to read token file: {e}")
+            return False
+
+        token = data.get("access_token")
+        issued_at = data.get("issued_at")
+        if token and issued_at and time.time() - issued_at < TOKEN_VALIDITY:
+            self._access_token = token
+            self._issued_at = issued_at
+            return True
+        return False
+
+    def _save_token_file(self):
+        """Writes the token atomically (temp file + rename). Caller holds the file lock."""
+        payload = json.dumps({"access_token": self._access_token, "issued_at": self._issued_at})
+        tmp_path = f"{TOKEN_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, TOKEN_FILE)
+            return
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if e.errno not in (errno.EBUSY, errno.EXDEV, errno.EPERM):
+                print(f"[ERROR] Failed to save token file: {e}")
+                return
+        # docker-compose bind-mounts token.json as a single file, which can't be
+        # replaced by rename; overwrite in place instead (readers retry under the lock)
+        try:
+            with open(TOKEN_FILE, "w", encoding="utf-8") as f:
+                f.write(payload)
+        except OSError as e:
+            print(f"[ERROR] Failed to save token file: {e}")
+
     def _issue_new_token(self):
         """Issues a new access token from KIS API."""
         path = "/oauth2/tokenP"
@@ -57,31 +261,35 @@ class TokenManager:
             "appkey": self.app_key,
             "appsecret": self.app_secret
         }
-        
+        http_config = get_http_config()
+        # Bounded, since every other worker waits on the file lock meanwhile
+        timeout = (float(http_config.get("connect_timeout", 3.05)), float(http_config.get("read_timeout", 10)))
+
         try:
-            res = requests.post(url, headers=headers, json=data)
+            res = requests.post(url, headers=headers, json=data, timeout=timeout)
             res.raise_for_status() # Raise error for bad status
-            
+
             token_info = res.json()
             access_token = token_info.get("access_token")
-            
+
             if access_token:
                 self._access_token = access_token
                 self._issued_at = time.time()
-                
+
                 # Save to file
-                with open(TOKEN_FILE, "w", encoding="utf-8") as f:
-                    json.dump({
-                        "access_token": self._access_token,
-                        "issued_at": self._issued_at
-                    }, f)
+                self._save_token_file()
+                self.issued += 1
                 print("[INFO] New access token issued.")
                 return access_token
             else:
+                self.issue_failures += 1
+                self.last_error = f"Token response missing access_token: {token_info}"
                 print(f"[ERROR] Token response missing access_token: {token_info}")
                 return None
-                
+
         except requests.exceptions.RequestException as e:
+            self.issue_failures += 1
+            self.last_error = str(e)
             print(f"[ERROR] Failed to issue token: {e}")
             if hasattr(e.response, 'text') and e.response:
                  print(f"Response: {e.response.text}")
@@ -89,6 +297,7 @@ class TokenManager:
 
 # Singleton instance
 token_manager = TokenManager()
+config_service.on_reload(lambda config: token_manager.configure())
 
 def get_access_token():
     return token_manager.get_token()
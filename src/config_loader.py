@@ -1,10 +1,18 @@
-import yaml
+import copy
 import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import yaml
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_DIR = os.path.join(PROJECT_ROOT, "config")
 SETTINGS_FILE = os.path.join(CONFIG_DIR, "settings.yaml")
 SECRETS_FILE = os.path.join(CONFIG_DIR, "secrets.yaml")
+# Seconds between stat() checks of the config files
+DEFAULT_CHECK_INTERVAL = 1.0
 
 def load_config():
     """Load settings and secrets from YAML files."""
@@ -35,23 +43,229 @@ def load_config():
                         
     return config
 
-# Global config object
-CONFIG = load_config()
+def _merge(base, overrides):
+    """Deep-merges overrides into base (in place)."""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+# ── Typed sections ──
+
+@dataclass(frozen=True, slots=True)
+class KisConfig:
+    app_key: Optional[str]
+    app_secret: Optional[str]
+    account_no: Optional[str]
+    account_code: Optional[str]
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("app_key"), d.get("app_secret"), d.get("account_no"), d.get("account_code"))
+
+
+@dataclass(frozen=True, slots=True)
+class ApiConfig:
+    base_url: Optional[str]
+    http: dict
+    rate_limit: dict
+    cache: dict
+    retry: dict
+    circuit_breaker: dict
+    realtime: dict
+    token: dict
+    overseas_markets: list
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d.get("base_url"),
+            d.get("http") or {},
+            d.get("rate_limit") or {},
+            d.get("cache") or {},
+            d.get("retry") or {},
+            d.get("circuit_breaker") or {},
+            d.get("realtime") or {},
+            d.get("token") or {},
+            d.get("overseas_markets") or [],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TelegramConfig:
+    bot_token: Optional[str]
+    chat_id: Optional[str]
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("bot_token"), d.get("chat_id"))
+
+
+@dataclass(frozen=True, slots=True)
+class GeminiConfig:
+    api_key: Optional[str]
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("api_key"))
+
+
+@dataclass(frozen=True, slots=True)
+class PresentationConfig:
+    currency: str
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("currency") or "KRW")
+
+
+class ConfigService:
+    """
+    Parses settings.yaml + secrets.yaml once and caches typed sections.
+    Reads stat() both files at most every check_interval seconds and reparses
+    only when an mtime changed, so config edits apply without a restart and
+    no request ever parses YAML. Listeners registered with on_reload() let
+    long-lived objects (rate limiter, cache, ...) pick up new values.
+    """
+
+    def __init__(self, files=(SETTINGS_FILE, SECRETS_FILE), check_interval=DEFAULT_CHECK_INTERVAL):
+        self.files = files
+        self.check_interval = check_interval
+        self.raw = {}             # Merged config dict, replaced (never mutated) on reload
+        self.version = 0
+        self._overrides = {}
+        self._mtimes = None
+        self._checked_at = 0.0
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._reload(self._stat())
+
+    def _stat(self):
+        mtimes = []
+        for path in self.files:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _reload(self, mtimes):
+        try:
+            config = _merge(load_config(), copy.deepcopy(self._overrides))
+        except (OSError, yaml.YAMLError) as e:
+            # Keep serving the last good config; a half-saved file shouldn't take the app down
+            print(f"[ERROR] Failed to reload config, keeping previous: {e}")
+            self._mtimes = mtimes
+            return False
+
+        # Parse every section before publishing anything; readers without the lock
+        # see either the old mapping or the new one, never a cleared/half-filled dict
+        kis = KisConfig.from_dict(config.get("kis") or {})
+        api = ApiConfig.from_dict(config.get("api") or {})
+        telegram = TelegramConfig.from_dict(config.get("telegram") or {})
+        gemini = GeminiConfig.from_dict(config.get("gemini") or {})
+        presentation = PresentationConfig.from_dict(config.get("presentation") or {})
+        self.raw = config
+        self.kis = kis
+        self.api = api
+        self.telegram = telegram
+        self.gemini = gemini
+        self.presentation = presentation
+        self._mtimes = mtimes
+        self.version += 1
+        return True
+
+    def refresh(self, force=False):
+        """Reloads if a config file changed (checked at most every check_interval seconds)."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return self
+        with self._lock:
+            self._checked_at = now
+            mtimes = self._stat()
+            if force or mtimes != self._mtimes:
+                if self._reload(mtimes) and self.version > 1:
+                    print("[INFO] Configuration reloaded.")
+                    for listener in list(self._listeners):
+                        try:
+                            listener(self)
+                        except Exception as e:
+                            print(f"[ERROR] Config reload listener {listener!r} failed: {e}")
+        return self
+
+    def on_reload(self, listener):
+        """Calls listener(config_service) after every successful reload."""
+        self._listeners.append(listener)
+        return listener
+
+    def override(self, overrides):
+        """Deep-merges values over the files (kept across reloads). For benches and local tools."""
+        with self._lock:
+            _merge(self._overrides, overrides)
+            self.refresh(force=True)
+
+
+# Singleton instance
+config_service = ConfigService()
+
+
+def __getattr__(name):
+    # Global config object: resolved on access, since reload swaps config_service.raw
+    if name == "CONFIG":
+        return config_service.raw
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_app_key():
-    return CONFIG.get("kis", {}).get("app_key")
+    return config_service.refresh().kis.app_key
 
 def get_app_secret():
-    return CONFIG.get("kis", {}).get("app_secret")
+    return config_service.refresh().kis.app_secret
 
 def get_account_no():
-    return CONFIG.get("kis", {}).get("account_no")
+    return config_service.refresh().kis.account_no
 
 def get_account_code():
-    return CONFIG.get("kis", {}).get("account_code")
+    return config_service.refresh().kis.account_code
 
 def get_base_url():
-    return CONFIG.get("api", {}).get("base_url")
+    return config_service.refresh().api.base_url
 
 def get_telegram_config():
-    return CONFIG.get("telegram", {})
+    return config_service.refresh().telegram
+
+def get_gemini_config():
+    return config_service.refresh().gemini
+
+def get_presentation_config():
+    return config_service.refresh().presentation
+
+def get_http_config():
+    return config_service.refresh().api.http
+
+def get_rate_limit_config():
+    return config_service.refresh().api.rate_limit
+
+def get_cache_config():
+    return config_service.refresh().api.cache
+
+def get_retry_config():
+    return config_service.refresh().api.retry
+
+def get_circuit_breaker_config():
+    return config_service.refresh().api.circuit_breaker
+
+def get_realtime_config():
+    return config_service.refresh().api.realtime
+
+def get_overseas_markets():
+    return config_service.refresh().api.overseas_markets
+
+def get_token_config():
+    return config_service.refresh().api.token
+
+def get_database_config():
+    return config_service.refresh().raw.get("database") or {}
@@ -0,0 +1,289 @@
+"""
+Columnar archive of daily_portfolio_snapshot history.
+
+Closed months are exported to Parquet under
+    data/archive/snapshots/year=YYYY/month=MM/snapshots.parquet
+with a manifest.json listing every archived partition. Readers take archived
+months from Parquet (memory-mapped, only the requested columns, partitions
+outside the range never opened) and the rest from SQLite with a plain Core
+select, so multi-year analytics never build ORM row objects. The archive
+only reads SQLite (writes go to Parquet files), so it doesn't go through
+the database writer.
+
+Run from project root:
+    python -m src.database.archive             # export every closed month not archived yet
+    python -m src.database.archive --force     # re-export them all (compacted months are kept)
+"""
+import datetime
+import json
+import os
+import threading
+
+import pandas as pd
+from sqlalchemy import String, select, type_coerce
+
+from src.config_loader import PROJECT_ROOT, get_database_config
+from src.database.engine import DATA_DIR, engine as default_engine
+from src.database.models import DailyPortfolioSnapshot
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+DEFAULT_ARCHIVE_DIR = os.path.join(DATA_DIR, "archive", "snapshots")
+MANIFEST_FILE = "manifest.json"
+PARTITION_FILE = "snapshots.parquet"
+
+# Archived columns, in file order (id is SQLite-only)
+COLUMNS = (
+    "date", "instrument_id", "snapshot_time", "quantity", "close_price",
+    "avg_buy_price", "exchange_rate", "value_krw", "profit_loss_krw",
+)
+TEMPORAL_COLUMNS = {"date", "snapshot_time"}
+
+if PARQUET_AVAILABLE:
+    SCHEMA = pa.schema([
+        ("date", pa.date32()),
+        ("instrument_id", pa.int32()),
+        ("snapshot_time", pa.timestamp("us")),
+        ("quantity", pa.float64()),
+        ("close_price", pa.float64()),
+        ("avg_buy_price", pa.float64()),
+        ("exchange_rate", pa.float64()),
+        ("value_krw", pa.float64()),
+        ("profit_loss_krw", pa.float64()),
+    ])
+
+
+def month_range(start, end):
+    """(year, month) pairs from start's month to end's month, inclusive."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def month_bounds(year, month):
+    first = datetime.date(year, month, 1)
+    next_first = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+    return first, next_first - datetime.timedelta(days=1)
+
+
+class SnapshotArchive:
+    def __init__(self, root=None, engine=None):
+        configured = get_database_config().get("archive_dir")
+        self.root = root or (os.path.join(PROJECT_ROOT, configured) if configured else DEFAULT_ARCHIVE_DIR)
+        self.engine = engine or default_engine
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+
+    # ── Manifest ──
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def manifest(self):
+        """{"YYYY-MM": partition info}; re-read when another process rewrote it."""
+        path = self._manifest_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._manifest_mtime:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f).get("partitions", {})
+                self._manifest_mtime = mtime
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Failed to read archive manifest: {e}")
+                return self._manifest or {}
+        return self._manifest
+
+    def _write_manifest(self, partitions):
+        path = self._manifest_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "partitions": dict(sorted(partitions.items()))}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def archived_months(self):
+        return {(int(key[:4]), int(key[5:7])) for key in self.manifest()}
+
+    def _partition_path(self, year, month):
+        return os.path.join(self.root, f"year={year:04d}", f"month={month:02d}", PARTITION_FILE)
+
+    # ── Export ──
+
+    def export_month(self, year, month):
+        """
+        Writes one month to its partition file and records it in the manifest.
+        Returns the row count, or 0 if the month was skipped: a partition is
+        never replaced by fewer rows, since after retention compaction
+        (src/database/retention.py) it is the only copy of the daily detail.
+        """
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow is required for the snapshot archive (pip install pyarrow)")
+        first, last = month_bounds(year, month)
+        stmt = select(*(getattr(DailyPortfolioSnapshot, c) for c in COLUMNS)).where(
+            DailyPortfolioSnapshot.date.between(first, last)
+        ).order_by(DailyPortfolioSnapshot.date, DailyPortfolioSnapshot.instrument_id)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        if not rows:
+            return 0
+
+        archived = self.manifest().get(f"{year:04d}-{month:02d}")
+        if archived and len(rows) < archived.get("rows", 0):
+            print(f"[WARN] Not re-exporting {year:04d}-{month:02d}: SQLite has {len(rows)} rows, "
+                  f"the archive {archived['rows']} (compacted month?)")
+            return 0
+
+        table = pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*rows), SCHEMA)],
+            schema=SCHEMA,
+        )
+        path = self._partition_path(year, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        # Sorted by date, so row-group statistics let date filters skip whole groups
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            partitions = dict(self.manifest())
+            partitions[f"{year:04d}-{month:02d}"] = {
+                "file": os.path.relpath(path, self.root),
+                "rows": len(rows),
+                "min_date": str(rows[0][0]),
+                "max_date": str(rows[-1][0]),
+                "exported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            self._write_manifest(partitions)
+        return len(rows)
+
+    def archive_closed_periods(self, today=None, force=False):
+        """Exports every month before the current one that isn't archived yet. Returns {"YYYY-MM": rows}."""
+        today = today or datetime.date.today()
+        with self.engine.connect() as conn:
+            oldest = conn.execute(select(DailyPortfolioSnapshot.date).order_by(
+                DailyPortfolioSnapshot.date).limit(1)).scalar()
+        if oldest is None:
+            return {}
+
+        last_closed = datetime.date(today.year, today.month, 1) - datetime.timedelta(days=1)
+        done = set() if force else self.archived_months()
+        exported = {}
+        for year, month in month_range(oldest, last_closed):
+            if (year, month) in done:
+                continue
+            rows = self.export_month(year, month)
+            if rows:
+                exported[f"{year:04d}-{month:02d}"] = rows
+        if exported:
+            print(f"[INFO] Archived {sum(exported.values())} snapshot rows in {len(exported)} monthly partitions")
+        return exported
+
+    # ── Read ──
+
+    def scan(self, start, end, columns=COLUMNS, instrument_ids=None):
+        """Archived rows with start <= date <= end as a pyarrow Table (None if nothing is archived there)."""
+        if not PARQUET_AVAILABLE:
+            return None
+        columns = list(dict.fromkeys(["date", *columns]))
+        archived = self.archived_months()
+        tables = []
+        for year, month in month_range(start, end):
+            if (year, month) not in archived:
+                continue
+            first, last = month_bounds(year, month)
+            filters = []
+            if start > first:
+                filters.append(("date", ">=", start))
+            if end < last:
+                filters.append(("date", "<=", end))
+            if instrument_ids is not None:
+                filters.append(("instrument_id", "in", list(instrument_ids)))
+            tables.append(pq.read_table(
+                self._partition_path(year, month), columns=columns,
+                filters=filters or None, memory_map=True,
+            ))
+        return pa.concat_tables(tables) if tables else None
+
+    def load(self, start, end, columns=COLUMNS, instrument_ids=None):
+        """
+        Snapshot rows with start <= date <= end as a DataFrame sorted by date
+        (datetime64 date/snapshot_time columns): archived months from Parquet,
+        everything else from SQLite (one Core select per gap).
+        """
+        columns = list(dict.fromkeys(["date", *columns]))
+        archived = self.archived_months() if PARQUET_AVAILABLE else set()
+        frames = []
+
+        table = self.scan(start, end, columns, instrument_ids)
+        if table is not None and table.num_rows:
+            frames.append(table.to_pandas(date_as_object=False))
+
+        # Contiguous runs of months that aren't archived, clipped to [start, end]
+        gaps = []
+        for year, month in month_range(start, end):
+            if (year, month) in archived:
+                continue
+            first, last = month_bounds(year, month)
+            first, last = max(first, start), min(last, end)
+            if gaps and gaps[-1][1] + datetime.timedelta(days=1) == first:
+                gaps[-1][1] = last
+            else:
+                gaps.append([first, last])
+
+        if gaps:
+            # Raw ISO strings, parsed below in one vectorized pass instead of per row
+            selected = [
+                type_coerce(getattr(DailyPortfolioSnapshot, c), String).label(c) if c in TEMPORAL_COLUMNS
+                else getattr(DailyPortfolioSnapshot, c)
+                for c in columns
+            ]
+            with self.engine.connect() as conn:
+                for first, last in gaps:
+                    stmt = select(*selected).where(DailyPortfolioSnapshot.date.between(first, last))
+                    if instrument_ids is not None:
+                        stmt = stmt.where(DailyPortfolioSnapshot.instrument_id.in_(list(instrument_ids)))
+                    rows = conn.execute(stmt).all()
+                    if rows:
+                        frame = pd.DataFrame.from_records(rows, columns=columns)
+                        for c in TEMPORAL_COLUMNS.intersection(columns):
+                            frame[c] = pd.to_datetime(frame[c], format="ISO8601").astype("datetime64[ms]")
+                        frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return frame.sort_values(["date", "instrument_id"] if "instrument_id" in columns else ["date"],
+                                 ignore_index=True)
+
+    def get_metrics(self):
+        partitions = self.manifest()
+        return {
+            "available": PARQUET_AVAILABLE,
+            "partitions": len(partitions),
+            "rows": sum(p.get("rows", 0) for p in partitions.values()),
+            "oldest": min(partitions) if partitions else None,
+            "newest": max(partitions) if partitions else None,
+        }
+
+
+# Singleton instance
+snapshot_archive = SnapshotArchive()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export closed months of snapshots to Parquet")
+    parser.add_argument("--force", action="store_true", help="Re-export months that are already archived")
+    args = parser.parse_args()
+    result = snapshot_archive.archive_closed_periods(force=args.force)
+    print(f"Exported: {result or 'nothing new'} -> {snapshot_archive.root}")
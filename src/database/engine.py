@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
+from src.config_loader import get_database_config
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 
@@ -9,14 +12,100 @@ if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
 DB_URL = f"sqlite:///{os.path.join(DATA_DIR, 'assets.db')}"
+ASYNC_DB_URL = f"sqlite+aiosqlite:///{os.path.join(DATA_DIR, 'assets.db')}"
+
+# Applied to every new SQLite connection; settings.yaml database.pragmas overrides these.
+# WAL lets the scheduler write snapshots while web threads keep reading.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",     # Safe with WAL; fsync only at checkpoints
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,        # ms to wait for a lock instead of failing with "database is locked"
+    "cache_size": -32000,        # Negative = KiB (32 MB page cache per connection)
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 10
+
+
+def _apply_pragmas_on_connect(sync_engine, pragmas):
+    @event.listens_for(sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _begin_immediate(sync_engine):
+    # pysqlite defers BEGIN until the first DML, which breaks SAVEPOINT and lets a
+    # reading transaction fail with SQLITE_BUSY when it later upgrades to write.
+    # Take over transaction control and start every transaction with the write lock.
+    @event.listens_for(sync_engine, "connect")
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
 
-engine = create_engine(DB_URL, echo=False)
+def make_engine(url=DB_URL, pragmas=None, pool_size=None, max_overflow=None, echo=False, begin_immediate=False):
+    """
+    SQLite engine with the storage profile applied on connect.
+    begin_immediate=True is for writer connections (see src/database/writer.py):
+    transactions take the write lock up front and savepoints work.
+    """
+    config = get_database_config()
+    pragmas = {**DEFAULT_PRAGMAS, **(config.get("pragmas") or {}), **(pragmas or {})}
+    sqlite_engine = create_engine(
+        url,
+        echo=echo,
+        # Pooled connections move between uvicorn and scheduler threads;
+        # SQLAlchemy's pool guarantees one thread uses a connection at a time.
+        connect_args={"check_same_thread": False},
+        pool_size=int(pool_size if pool_size is not None else config.get("pool_size", DEFAULT_POOL_SIZE)),
+        max_overflow=int(max_overflow if max_overflow is not None else config.get("max_overflow", DEFAULT_MAX_OVERFLOW)),
+    )
+    _apply_pragmas_on_connect(sqlite_engine, pragmas)
+    if begin_immediate:
+        _begin_immediate(sqlite_engine)
+    return sqlite_engine
+
+
+def make_async_engine(url=ASYNC_DB_URL, pragmas=None, pool_size=None, max_overflow=None, echo=False):
+    """aiosqlite engine for async routes, same storage profile as make_engine."""
+    config = get_database_config()
+    pragmas = {**DEFAULT_PRAGMAS, **(config.get("pragmas") or {}), **(pragmas or {})}
+    sqlite_engine = create_async_engine(
+        url,
+        echo=echo,
+        pool_size=int(pool_size if pool_size is not None else config.get("pool_size", DEFAULT_POOL_SIZE)),
+        max_overflow=int(max_overflow if max_overflow is not None else config.get("max_overflow", DEFAULT_MAX_OVERFLOW)),
+    )
+    # Each aiosqlite connection runs on its own thread, so the event loop never blocks on SQLite
+    _apply_pragmas_on_connect(sqlite_engine.sync_engine, pragmas)
+    return sqlite_engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async counterpart for `async def` routes (same database file)
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
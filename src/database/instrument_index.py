@@ -0,0 +1,179 @@
+"""Process-wide instrument identity index, so resolving an instrument is a dict lookup."""
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.database.models import Instrument
+
+# Changing any of these moves an instrument to another index key
+KEY_COLUMNS = ("symbol", "asset_type", "brokerage")
+
+
+@dataclass(slots=True)
+class InstrumentEntry:
+    id: int
+    brokerage: Optional[str]
+    name: str
+    exchange: Optional[str]
+
+
+class InstrumentIndex:
+    """
+    (symbol, asset_type) -> instruments in id order, matched like
+    get_or_create_instrument (brokerage only when one is given).
+
+    Kept per database URL and loaded lazily from committed rows. Instruments
+    inserted or refreshed through a Session are published when it commits;
+    renames and deletes invalidate the index, which reloads on the next lookup. A miss is not proof the row
+    doesn't exist (another process may have inserted it), so callers fall back
+    to a query before creating. Hits are trusted without a query: a row deleted
+    by another process makes the write using its id fail (foreign_keys is on),
+    and rolling back a transaction that used the index invalidates it, so the
+    retry resolves from the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_db = {}  # database URL -> entries
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, db: Session, symbol, asset_type, brokerage=None):
+        bind = db.get_bind()
+        entries = self._by_db.get(_database_key(bind))
+        if entries is None:
+            entries = self._load(db, bind)
+        pending_changes(db)["used"] = True
+        for entry in entries.get((symbol, asset_type), ()):
+            if not brokerage or entry.brokerage == brokerage:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def _load(self, db, bind):
+        key = _database_key(bind)
+        with self._lock:
+            if key not in self._by_db:
+                stmt = select(
+                    Instrument.id, Instrument.symbol, Instrument.asset_type,
+                    Instrument.brokerage, Instrument.name, Instrument.exchange
+                ).order_by(Instrument.id)
+                if isinstance(bind, Engine):
+                    # Own connection, so the caller's uncommitted rows stay out of the index
+                    with bind.connect() as conn:
+                        rows = conn.execute(stmt).all()
+                else:
+                    rows = db.execute(stmt).all()
+
+                entries = {}
+                for row in rows:
+                    entries.setdefault((row.symbol, row.asset_type), []).append(
+                        InstrumentEntry(row.id, row.brokerage, row.name, row.exchange)
+                    )
+                self._by_db[key] = entries
+                self.loads += 1
+            return self._by_db[key]
+
+    def publish(self, bind, changes):
+        """Applies committed {id: (symbol, asset_type, InstrumentEntry)} changes."""
+        with self._lock:
+            entries = self._by_db.get(_database_key(bind))
+            if entries is None:
+                return  # The next load reads them from the table
+            for symbol, asset_type, entry in changes.values():
+                bucket = entries.setdefault((symbol, asset_type), [])
+                bucket[:] = [e for e in bucket if e.id != entry.id] + [entry]
+                bucket.sort(key=lambda e: e.id)
+
+    def invalidate(self, bind=None):
+        """Drops the index for one database (or all of them); it reloads on the next lookup."""
+        with self._lock:
+            if bind is None:
+                self._by_db.clear()
+            else:
+                self._by_db.pop(_database_key(bind), None)
+
+    def get_metrics(self):
+        by_db = dict(self._by_db)
+        return {
+            "databases": len(by_db),
+            "instruments": sum(len(bucket) for entries in by_db.values() for bucket in entries.values()),
+            "loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _database_key(bind):
+    return str(bind.url if isinstance(bind, Engine) else bind.engine.url)
+
+
+# Singleton instance
+instrument_index = InstrumentIndex()
+
+
+def pending_changes(db: Session):
+    """Index changes made in this session's transaction, published on commit."""
+    return db.info.setdefault("instrument_index", {"changes": {}, "invalidate": False, "used": False})
+
+
+def record_entry(db: Session, symbol, asset_type, entry):
+    pending_changes(db)["changes"][entry.id] = (symbol, asset_type, entry)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_instrument_changes(session, flush_context):
+    # new/dirty/deleted and attribute history still show the pre-flush state here
+    for obj in session.new:
+        if isinstance(obj, Instrument):
+            record_entry(session, obj.symbol, obj.asset_type,
+                         InstrumentEntry(obj.id, obj.brokerage, obj.name, obj.exchange))
+    for obj in session.dirty:
+        if not isinstance(obj, Instrument):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[column].history.has_changes() for column in KEY_COLUMNS):
+            pending_changes(session)["invalidate"] = True
+        elif state.attrs.name.history.has_changes() or state.attrs.exchange.history.has_changes():
+            record_entry(session, obj.symbol, obj.asset_type,
+                         InstrumentEntry(obj.id, obj.brokerage, obj.name, obj.exchange))
+    if any(isinstance(obj, Instrument) for obj in session.deleted):
+        pending_changes(session)["invalidate"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_instrument_changes(session):
+    pending = session.info.pop("instrument_index", None)
+    if not pending:
+        return
+    if pending["invalidate"]:
+        instrument_index.invalidate(session.get_bind())
+    elif pending["changes"]:
+        instrument_index.publish(session.get_bind(), pending["changes"])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_savepoint_changes(session, previous_transaction):
+    # A rolled-back savepoint may have recorded ids that no longer exist; reload after commit
+    if previous_transaction.nested and "instrument_index" in session.info:
+        session.info["instrument_index"]["invalidate"] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _invalidate_after_failed_write(session):
+    # Ids from the index may be what failed (deleted by another process)
+    pending = session.info.get("instrument_index")
+    if pending and pending["used"]:
+        instrument_index.invalidate(session.get_bind())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_instrument_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("instrument_index", None)
@@ -0,0 +1,119 @@
+"""
+Cumulative net-investment ledger over the deposits table.
+
+deposit_ledger keeps one row per date with its net flow and the running
+total through that date, so "net investment as of D" is a single primary-key
+seek instead of summing the whole deposit history. ORM inserts, edits
+(including date changes) and deletes of DepositHistory adjust the ledger in
+the same transaction through listeners registered in models.py: the affected
+date and every later row shift by the delta, which is O(1) rows for today's
+deposits. Core/bulk writes bypass the
+ORM events, so they go through import_deposits() or are followed by
+rebuild_ledger().
+
+Run from project root:
+    python -m src.database.ledger --rebuild
+    python -m src.database.ledger --import deposits.csv    # columns: date,amount[,note]
+"""
+import datetime
+
+from sqlalchemy import delete, func, insert, select, update
+
+from src.database.models import DepositHistory, DepositLedger
+from src.database.rollups import mark_rollups_dirty
+
+
+def net_investment_as_of(db, day):
+    """Cumulative deposits minus withdrawals through `day` (Session or Connection)."""
+    value = db.execute(
+        select(DepositLedger.cumulative_krw).where(DepositLedger.date <= day)
+        .order_by(DepositLedger.date.desc()).limit(1)
+    ).scalar()
+    return value or 0.0
+
+
+def apply_deposit_delta(conn, day, delta):
+    """Shifts the ledger for `delta` KRW deposited (or withdrawn) on `day`."""
+    if not delta:
+        return
+    updated = conn.execute(
+        update(DepositLedger).where(DepositLedger.date == day)
+        .values(amount_krw=DepositLedger.amount_krw + delta)
+    ).rowcount
+    if not updated:
+        base = net_investment_as_of(conn, day - datetime.timedelta(days=1))
+        conn.execute(insert(DepositLedger).values(date=day, amount_krw=delta, cumulative_krw=base))
+    conn.execute(
+        update(DepositLedger).where(DepositLedger.date >= day)
+        .values(cumulative_krw=DepositLedger.cumulative_krw + delta)
+    )
+
+
+def rebuild_ledger(db, since=None):
+    """Recomputes the ledger from deposits (all of it, or from `since` on). Returns the rows written."""
+    base = 0.0
+    clear = delete(DepositLedger)
+    source = select(DepositHistory.date, DepositHistory.amount)
+    if since is not None:
+        base = net_investment_as_of(db, since - datetime.timedelta(days=1))
+        clear = clear.where(DepositLedger.date >= since)
+        source = source.where(DepositHistory.date >= since)
+    db.execute(clear)
+
+    daily = source.subquery()
+    amount = func.sum(daily.c.amount)
+    stmt = insert(DepositLedger).from_select(
+        ["date", "amount_krw", "cumulative_krw"],
+        select(daily.c.date, amount, base + func.sum(amount).over(order_by=daily.c.date))
+        .group_by(daily.c.date),
+    )
+    return db.execute(stmt).rowcount
+
+
+def import_deposits(db, rows):
+    """
+    Bulk-inserts deposits (dicts with date, amount and optional note) and
+    rebuilds the ledger once from the earliest imported date.
+    """
+    rows = [{"note": None, "created_at": datetime.datetime.utcnow(), **row} for row in rows]
+    if not rows:
+        return 0
+    db.execute(insert(DepositHistory), rows)
+    rebuild_ledger(db, since=min(row["date"] for row in rows))
+    for row in rows:
+        mark_rollups_dirty(db, row["date"])
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+
+    from src.database.engine import SessionLocal
+    from src.database.writer import db_writer
+
+    parser = argparse.ArgumentParser(description="Maintain the cumulative deposit ledger")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the ledger from the deposits table")
+    parser.add_argument("--import", dest="import_file", help="CSV of deposits to add (date,amount[,note])")
+    args = parser.parse_args()
+
+    try:
+        # Writes go through the writer, so a running app's writes aren't raced for the lock
+        if args.import_file:
+            with open(args.import_file, newline="", encoding="utf-8") as f:
+                rows = [
+                    {"date": datetime.date.fromisoformat(r["date"]), "amount": float(r["amount"]),
+                     "note": r.get("note") or None}
+                    for r in csv.DictReader(f)
+                ]
+            print(f"Imported {db_writer.run(import_deposits, rows)} deposits.")
+        if args.rebuild:
+            print(f"Rebuilt ledger: {db_writer.run(rebuild_ledger)} dates.")
+    finally:
+        db_writer.stop()
+
+    db = SessionLocal()
+    try:
+        print(f"Net investment as of today: {net_investment_as_of(db, datetime.date.today()):,.0f} KRW")
+    finally:
+        db.close()
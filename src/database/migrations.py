@@ -0,0 +1,75 @@
+"""
+Versioned schema migrations, tracked in SQLite's PRAGMA user_version.
+
+Base.metadata.create_all only creates missing tables, so indexes and columns
+added to models.py later reach existing databases through here. Each
+migration runs in its own transaction together with its version bump, and
+must be safe on a database create_all has just built (IF NOT EXISTS).
+Statements are SQL strings, or callables taking the connection for
+backfills that are clearer in Python.
+
+Run from project root:
+    python -m src.database.migrations
+"""
+from sqlalchemy import text
+
+from src.database.engine import engine as default_engine
+from src.database.rollups import rebuild_rollups
+
+# (version, description, statements) in order; never edit one that has shipped
+MIGRATIONS = [
+    (1, "Snapshot (instrument_id, date) covering index and instruments.brokerage index", [
+        "CREATE INDEX IF NOT EXISTS ix_snapshot_instrument_date "
+        "ON daily_portfolio_snapshot (instrument_id, date, value_krw)",
+        "CREATE INDEX IF NOT EXISTS ix_instruments_brokerage ON instruments (brokerage)",
+        "ANALYZE",
+    ]),
+    (2, "Backfill deposit_ledger prefix sums from deposits", [
+        # Table itself comes from create_all (DepositLedger); same rows as ledger.rebuild_ledger()
+        "DELETE FROM deposit_ledger",
+        "INSERT INTO deposit_ledger (date, amount_krw, cumulative_krw) "
+        "SELECT date, SUM(amount), SUM(SUM(amount)) OVER (ORDER BY date) FROM deposits GROUP BY date",
+    ]),
+    (3, "Backfill summary_rollup week/month/year rows from daily_summary", [
+        # Table itself comes from create_all (SummaryRollup)
+        rebuild_rollups,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(engine=None):
+    """Applies pending migrations. Returns the resulting schema version."""
+    engine = engine or default_engine
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+    if version > LATEST_VERSION:
+        print(f"[WARN] Database schema v{version} is newer than this code (v{LATEST_VERSION})")
+        return version
+
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+        print(f"[INFO] Applying migration {number}: {description}")
+        with engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(text(f"PRAGMA user_version = {number}"))
+        version = number
+    return version
+
+
+if __name__ == "__main__":
+    from src.database.engine import Base
+    from src.database import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(bind=default_engine)
+    print(f"Database schema at v{migrate()} ({default_engine.url})")
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, UniqueConstraint, Index, event, inspect
+from sqlalchemy.orm import column_property, object_session, relationship
 from datetime import datetime
 import enum
 from src.database.engine import Base
@@ -27,7 +27,7 @@ class Instrument(Base):
     name = Column(String, nullable=False)                      # e.g., Apple Inc., 삼성전자, Bitcoin
     asset_type = Column(Enum(AssetType), nullable=False)
     currency = Column(String, default="KRW")                   # KRW, USD
-    brokerage = Column(String, nullable=True)                  # null for crypto, manual
+    brokerage = Column(String, nullable=True, index=True)      # null for crypto, manual
     exchange = Column(String, nullable=True)                   # KRX, NASD, NYSE — null for RP, FX, crypto
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -46,6 +46,9 @@ class DailyPortfolioSnapshot(Base):
     __tablename__ = "daily_portfolio_snapshot"
     __table_args__ = (
         UniqueConstraint('date', 'instrument_id', name='uq_date_instrument'),
+        # Per-instrument date ranges (returns breakdowns); value_krw makes it covering.
+        # Existing databases get it from src/database/migrations.py
+        Index('ix_snapshot_instrument_date', 'instrument_id', 'date', 'value_krw'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -90,12 +93,96 @@ class DepositHistory(Base):
     __tablename__ = "deposits"
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, nullable=False, index=True)
-    amount = Column(Float, nullable=False)  # Positive=Deposit, Negative=Withdrawal
+    # active_history: the ledger listeners need the old values even when the
+    # instance was expired (e.g. by a commit) before being edited
+    date = column_property(Column(Date, nullable=False, index=True), active_history=True)
+    amount = column_property(Column(Float, nullable=False), active_history=True)  # Positive=Deposit, Negative=Withdrawal
     note = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# ──────────────────────────────────────────────
+# Deposit Ledger (derived from deposits)
+# ──────────────────────────────────────────────
+class DepositLedger(Base):
+    """
+    Prefix sums of deposits: one row per date with deposit activity.
+    Maintained by src/database/ledger.py and the DepositHistory listeners below;
+    never write it directly.
+    """
+    __tablename__ = "deposit_ledger"
+
+    date = Column(Date, primary_key=True)
+    amount_krw = Column(Float, nullable=False, default=0.0)       # Net flow on this date
+    cumulative_krw = Column(Float, nullable=False, default=0.0)   # Net investment through this date
+
+
+# ORM writes to deposits keep the ledger (and rollups) current in the same
+# transaction. Registered here so they are active wherever DepositHistory is.
+def _apply_deposit_changes(connection, target, changes):
+    # Imported here: both modules import this one
+    from src.database.ledger import apply_deposit_delta
+    from src.database.rollups import mark_rollups_dirty
+    db = object_session(target)
+    for day, delta in changes:
+        apply_deposit_delta(connection, day, delta)
+        mark_rollups_dirty(db, day)
+
+
+@event.listens_for(DepositHistory, "after_insert")
+def _deposit_inserted(mapper, connection, target):
+    _apply_deposit_changes(connection, target, [(target.date, target.amount)])
+
+
+@event.listens_for(DepositHistory, "after_update")
+def _deposit_updated(mapper, connection, target):
+    state = inspect(target)
+    date_history = state.attrs.date.history
+    amount_history = state.attrs.amount.history
+    if not (date_history.has_changes() or amount_history.has_changes()):
+        return
+    old_date = date_history.deleted[0] if date_history.deleted else target.date
+    old_amount = amount_history.deleted[0] if amount_history.deleted else target.amount
+    if old_date == target.date:
+        changes = [(target.date, target.amount - old_amount)]
+    else:
+        # Back- or forward-dated: take it out of the old date, add it to the new one
+        changes = [(old_date, -old_amount), (target.date, target.amount)]
+    _apply_deposit_changes(connection, target, changes)
+
+
+@event.listens_for(DepositHistory, "after_delete")
+def _deposit_deleted(mapper, connection, target):
+    _apply_deposit_changes(connection, target, [(target.date, -target.amount)])
+
+
+# ──────────────────────────────────────────────
+# Summary Rollups (derived from daily_summary)
+# ──────────────────────────────────────────────
+class SummaryRollup(Base):
+    """
+    Week / month / year OHLC of DailySummary for long-range charts.
+    Maintained by src/database/rollups.py; never write it directly.
+    """
+    __tablename__ = "summary_rollup"
+
+    resolution = Column(String, primary_key=True)              # "week" | "month" | "year"
+    period_start = Column(Date, primary_key=True)              # Monday / 1st of month / Jan 1
+    period_end = Column(Date, nullable=False)
+    first_date = Column(Date, nullable=False)                  # First and last DailySummary date in the period
+    last_date = Column(Date, nullable=False)
+    days = Column(Integer, nullable=False, default=0)          # DailySummary rows in the period
+    open_asset_krw = Column(Float, default=0.0)
+    high_asset_krw = Column(Float, default=0.0)
+    low_asset_krw = Column(Float, default=0.0)
+    close_asset_krw = Column(Float, default=0.0)
+    close_cost_krw = Column(Float, default=0.0)
+    net_flow_krw = Column(Float, default=0.0)                  # Deposits - withdrawals within the period
+    net_investment_krw = Column(Float, default=0.0)            # As of last_date
+    kospi_close = Column(Float, nullable=True)                 # Last close recorded in the period
+    sp500_close = Column(Float, nullable=True)
+
+
 # ──────────────────────────────────────────────
 # Trade Log (unchanged)
 # ──────────────────────────────────────────────
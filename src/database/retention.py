@@ -0,0 +1,224 @@
+"""
+Tiered retention for daily_portfolio_snapshot.
+
+Snapshot rows newer than database.retention.detail_days keep full daily
+detail. Older whole months are compacted to month-end: per instrument only
+its last row of the month stays, which carries the quantity, value and
+cumulative P&L the month closed with. DailySummary and the rollups are
+never touched, so daily totals, flows and returns stay exact; full daily
+detail stays readable from the Parquet archive, and a month is only
+compacted once its archived partition holds every SQLite row of it. After a
+real run the database is VACUUMed and ANALYZEd. The deletes (one write job
+per month) and the VACUUM go through the database writer, so they queue
+behind snapshot and API writes instead of racing them for the lock.
+
+Run from project root:
+    python -m src.database.retention               # dry run: report what would be reclaimed
+    python -m src.database.retention --apply
+"""
+import datetime
+import os
+import threading
+
+from sqlalchemy import delete, func, select, text
+
+from src.config_loader import get_database_config
+from src.database.archive import month_bounds, month_range, snapshot_archive
+from src.database.engine import engine as default_engine
+from src.database.models import DailyPortfolioSnapshot
+from src.database.summary import DEFAULT_VERIFY_DAYS
+from src.database.writer import DatabaseWriter, db_writer
+
+DEFAULT_DETAIL_DAYS = 400
+SNAPSHOT_TABLE = DailyPortfolioSnapshot.__tablename__
+
+
+class SnapshotRetention:
+    def __init__(self, engine=None, archive=None, writer=None):
+        self.engine = engine or default_engine
+        self.archive = archive or snapshot_archive
+        # Writes to another database file need a writer of their own
+        self.writer = writer or (db_writer if engine is None else DatabaseWriter(url=self.engine.url))
+        self._lock = threading.Lock()
+        self.last_report = None
+
+    def settings(self, detail_days=None):
+        config = get_database_config()
+        retention = config.get("retention") or {}
+        if detail_days is None:
+            detail_days = int(retention.get("detail_days", DEFAULT_DETAIL_DAYS))
+        # verify_daily_summaries compares summaries with snapshot rows in its window,
+        # so rows inside it must keep full detail
+        verify_days = int(config.get("summary_verify_days", DEFAULT_VERIFY_DAYS))
+        if detail_days < verify_days:
+            print(f"[WARN] retention.detail_days ({detail_days}) is inside the summary verification "
+                  f"window; keeping {verify_days} days of detail")
+            detail_days = verify_days
+        return {
+            "enabled": bool(retention.get("enabled", True)),
+            "dry_run": bool(retention.get("dry_run", True)),
+            "detail_days": detail_days,
+            "require_archive": bool(retention.get("require_archive", True)),
+            "vacuum": bool(retention.get("vacuum", True)),
+        }
+
+    # ── Planning ──
+
+    def _surplus_rows(self, first, last):
+        """Rows of one month that aren't their instrument's month-end row."""
+        latest = select(
+            DailyPortfolioSnapshot.id,
+            func.row_number().over(
+                partition_by=DailyPortfolioSnapshot.instrument_id,
+                order_by=DailyPortfolioSnapshot.date.desc(),
+            ).label("position"),
+        ).where(DailyPortfolioSnapshot.date.between(first, last)).subquery()
+        return select(latest.c.id).where(latest.c.position > 1)
+
+    def plan(self, today=None, detail_days=None, require_archive=True):
+        """
+        Months eligible for compaction: [(year, month, rows, rows to delete)].
+        Months whose archived partition is missing or has fewer rows than
+        SQLite are exported first; with require_archive they are skipped if
+        that isn't possible.
+        """
+        today = today or datetime.date.today()
+        detail_days = self.settings(detail_days)["detail_days"]
+        horizon = today - datetime.timedelta(days=detail_days)
+        # Whole months only: the horizon's own month keeps its detail
+        last_month_end = datetime.date(horizon.year, horizon.month, 1) - datetime.timedelta(days=1)
+
+        with self.engine.connect() as conn:
+            oldest = conn.execute(select(func.min(DailyPortfolioSnapshot.date))).scalar()
+        if oldest is None or oldest > last_month_end:
+            return []
+
+        manifest = self.archive.manifest()
+        months = []
+        for year, month in month_range(oldest, last_month_end):
+            first, last = month_bounds(year, month)
+            with self.engine.connect() as conn:
+                rows = conn.execute(select(func.count()).where(
+                    DailyPortfolioSnapshot.date.between(first, last))).scalar()
+                if not rows:
+                    continue
+                surplus = conn.execute(
+                    select(func.count()).select_from(self._surplus_rows(first, last).subquery())
+                ).scalar()
+            if not surplus:
+                continue  # Already month-end only
+
+            archived = manifest.get(f"{year:04d}-{month:02d}")
+            # Never re-export a month with fewer rows: it may be compacted already
+            if require_archive and (archived is None or archived.get("rows", 0) < rows):
+                try:
+                    self.archive.export_month(year, month)
+                    manifest = self.archive.manifest()
+                except Exception as e:
+                    print(f"[WARN] Not compacting {year:04d}-{month:02d}: archive export failed ({e})")
+                    continue
+            months.append((year, month, rows, surplus))
+        return months
+
+    def _table_bytes(self, conn):
+        """Bytes used by the snapshot table and its indexes (whole file if dbstat is unavailable)."""
+        try:
+            return conn.execute(text(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = :table)"
+            ), {"table": SNAPSHOT_TABLE}).scalar() or 0
+        except Exception:
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+            return conn.execute(text("PRAGMA page_count")).scalar() * page_size
+
+    # ── Run ──
+
+    def run(self, today=None, dry_run=None, detail_days=None):
+        """
+        Compacts every eligible month (or only reports them with dry_run).
+        Returns a report dict, also kept as last_report.
+        """
+        settings = self.settings(detail_days)
+        dry_run = settings["dry_run"] if dry_run is None else dry_run
+        with self._lock:
+            started = datetime.datetime.now()
+            months = self.plan(today, settings["detail_days"], settings["require_archive"])
+            with self.engine.connect() as conn:
+                total_rows = conn.execute(select(func.count()).select_from(DailyPortfolioSnapshot)).scalar()
+                table_bytes = self._table_bytes(conn)
+            surplus = sum(m[3] for m in months)
+            report = {
+                "dry_run": dry_run,
+                "detail_days": settings["detail_days"],
+                "months": [f"{y:04d}-{m:02d}" for y, m, _, _ in months],
+                "rows_before": total_rows,
+                "rows_deleted": surplus,
+                # Rows are near-uniform in size, so the table's share is a fair estimate
+                "estimated_bytes_reclaimed": int(table_bytes * surplus / total_rows) if total_rows else 0,
+            }
+
+            if not dry_run and months:
+                file_before = self._file_bytes()
+                for year, month, _, _ in months:
+                    self.writer.run(self._compact_month, *month_bounds(year, month))
+                if settings["vacuum"]:
+                    self.vacuum()
+                report["file_bytes_before"] = file_before
+                report["file_bytes_after"] = self._file_bytes()
+
+            report["seconds"] = round((datetime.datetime.now() - started).total_seconds(), 3)
+            self.last_report = report
+            return report
+
+    def _compact_month(self, db, first, last):
+        """Write job: deletes one month's surplus rows."""
+        db.execute(delete(DailyPortfolioSnapshot).where(
+            DailyPortfolioSnapshot.id.in_(self._surplus_rows(first, last))
+        ))
+
+    def vacuum(self):
+        """VACUUM and refresh planner statistics, as a writer maintenance job (no transaction)."""
+        self.writer.run_maintenance(_vacuum)
+
+    def _file_bytes(self):
+        path = self.engine.url.database
+        return os.path.getsize(path) if path and os.path.exists(path) else None
+
+    def run_job(self):
+        """Scheduled entry point: logs the report instead of raising."""
+        try:
+            report = self.run()
+            action = "would delete" if report["dry_run"] else "deleted"
+            print(f"[INFO] Snapshot retention: {action} {report['rows_deleted']} of {report['rows_before']} rows "
+                  f"in {len(report['months'])} months (~{report['estimated_bytes_reclaimed'] / 1e6:.1f} MB)")
+        except Exception as e:
+            print(f"[ERROR] Snapshot retention failed: {e}")
+
+    def get_metrics(self):
+        return {"settings": self.settings(), "last_run": self.last_report}
+
+
+def _vacuum(conn):
+    # conn is the writer's raw sqlite3 connection
+    conn.execute("VACUUM")
+    conn.execute("ANALYZE")
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# Singleton instance
+snapshot_retention = SnapshotRetention()
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Compact old snapshot rows to month-end")
+    parser.add_argument("--apply", action="store_true", help="Delete rows (default: dry run)")
+    parser.add_argument("--detail-days", type=int, help="Override database.retention.detail_days")
+    args = parser.parse_args()
+    try:
+        print(json.dumps(snapshot_retention.run(dry_run=not args.apply, detail_days=args.detail_days), indent=2))
+    finally:
+        db_writer.stop()
@@ -0,0 +1,213 @@
+"""
+Week / month / year rollups of daily_summary.
+
+summary_rollup keeps one row per (resolution, period) with the OHLC of total
+asset value, the closing cost and net investment, the period's net deposit
+flow and the last benchmark closes, so a multi-year chart reads a few hundred
+rows instead of one per day. Writes that change a DailySummary (or a deposit)
+mark its date; when the session commits, the week, month and year containing
+each marked date are recomputed from their daily rows in the same transaction.
+Core writes that bypass those paths are followed by rebuild_rollups().
+
+Run from project root:
+    python -m src.database.rollups --rebuild
+"""
+import datetime
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from src.database.models import DailySummary, DepositLedger, SummaryRollup
+
+# Coarsest last; "day" means DailySummary itself
+RESOLUTIONS = ("week", "month", "year")
+ROLLUP_COLUMNS = (
+    "period_end", "first_date", "last_date", "days",
+    "open_asset_krw", "high_asset_krw", "low_asset_krw", "close_asset_krw",
+    "close_cost_krw", "net_flow_krw", "net_investment_krw", "kospi_close", "sp500_close",
+)
+
+
+def period_start(resolution, day):
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    if resolution == "year":
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+def period_end(resolution, start):
+    if resolution == "day":
+        return start
+    if resolution == "week":
+        return start + datetime.timedelta(days=6)
+    if resolution == "month":
+        next_start = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        return next_start - datetime.timedelta(days=1)
+    return start.replace(month=12, day=31)
+
+
+def count_periods(resolution, start, end):
+    """Periods of `resolution` touched by start..end (inclusive)."""
+    first, last = period_start(resolution, start), period_start(resolution, end)
+    if resolution == "day":
+        return (last - first).days + 1
+    if resolution == "week":
+        return (last - first).days // 7 + 1
+    if resolution == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return last.year - first.year + 1
+
+
+def choose_resolution(start, end, max_points):
+    """The finest resolution whose point count for start..end fits max_points (else "year")."""
+    for resolution in ("day", *RESOLUTIONS):
+        if count_periods(resolution, start, end) <= max_points:
+            return resolution
+    return "year"
+
+
+def aggregate_period(rows, flows=0.0):
+    """
+    One rollup's values from a period's DailySummary rows (date order, each with
+    date, total_asset_krw, total_cost_krw, net_investment_krw, kospi_close, sp500_close).
+    """
+    assets = [row.total_asset_krw or 0.0 for row in rows]
+    return {
+        "first_date": rows[0].date,
+        "last_date": rows[-1].date,
+        "days": len(rows),
+        "open_asset_krw": assets[0],
+        "high_asset_krw": max(assets),
+        "low_asset_krw": min(assets),
+        "close_asset_krw": assets[-1],
+        "close_cost_krw": rows[-1].total_cost_krw or 0.0,
+        "net_flow_krw": flows,
+        "net_investment_krw": rows[-1].net_investment_krw or 0.0,
+        "kospi_close": next((row.kospi_close for row in reversed(rows) if row.kospi_close), None),
+        "sp500_close": next((row.sp500_close for row in reversed(rows) if row.sp500_close), None),
+    }
+
+
+def _daily_rows(db, first, last):
+    summaries = db.execute(
+        select(
+            DailySummary.date, DailySummary.total_asset_krw, DailySummary.total_cost_krw,
+            DailySummary.net_investment_krw, DailySummary.kospi_close, DailySummary.sp500_close,
+        ).where(DailySummary.date.between(first, last)).order_by(DailySummary.date)
+    ).all()
+    flows = dict(db.execute(
+        select(DepositLedger.date, DepositLedger.amount_krw).where(DepositLedger.date.between(first, last))
+    ).all())
+    return summaries, flows
+
+
+def _compute(summaries, flows, keys=None):
+    """{(resolution, period_start): values} from daily rows, for `keys` (default every period present)."""
+    by_period = {}
+    for row in summaries:
+        for resolution in RESOLUTIONS:
+            key = (resolution, period_start(resolution, row.date))
+            if keys is None or key in keys:
+                by_period.setdefault(key, []).append(row)
+    flow_by_period = {}
+    for day, amount in flows.items():
+        for resolution in RESOLUTIONS:
+            key = (resolution, period_start(resolution, day))
+            flow_by_period[key] = flow_by_period.get(key, 0.0) + (amount or 0.0)
+    return {
+        key: {"period_end": period_end(key[0], key[1]), **aggregate_period(rows, flow_by_period.get(key, 0.0))}
+        for key, rows in by_period.items()
+    }
+
+
+def _write(db, computed):
+    if not computed:
+        return
+    stmt = sqlite_insert(SummaryRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["resolution", "period_start"],
+        set_={column: stmt.excluded[column] for column in ROLLUP_COLUMNS},
+    )
+    db.execute(stmt, [
+        {"resolution": resolution, "period_start": start, **values}
+        for (resolution, start), values in computed.items()
+    ])
+
+
+def refresh_rollups(db, dates):
+    """Recomputes the week, month and year rollups containing each date. Returns the rows written."""
+    keys = {(resolution, period_start(resolution, day)) for day in dates for resolution in RESOLUTIONS}
+    if not keys:
+        return 0
+    first = min(start for _, start in keys)
+    last = max(period_end(resolution, start) for resolution, start in keys)
+    computed = _compute(*_daily_rows(db, first, last), keys=keys)
+    _write(db, computed)
+
+    # Periods whose last daily row is gone
+    for resolution, start in keys - computed.keys():
+        db.execute(delete(SummaryRollup).where(
+            SummaryRollup.resolution == resolution, SummaryRollup.period_start == start
+        ))
+    return len(computed)
+
+
+def rebuild_rollups(db):
+    """Recomputes every rollup from daily_summary (Session or Connection). Returns the rows written."""
+    db.execute(delete(SummaryRollup))
+    computed = _compute(*_daily_rows(db, datetime.date.min, datetime.date.max))
+    _write(db, computed)
+    return len(computed)
+
+
+# ── Session maintenance (same transaction as the summary write) ──
+
+def mark_rollups_dirty(db: Session, day):
+    """Queues `day`'s rollups for recomputation when `db` commits."""
+    if db is not None:
+        db.info.setdefault("dirty_rollups", set()).add(day)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_dirty_rollups(session):
+    if not session.info.get("dirty_rollups"):
+        return
+    session.flush()  # ORM summary/deposit changes (and their marks) reach the database first
+    refresh_rollups(session, session.info.pop("dirty_rollups"))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_dirty_rollups(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("dirty_rollups", None)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.engine import SessionLocal
+    from src.database.writer import db_writer
+
+    parser = argparse.ArgumentParser(description="Maintain the week/month/year summary rollups")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every rollup from daily_summary")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        try:
+            print(f"Rebuilt rollups: {db_writer.run(rebuild_rollups)} periods.")
+        finally:
+            db_writer.stop()
+
+    db = SessionLocal()
+    try:
+        for resolution in RESOLUTIONS:
+            count = db.query(SummaryRollup).filter(SummaryRollup.resolution == resolution).count()
+            print(f"{resolution:>6}: {count} periods")
+    finally:
+        db.close()
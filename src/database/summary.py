@@ -0,0 +1,134 @@
+"""
+Incremental DailySummary totals.
+
+upsert_snapshots() and delete_snapshots() (src/database/utils.py) pass the
+change in each date's value and cost here, so a summary's total_asset_krw /
+total_cost_krw (and the derived P&L and return) always match its snapshot
+rows without re-reading them. verify_daily_summaries() recomputes the totals
+with one GROUP BY to catch drift from writes that bypass those helpers.
+"""
+import datetime
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.config_loader import get_database_config
+from src.database.ledger import net_investment_as_of
+from src.database.models import DailyPortfolioSnapshot, DailySummary
+from src.database.rollups import mark_rollups_dirty
+
+DEFAULT_VERIFY_DAYS = 35
+DRIFT_TOLERANCE_KRW = 1.0  # Float error from repeated deltas stays far below this
+
+
+def snapshot_cost(avg_buy_price, quantity, exchange_rate):
+    """Cost basis of one snapshot row in KRW."""
+    return (avg_buy_price or 0.0) * (quantity or 0.0) * (exchange_rate if exchange_rate is not None else 1.0)
+
+
+def derived_values(total_asset, total_cost):
+    """profit_loss_krw / return_rate_pct, as update_daily_summary has always computed them."""
+    return {
+        "profit_loss_krw": total_asset - total_cost,
+        "return_rate_pct": ((total_asset / total_cost) - 1) * 100 if total_cost > 0 else 0.0,
+    }
+
+
+def _derived_columns(total_asset, total_cost):
+    """derived_values() as SQL expressions over the updated totals."""
+    return {
+        "profit_loss_krw": total_asset - total_cost,
+        "return_rate_pct": case((total_cost > 0, (total_asset / total_cost - 1) * 100), else_=0.0),
+    }
+
+
+def apply_summary_delta(db, date, asset_delta, cost_delta, snapshot_time=None):
+    """Adds to a date's summary totals (creating the row if needed) in one upsert."""
+    if not asset_delta and not cost_delta:
+        return
+    stmt = sqlite_insert(DailySummary).values(
+        date=date,
+        snapshot_time=snapshot_time,
+        total_asset_krw=asset_delta,
+        total_cost_krw=cost_delta,
+        **derived_values(asset_delta, cost_delta),
+    )
+    total_asset = DailySummary.total_asset_krw + stmt.excluded.total_asset_krw
+    total_cost = DailySummary.total_cost_krw + stmt.excluded.total_cost_krw
+    values = {"total_asset_krw": total_asset, "total_cost_krw": total_cost, **_derived_columns(total_asset, total_cost)}
+    if snapshot_time is not None:
+        values["snapshot_time"] = snapshot_time
+    db.execute(stmt.on_conflict_do_update(index_elements=["date"], set_=values))
+    mark_rollups_dirty(db, date)
+
+
+def verify_daily_summaries(db, since=None, repair=False):
+    """
+    Compares summary totals with their snapshot rows from `since` on
+    (default: database.summary_verify_days back), including dates with
+    snapshots but no summary. Returns the drifted dates as
+    {date: (summary asset, actual asset, summary cost, actual cost)}, the
+    summary values None where the row is missing; with repair=True they are
+    corrected (or created) in place.
+    """
+    if since is None:
+        days = int(get_database_config().get("summary_verify_days", DEFAULT_VERIFY_DAYS))
+        since = datetime.date.today() - datetime.timedelta(days=days)
+
+    actual = {
+        row.date: (row.asset or 0.0, row.cost or 0.0)
+        for row in db.execute(
+            select(
+                DailyPortfolioSnapshot.date,
+                func.sum(DailyPortfolioSnapshot.value_krw).label("asset"),
+                # Same NULL handling as snapshot_cost()
+                func.sum(
+                    func.coalesce(DailyPortfolioSnapshot.avg_buy_price, 0.0)
+                    * func.coalesce(DailyPortfolioSnapshot.quantity, 0.0)
+                    * func.coalesce(DailyPortfolioSnapshot.exchange_rate, 1.0)
+                ).label("cost"),
+            ).where(DailyPortfolioSnapshot.date >= since).group_by(DailyPortfolioSnapshot.date)
+        )
+    }
+    summaries = {
+        row.date: (row.total_asset_krw, row.total_cost_krw)
+        for row in db.execute(
+            select(DailySummary.date, DailySummary.total_asset_krw, DailySummary.total_cost_krw)
+            .where(DailySummary.date >= since)
+        )
+    }
+
+    # Every date with either side: snapshots whose summary row is missing drift too
+    drift = {}
+    for date in sorted(summaries.keys() | actual.keys()):
+        summary_asset, summary_cost = summaries.get(date, (None, None))
+        asset, cost = actual.get(date, (0.0, 0.0))
+        if (date not in summaries
+                or abs((summary_asset or 0.0) - asset) > DRIFT_TOLERANCE_KRW
+                or abs((summary_cost or 0.0) - cost) > DRIFT_TOLERANCE_KRW):
+            drift[date] = (summary_asset, asset, summary_cost, cost)
+
+    for date, (_, asset, _, cost) in drift.items():
+        print(f"[WARN] DailySummary {date} drifted from its snapshots: {drift[date]}")
+        if repair:
+            summary = db.get(DailySummary, date)
+            if summary is None:
+                summary = DailySummary(date=date, net_investment_krw=net_investment_as_of(db, date))
+                db.add(summary)
+            summary.total_asset_krw = asset
+            summary.total_cost_krw = cost
+            for key, value in derived_values(asset, cost).items():
+                setattr(summary, key, value)
+            mark_rollups_dirty(db, date)
+    return drift
+
+
+def verify_summaries_job():
+    """Scheduled check: repairs drifted summaries in the verification window."""
+    from src.database.writer import db_writer
+
+    try:
+        drift = db_writer.run(verify_daily_summaries, repair=True)
+        print(f"[INFO] Summary verification: {len(drift)} drifted dates repaired")
+    except Exception as e:
+        print(f"[ERROR] Summary verification failed: {e}")
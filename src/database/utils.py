@@ -1,11 +1,31 @@
 """Database utility functions for instrument management."""
-from datetime import datetime
+from datetime import date as date_type, datetime
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from src.database.models import Instrument, AssetType
+from src.database.models import Instrument, AssetType, DailyPortfolioSnapshot, DailySummary
+from src.database.instrument_index import InstrumentEntry, instrument_index, record_entry
+from src.database.summary import apply_summary_delta, snapshot_cost
+
+# Bound parameters per IN (...) query; stays under SQLite's variable limit on old builds (999)
+IN_CHUNK_SIZE = 500
+
+# Columns overwritten when a (date, instrument_id) snapshot already exists
+SNAPSHOT_UPDATE_COLUMNS = (
+    "snapshot_time", "quantity", "close_price", "avg_buy_price",
+    "exchange_rate", "value_krw", "profit_loss_krw",
+)
 
 
 def get_or_create_instrument(db: Session, symbol, name, asset_type, currency="KRW", brokerage=None, exchange=None):
     """Find or create an instrument in the master table."""
+    entry = instrument_index.lookup(db, symbol, asset_type, brokerage)
+    if entry:
+        instrument = db.get(Instrument, entry.id)  # No query if already in the session
+        if instrument:
+            _refresh_instrument(instrument, name, exchange)
+            return instrument
+
     # Search by symbol + asset_type (most reliable combo)
     query = db.query(Instrument).filter(
         Instrument.symbol == symbol,
@@ -17,10 +37,9 @@ def get_or_create_instrument(db: Session, symbol, name, asset_type, currency="KR
     instrument = query.first()
     
     if instrument:
-        # Update name if changed
-        if name and instrument.name != name:
-            instrument.name = name
-            instrument.updated_at = datetime.utcnow()
+        # Committed by another process since the index was loaded
+        _remember(db, instrument)
+        _refresh_instrument(instrument, name, exchange)
         return instrument
     
     # Create new instrument
@@ -37,6 +56,210 @@ def get_or_create_instrument(db: Session, symbol, name, asset_type, currency="KR
     return instrument
 
 
+def resolve_instrument_id(db: Session, symbol, name, asset_type, currency="KRW", brokerage=None, exchange=None):
+    """get_or_create_instrument for callers that only need the id: an index lookup, no ORM load."""
+    entry = instrument_index.lookup(db, symbol, asset_type, brokerage)
+    if entry is None:
+        return get_or_create_instrument(db, symbol, name, asset_type, currency, brokerage, exchange).id
+    _refresh_entry(db, entry, symbol, asset_type, name, exchange)
+    return entry.id
+
+
+def _remember(db, instrument):
+    record_entry(db, instrument.symbol, instrument.asset_type,
+                 InstrumentEntry(instrument.id, instrument.brokerage, instrument.name, instrument.exchange))
+
+
+def _refresh_entry(db, entry, symbol, asset_type, name, exchange):
+    """_refresh_instrument for an index entry, as a direct UPDATE."""
+    values = {}
+    if name and entry.name != name:
+        values["name"] = name
+    if exchange and entry.exchange != exchange:
+        values["exchange"] = exchange
+    if values:
+        db.query(Instrument).filter(Instrument.id == entry.id).update(
+            {**values, "updated_at": datetime.utcnow()}
+        )
+        record_entry(db, symbol, asset_type, InstrumentEntry(
+            entry.id, entry.brokerage, values.get("name", entry.name), values.get("exchange", entry.exchange)
+        ))
+
+
+def _refresh_instrument(instrument, name, exchange):
+    # Update name if changed
+    if name and instrument.name != name:
+        instrument.name = name
+        instrument.updated_at = datetime.utcnow()
+    # Correct the listing exchange when the broker reports a different one
+    if exchange and instrument.exchange != exchange:
+        instrument.exchange = exchange
+        instrument.updated_at = datetime.utcnow()
+
+
+def resolve_instruments(db: Session, specs):
+    """
+    Bulk resolve_instrument_id with the same matching rules.
+    specs: dicts of get_or_create_instrument keyword arguments.
+    Returns instrument ids in spec order. Index misses are looked up with one
+    IN (...) query per chunk, and new instruments are inserted with one flush.
+    """
+    ids = [None] * len(specs)
+    missed = []
+    for n, spec in enumerate(specs):
+        entry = instrument_index.lookup(db, spec["symbol"], spec["asset_type"], spec.get("brokerage"))
+        if entry:
+            _refresh_entry(db, entry, spec["symbol"], spec["asset_type"], spec.get("name"), spec.get("exchange"))
+            ids[n] = entry.id
+        else:
+            missed.append(n)
+    if not missed:
+        return ids
+
+    symbols = {specs[n]["symbol"] for n in missed}
+    named = sorted(s for s in symbols if s is not None)
+    candidates = {}  # (symbol, asset_type) -> instruments in id order (first() order)
+
+    filters = [Instrument.symbol.in_(named[i:i + IN_CHUNK_SIZE]) for i in range(0, len(named), IN_CHUNK_SIZE)]
+    if None in symbols:
+        filters.append(Instrument.symbol.is_(None))
+    for condition in filters:
+        for instrument in db.query(Instrument).filter(condition).order_by(Instrument.id):
+            candidates.setdefault((instrument.symbol, instrument.asset_type), []).append(instrument)
+
+    resolved = []
+    created = []
+    for n in missed:
+        spec = specs[n]
+        key = (spec["symbol"], spec["asset_type"])
+        brokerage = spec.get("brokerage")
+        instrument = next(
+            (i for i in candidates.get(key, ()) if not brokerage or i.brokerage == brokerage), None
+        )
+        if instrument:
+            if instrument.id is not None:
+                _remember(db, instrument)
+            _refresh_instrument(instrument, spec.get("name"), spec.get("exchange"))
+        else:
+            instrument = Instrument(
+                symbol=spec["symbol"],
+                name=spec.get("name") or spec["symbol"],
+                asset_type=spec["asset_type"],
+                currency=spec.get("currency", "KRW"),
+                brokerage=brokerage,
+                exchange=spec.get("exchange")
+            )
+            # Later specs in the same batch match it like an existing row
+            candidates.setdefault(key, []).append(instrument)
+            created.append(instrument)
+        resolved.append((n, instrument))
+
+    if created:
+        db.add_all(created)
+        db.flush()  # Get the IDs without committing
+    for n, instrument in resolved:
+        ids[n] = instrument.id
+    return ids
+
+
+def _existing_snapshots(db, keys):
+    """{(date, instrument_id): (value_krw, cost_krw)} for the rows that already exist."""
+    by_date = {}
+    for date, instrument_id in keys:
+        by_date.setdefault(date, []).append(instrument_id)
+    existing = {}
+    for date, instrument_ids in by_date.items():
+        for i in range(0, len(instrument_ids), IN_CHUNK_SIZE):
+            for row in db.execute(
+                select(
+                    DailyPortfolioSnapshot.instrument_id, DailyPortfolioSnapshot.value_krw,
+                    DailyPortfolioSnapshot.avg_buy_price, DailyPortfolioSnapshot.quantity,
+                    DailyPortfolioSnapshot.exchange_rate,
+                ).where(
+                    DailyPortfolioSnapshot.date == date,
+                    DailyPortfolioSnapshot.instrument_id.in_(instrument_ids[i:i + IN_CHUNK_SIZE]),
+                )
+            ):
+                existing[(date, row.instrument_id)] = (
+                    row.value_krw, snapshot_cost(row.avg_buy_price, row.quantity, row.exchange_rate)
+                )
+    return existing
+
+
+def upsert_snapshots(db: Session, rows):
+    """
+    Inserts or updates DailyPortfolioSnapshot rows with one
+    INSERT ... ON CONFLICT(date, instrument_id) DO UPDATE executemany,
+    and moves each date's DailySummary totals by old vs new values.
+    """
+    if not rows:
+        return 0
+    # Last row wins for duplicate keys, as sequential upserts would
+    rows = list({(row["date"], row["instrument_id"]): row for row in rows}.values())
+    existing = _existing_snapshots(db, [(row["date"], row["instrument_id"]) for row in rows])
+
+    stmt = sqlite_insert(DailyPortfolioSnapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date", "instrument_id"],
+        set_={column: stmt.excluded[column] for column in SNAPSHOT_UPDATE_COLUMNS},
+    )
+    db.execute(stmt, rows)
+
+    deltas = {}  # date -> [asset delta, cost delta, latest snapshot_time]
+    for row in rows:
+        old_value, old_cost = existing.get((row["date"], row["instrument_id"]), (0.0, 0.0))
+        cost = snapshot_cost(row.get("avg_buy_price", 0.0), row.get("quantity", 0.0), row.get("exchange_rate", 1.0))
+        delta = deltas.setdefault(row["date"], [0.0, 0.0, None])
+        delta[0] += row["value_krw"] - old_value
+        delta[1] += cost - old_cost
+        delta[2] = max(filter(None, (delta[2], row.get("snapshot_time"))), default=None)
+    for date, (asset_delta, cost_delta, snapshot_time) in deltas.items():
+        apply_summary_delta(db, date, asset_delta, cost_delta, snapshot_time)
+    return len(rows)
+
+
+def delete_snapshots(db: Session, date, instrument_ids):
+    """Deletes a date's snapshot rows for these instruments and takes them out of its summary."""
+    existing = _existing_snapshots(db, [(date, instrument_id) for instrument_id in instrument_ids])
+    if not existing:
+        return 0
+    db.execute(delete(DailyPortfolioSnapshot).where(
+        DailyPortfolioSnapshot.date == date,
+        DailyPortfolioSnapshot.instrument_id.in_([instrument_id for _, instrument_id in existing]),
+    ))
+    apply_summary_delta(
+        db, date,
+        -sum(value for value, _ in existing.values()),
+        -sum(cost for _, cost in existing.values()),
+    )
+    return len(existing)
+
+
+def ingest_snapshots(db: Session, date, snapshot_time, holdings):
+    """
+    Writes a day of snapshots in bulk (one instrument resolve + one upsert).
+    holdings: dicts with the instrument fields (symbol, name, asset_type, currency,
+    brokerage, exchange) and the snapshot values (quantity, close_price,
+    avg_buy_price, exchange_rate, value_krw, profit_loss_krw).
+    """
+    instrument_ids = resolve_instruments(db, holdings)
+    rows = [
+        {
+            "date": date,
+            "instrument_id": instrument_id,
+            "snapshot_time": snapshot_time,
+            "quantity": h["quantity"],
+            "close_price": h["close_price"],
+            "avg_buy_price": h["avg_buy_price"],
+            "exchange_rate": h["exchange_rate"],
+            "value_krw": h["value_krw"],
+            "profit_loss_krw": h["profit_loss_krw"],
+        }
+        for instrument_id, h in zip(instrument_ids, holdings)
+    ]
+    return upsert_snapshots(db, rows)
+
+
 def map_manual_asset_type(asset_type_str: str) -> AssetType:
     """Map manual asset type string to AssetType enum."""
     type_map = {
@@ -48,3 +271,88 @@ def map_manual_asset_type(asset_type_str: str) -> AssetType:
         "CASH": AssetType.CASH_KRW,
     }
     return type_map.get(asset_type_str, AssetType.MANUAL)
+
+
+def manual_asset_spec(asset):
+    """Instrument fields a ManualAsset is snapshotted under (as snapshot_assets resolves it)."""
+    return dict(
+        symbol=asset.symbol, name=asset.name,
+        asset_type=map_manual_asset_type(asset.asset_type),
+        currency=asset.currency,
+        brokerage=asset.brokerage if asset.brokerage != "Manual" else None,
+    )
+
+
+def find_instrument_id(db: Session, symbol, asset_type, brokerage=None):
+    """Id of a matching instrument, or None; never creates one."""
+    entry = instrument_index.lookup(db, symbol, asset_type, brokerage)
+    if entry:
+        return entry.id
+    query = db.query(Instrument.id).filter(
+        Instrument.symbol.is_(None) if symbol is None else Instrument.symbol == symbol,
+        Instrument.asset_type == asset_type
+    )
+    if brokerage:
+        query = query.filter(Instrument.brokerage == brokerage)
+    return query.order_by(Instrument.id).scalar()
+
+
+def _snapshot_exchange_rate(db, date, currency, instrument_id=None):
+    """A currency's rate as recorded in the date's snapshot (KRW is 1.0); None if there is none."""
+    if currency == "KRW":
+        return 1.0
+    if instrument_id is not None:
+        rate = db.execute(select(DailyPortfolioSnapshot.exchange_rate).where(
+            DailyPortfolioSnapshot.date == date, DailyPortfolioSnapshot.instrument_id == instrument_id
+        )).scalar()
+        if rate is not None:
+            return rate
+    return db.execute(
+        select(DailyPortfolioSnapshot.exchange_rate)
+        .join(Instrument, Instrument.id == DailyPortfolioSnapshot.instrument_id)
+        .where(DailyPortfolioSnapshot.date == date, Instrument.currency == currency)
+        .limit(1)
+    ).scalar()
+
+
+def refresh_manual_asset_snapshot(db: Session, asset, date=None):
+    """
+    Rewrites a manual asset's snapshot row for `date` (default today) so the
+    day's summary reflects an edit immediately: one upsert and one summary
+    delta. Only days that already have a summary are touched; otherwise the
+    next scheduled snapshot picks the asset up. Returns True if written.
+    """
+    date = date or date_type.today()
+    if db.get(DailySummary, date) is None:
+        return False
+    spec = manual_asset_spec(asset)
+    instrument_id = find_instrument_id(db, spec["symbol"], spec["asset_type"], spec["brokerage"])
+    rate = _snapshot_exchange_rate(db, date, asset.currency, instrument_id)
+    if rate is None:
+        print(f"[WARN] No {asset.currency} rate in the {date} snapshot; "
+              f"'{asset.name}' is updated at the next snapshot")
+        return False
+    if instrument_id is None:
+        instrument_id = resolve_instrument_id(db, **spec)
+
+    value_krw = asset.current_price * asset.quantity * rate
+    upsert_snapshots(db, [{
+        "date": date,
+        "instrument_id": instrument_id,
+        "snapshot_time": datetime.now(),
+        "quantity": asset.quantity,
+        "close_price": asset.current_price,
+        "avg_buy_price": asset.buy_price,
+        "exchange_rate": rate,
+        "value_krw": value_krw,
+        "profit_loss_krw": value_krw - asset.buy_price * asset.quantity * rate,
+    }])
+    return True
+
+
+def remove_manual_asset_snapshot(db: Session, spec, date=None):
+    """Deletes the snapshot row of a manual asset's instrument spec for `date` (default today)."""
+    instrument_id = find_instrument_id(db, spec["symbol"], spec["asset_type"], spec["brokerage"])
+    if instrument_id is None:
+        return 0
+    return delete_snapshots(db, date or date_type.today(), [instrument_id])
@@ -0,0 +1,297 @@
+"""
+Single writer thread for database writes.
+
+Scheduler jobs, the trade executor and the manual-asset routes all write to
+one SQLite file; separate sessions committing on their own threads queue on
+SQLite's write lock, and a transaction that reads before writing can fail
+with "database is locked" instead of waiting. Here every write is a job
+(a callable taking a Session) on a bounded queue, run by one thread that
+owns the only write transactions:
+
+  - Jobs waiting in the queue are group-committed: up to max_batch of them
+    share one BEGIN IMMEDIATE ... COMMIT and one flush. If any of them fails,
+    the batch is rolled back and re-run with each job in its own SAVEPOINT,
+    so only the failing job is lost; jobs must therefore be safe to re-run.
+  - submit() returns a concurrent.futures.Future that resolves with the
+    job's return value once its transaction has committed (durable), or with
+    its exception. Callers that don't need durability just don't wait.
+  - A full queue blocks submit() (backpressure) up to put_timeout seconds.
+
+Jobs may read, add, flush and execute, but never commit or roll back the
+session themselves; the writer owns the transaction. Statements that can't
+run inside a transaction (VACUUM, WAL checkpoints) go through
+submit_maintenance(): the job runs alone between batches on the writer's
+raw sqlite3 connection.
+
+Exempt: schema migrations (src/database/migrations.py) run at startup
+before anything is queued.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.orm import sessionmaker
+
+from src.config_loader import get_database_config
+from src.database.engine import DB_URL, make_engine
+
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2
+DEFAULT_PUT_TIMEOUT = 30.0
+
+_STOP = object()
+
+
+class _Maintenance:
+    """A job that runs outside any transaction; it ends the batch it is queued behind."""
+    __slots__ = ("future", "fn", "args", "kwargs")
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+class DatabaseWriter:
+    def __init__(self, url=DB_URL, max_pending=None, max_batch=None, max_wait_ms=None, put_timeout=None):
+        config = get_database_config().get("writer") or {}
+        self.url = url
+        self.max_batch = int(max_batch or config.get("max_batch", DEFAULT_MAX_BATCH))
+        self.max_wait = float(max_wait_ms if max_wait_ms is not None
+                              else config.get("max_wait_ms", DEFAULT_MAX_WAIT_MS)) / 1000
+        self.put_timeout = float(put_timeout if put_timeout is not None
+                                 else config.get("put_timeout", DEFAULT_PUT_TIMEOUT))
+        self._queue = queue.Queue(maxsize=int(max_pending if max_pending is not None
+                                              else config.get("max_pending", DEFAULT_MAX_PENDING)))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._engine = None
+        self._session_factory = None
+
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+        self.retried_batches = 0
+        self.max_depth = 0
+
+    # ── Lifecycle ──
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            if self._engine is None:
+                # One connection: this thread is the only writer
+                self._engine = make_engine(self.url, pool_size=1, max_overflow=0, begin_immediate=True)
+                # Returned ORM objects stay readable after their session closes
+                self._session_factory = sessionmaker(bind=self._engine, autoflush=False, expire_on_commit=False)
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Commits everything already queued, then stops the thread."""
+        with self._lock:
+            thread = self._thread
+        if thread and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        if self._engine is not None:
+            self._engine.dispose()
+
+    # ── API ──
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues fn(db, *args, **kwargs) for the writer thread. Returns a Future
+        that resolves after the job's transaction commits.
+        """
+        future = Future()
+        self._put((future, fn, args, kwargs))
+        return future
+
+    def submit_maintenance(self, fn, *args, **kwargs):
+        """
+        Queues fn(dbapi_connection, *args, **kwargs) to run after the writes
+        queued before it, alone and outside any transaction. Returns a Future.
+        """
+        future = Future()
+        self._put(_Maintenance(future, fn, args, kwargs))
+        return future
+
+    def _put(self, item):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Submitting from a write job would wait on itself; call the function directly")
+        if not (self._thread and self._thread.is_alive()):
+            self.start()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            raise RuntimeError(f"Database write queue full ({self._queue.maxsize} pending)") from None
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def run(self, fn, *args, **kwargs):
+        """submit() and wait for the commit. Returns the job's result or raises its exception."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def run_maintenance(self, fn, *args, **kwargs):
+        """submit_maintenance() and wait. Returns fn's result or raises its exception."""
+        return self.submit_maintenance(fn, *args, **kwargs).result()
+
+    # ── Writer thread ──
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        if batch[0] is _STOP or isinstance(batch[0], _Maintenance):
+            return batch
+        # Group commit: take whatever else is queued, waiting up to max_wait for more
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(job)
+            if job is _STOP or isinstance(job, _Maintenance):
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stopping = batch[-1] is _STOP
+            maintenance = batch.pop() if isinstance(batch[-1], _Maintenance) else None
+            jobs = [job for job in batch if job is not _STOP]
+            if jobs:
+                try:
+                    self._commit_batch(jobs)
+                except Exception as e:
+                    # Keep the writer alive; nobody may be left waiting forever
+                    print(f"[ERROR] Database writer batch failed: {e}")
+                    for future, _, _, _ in jobs:
+                        if not future.done():
+                            future.set_exception(e)
+            if maintenance is not None:
+                self._run_maintenance(maintenance)
+            if stopping:
+                return
+
+    def _commit_batch(self, jobs):
+        jobs = [job for job in jobs if job[0].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        if len(jobs) > 1:
+            outcomes = self._run_together(jobs)
+            if outcomes is None:
+                # Something failed: isolate each job in a savepoint
+                outcomes = self._run_isolated(jobs)
+        else:
+            outcomes = self._run_isolated(jobs)
+        if outcomes is None:
+            # The shared commit itself failed: give every job its own transaction
+            if len(jobs) > 1:
+                print(f"[WARN] Group commit of {len(jobs)} writes failed; retrying one by one")
+                self.retried_batches += 1
+            outcomes = [self._run_single(job) for job in jobs]
+        else:
+            self.batches += 1
+
+        for future, result, error in outcomes:
+            if error is None:
+                self.committed += 1
+                future.set_result(result)
+            else:
+                self.failed += 1
+                future.set_exception(error)
+
+    def _run_together(self, jobs):
+        """Common case: every job in one transaction, flushed once. None if anything fails."""
+        db = self._session_factory()
+        try:
+            results = [fn(db, *args, **kwargs) for _, fn, args, kwargs in jobs]
+            db.commit()
+        except Exception:
+            db.rollback()
+            return None
+        finally:
+            db.close()
+        return [(job[0], result, None) for job, result in zip(jobs, results)]
+
+    def _run_isolated(self, jobs):
+        """Each job in its own SAVEPOINT, so a failing one rolls back alone. None if the commit fails."""
+        outcomes = []
+        db = self._session_factory()
+        try:
+            for future, fn, args, kwargs in jobs:
+                savepoint = db.begin_nested()
+                try:
+                    result = fn(db, *args, **kwargs)
+                    if savepoint.is_active:
+                        savepoint.commit()
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    if savepoint.is_active:
+                        savepoint.rollback()
+                    outcomes.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(jobs) == 1:
+                return [(jobs[0][0], None, e)]
+            return None
+        finally:
+            db.close()
+        return outcomes
+
+    def _run_single(self, job):
+        future, fn, args, kwargs = job
+        db = self._session_factory()
+        try:
+            result = fn(db, *args, **kwargs)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            return future, None, e
+        finally:
+            db.close()
+        return future, result, None
+
+    def _run_maintenance(self, job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        # Writer connections leave transaction control to us (isolation_level None),
+        # so on the raw connection nothing is open unless the job begins it
+        connection = self._engine.raw_connection()
+        try:
+            result = job.fn(connection.driver_connection, *job.args, **job.kwargs)
+        except Exception as e:
+            self.failed += 1
+            job.future.set_exception(e)
+        else:
+            self.committed += 1
+            job.future.set_result(result)
+        finally:
+            connection.close()
+
+    def get_metrics(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "pending": self._queue.qsize(),
+            "max_pending": self._queue.maxsize,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "committed": self.committed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch": round(self.committed / self.batches, 2) if self.batches else 0.0,
+            "retried_batches": self.retried_batches,
+        }
+
+
+# Singleton instance
+db_writer = DatabaseWriter()
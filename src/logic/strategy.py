@@ -1,6 +1,27 @@
 import datetime
 from src.logic.trade_executor import executor
 from src.database.models import AssetType
+from src.api.domestic import DomesticAPI, parse_domestic_quote
+from src.api.realtime import get_latest_price
+
+WATCH_SYMBOL = "005930"  # Samsung Electronics
+MAX_TICK_AGE = 60  # Seconds before a streamed price is considered stale
+
+
+def current_price(symbol, max_age=MAX_TICK_AGE):
+    """Latest streamed price (O(1), no REST call), else a REST quote. None if neither is available."""
+    live = get_latest_price(symbol, max_age=max_age)
+    if live is not None:
+        return live.price
+    res = DomesticAPI().get_current_price(symbol)
+    if res is None:
+        return None
+    try:
+        return parse_domestic_quote(res)["price"]
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"[WARN] Unparseable quote for {symbol}: {e}")
+        return None
+
 
 # Simple demo strategy
 def run_strategy():
@@ -10,13 +31,17 @@ def run_strategy():
     In reality, you would check indicators here.
     """
     print(f"[{datetime.datetime.now()}] Running Strategy...")
-    
+
     # 1. Fetch data (e.g., check price)
+    price = current_price(WATCH_SYMBOL)
+    if price is None:
+        print(f"[WARN] No price for {WATCH_SYMBOL}; strategy check skipped")
+        return
     # 2. Decide logic
     # if condition:
     #     executor.execute_order(...)
-    
+
     # Example: Just print for now
-    print("Strategy Check Complete: No signals.")
+    print(f"Strategy Check Complete ({WATCH_SYMBOL} @ {price:,.0f}): No signals.")
 
 # Use this function in scheduler
@@ -1,13 +1,17 @@
+import asyncio
 from datetime import datetime
-from src.database.engine import SessionLocal
+from src.database.writer import db_writer
 from src.database.models import TradeLog, AssetType
 from src.api.domestic import DomesticAPI
 from src.api.overseas import OverseasAPI
+from src.api.async_client import AsyncDomesticAPI, AsyncOverseasAPI
 
 class TradeExecutor:
     def __init__(self):
         self.dom_api = DomesticAPI()
         self.ov_api = OverseasAPI()
+        self.async_dom_api = AsyncDomesticAPI()
+        self.async_ov_api = AsyncOverseasAPI()
 
     def execute_order(self, asset_type: AssetType, symbol: str, side: str, quantity: float, price: float, exchange="NASD"):
         """
@@ -15,7 +19,7 @@ class TradeExecutor:
         side: "BUY" or "SELL"
         """
         print(f"[ORDER] Processing {side} {symbol} ({quantity} @ {price})...")
-        
+
         res = None
         executed = False
         msg = ""
@@ -25,15 +29,8 @@ class TradeExecutor:
                 res = self.dom_api.order_cash(symbol, quantity, price, side)
             elif asset_type == AssetType.STOCK_OVERSEAS:
                 res = self.ov_api.order(symbol, quantity, price, side, exchange)
-            
-            if res and res.get("rt_cd") == "0":
-                executed = True
-                msg = res.get("msg1", "Success")
-                order_no = res.get("output", {}).get("ODNO") # Order Number
-                print(f"[ORDER] Success! Order No: {order_no}")
-            else:
-                msg = res.get("msg1") if res else "Unknown Error"
-                print(f"[ORDER] Failed: {msg}")
+
+            executed, msg = self._check_result(res)
 
         except Exception as e:
             msg = str(e)
@@ -43,24 +40,65 @@ class TradeExecutor:
         self._log_trade(asset_type, symbol, side, quantity, price, msg)
         return executed, msg
 
+    async def execute_order_async(self, asset_type: AssetType, symbol: str, side: str, quantity: float, price: float, exchange="NASD"):
+        """Same as execute_order, but awaits KIS without blocking the event loop."""
+        print(f"[ORDER] Processing {side} {symbol} ({quantity} @ {price})...")
+
+        executed = False
+        msg = ""
+
+        try:
+            res = None
+            if asset_type == AssetType.STOCK_DOMESTIC:
+                res = await self.async_dom_api.order_cash(symbol, quantity, price, side)
+            elif asset_type == AssetType.STOCK_OVERSEAS:
+                res = await self.async_ov_api.order(symbol, quantity, price, side, exchange)
+
+            executed, msg = self._check_result(res)
+
+        except Exception as e:
+            msg = str(e)
+            print(f"[ORDER] Exception: {e}")
+
+        # Log to DB (queued for the writer thread; a full queue blocks, so keep it off the loop)
+        await asyncio.to_thread(self._log_trade, asset_type, symbol, side, quantity, price, msg)
+        return executed, msg
+
+    def _check_result(self, res):
+        """Returns (executed, msg) for a KIS order response."""
+        if res and res.get("rt_cd") == "0":
+            msg = res.get("msg1", "Success")
+            order_no = res.get("output", {}).get("ODNO") # Order Number
+            print(f"[ORDER] Success! Order No: {order_no}")
+            return True, msg
+
+        msg = res.get("msg1") if res else "Unknown Error"
+        print(f"[ORDER] Failed: {msg}")
+        return False, msg
+
     def _log_trade(self, asset_type, symbol, side, quantity, price, msg):
-        db = SessionLocal()
+        """Queues the TradeLog row; group-committed by the writer without holding up the order."""
+        log = TradeLog(
+            timestamp=datetime.utcnow(),
+            asset_type=asset_type,
+            symbol=symbol,
+            side=side,
+            quantity=quantity,
+            price=price,
+            result_msg=msg
+        )
         try:
-            log = TradeLog(
-                timestamp=datetime.utcnow(),
-                asset_type=asset_type,
-                symbol=symbol,
-                side=side,
-                quantity=quantity,
-                price=price,
-                result_msg=msg
-            )
-            db.add(log)
-            db.commit()
+            future = db_writer.submit(lambda db: db.add(log))
         except Exception as e:
             print(f"[ERROR] Failed to log trade: {e}")
-        finally:
-            db.close()
+            return None
+        future.add_done_callback(_report_log_failure)
+        return future
+
+
+def _report_log_failure(future):
+    if future.exception():
+        print(f"[ERROR] Failed to log trade: {future.exception()}")
 
 # Global Instance
 executor = TradeExecutor()
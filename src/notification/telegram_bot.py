@@ -2,10 +2,13 @@ import requests
 from src.config_loader import get_telegram_config
 
 class TelegramBot:
-    def __init__(self):
-        self.config = get_telegram_config()
-        self.token = self.config.get("bot_token")
-        self.chat_id = self.config.get("chat_id")
+    @property
+    def token(self):
+        return get_telegram_config().bot_token
+
+    @property
+    def chat_id(self):
+        return get_telegram_config().chat_id
 
     def send_message(self, message: str):
         """Sends a text message to the configured Telegram chat."""
@@ -2,14 +2,20 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 import time
 import datetime
-from sqlalchemy import and_
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
 from src.database.engine import SessionLocal
-from src.database.models import Instrument, DailyPortfolioSnapshot, DailySummary, AssetType
+from src.database.models import DailySummary, AssetType
 from src.api.domestic import DomesticAPI
-from src.api.overseas import OverseasAPI
+from src.api.overseas import OverseasAPI, merge_overseas_holdings
+from src.api.responses import decode_domestic_balance, decode_overseas_present
+from src.auth.token_manager import token_manager
 
 
-from src.database.utils import get_or_create_instrument
+from src.database.utils import ingest_snapshots, map_manual_asset_type
+from src.database.ledger import net_investment_as_of
+from src.database.rollups import mark_rollups_dirty
+from src.database.writer import db_writer
 
 
 def fetch_kospi_close():
@@ -38,84 +44,36 @@ def fetch_sp500_close():
     return None
 
 
-def upsert_snapshot(db, date, instrument_id, snapshot_time, quantity, close_price,
-                    avg_buy_price, exchange_rate, value_krw, profit_loss_krw):
-    """Insert or update a daily snapshot for an instrument."""
-    existing = db.query(DailyPortfolioSnapshot).filter(
-        and_(
-            DailyPortfolioSnapshot.date == date,
-            DailyPortfolioSnapshot.instrument_id == instrument_id
-        )
-    ).first()
-
-    if existing:
-        existing.snapshot_time = snapshot_time
-        existing.quantity = quantity
-        existing.close_price = close_price
-        existing.avg_buy_price = avg_buy_price
-        existing.exchange_rate = exchange_rate
-        existing.value_krw = value_krw
-        existing.profit_loss_krw = profit_loss_krw
-    else:
-        snapshot = DailyPortfolioSnapshot(
-            date=date,
-            instrument_id=instrument_id,
-            snapshot_time=snapshot_time,
-            quantity=quantity,
-            close_price=close_price,
-            avg_buy_price=avg_buy_price,
-            exchange_rate=exchange_rate,
-            value_krw=value_krw,
-            profit_loss_krw=profit_loss_krw
-        )
-        db.add(snapshot)
-
-
-def update_daily_summary(db, date, snapshot_time):
-    """Aggregate all snapshots for the given date into a DailySummary."""
-    snapshots = db.query(DailyPortfolioSnapshot).filter(
-        DailyPortfolioSnapshot.date == date
-    ).all()
-
-    total_asset = sum(s.value_krw for s in snapshots)
-    total_cost = sum(s.avg_buy_price * s.quantity * s.exchange_rate for s in snapshots)
-    profit_loss = total_asset - total_cost
-
-    # Calculate net investment from deposits
-    from src.database.models import DepositHistory
-    deposits = db.query(DepositHistory).filter(DepositHistory.date <= date).all()
-    net_investment = sum(d.amount for d in deposits) if deposits else 0.0
-
-    return_rate = ((total_asset / total_cost) - 1) * 100 if total_cost > 0 else 0.0
-
-    # Fetch benchmark indices
-    kospi = fetch_kospi_close()
-    sp500 = fetch_sp500_close()
-    
-    # Upsert daily summary
-    summary = db.query(DailySummary).filter(DailySummary.date == date).first()
-    if summary:
-        summary.snapshot_time = snapshot_time
-        summary.total_asset_krw = total_asset
-        summary.total_cost_krw = total_cost
-        summary.profit_loss_krw = profit_loss
-        summary.return_rate_pct = return_rate
-        summary.net_investment_krw = net_investment
-        summary.kospi_close = kospi
-        summary.sp500_close = sp500
-    else:
+def update_daily_summary(db, date, snapshot_time, kospi=None, sp500=None):
+    """
+    Fills in a date's DailySummary. The asset/cost totals are already kept
+    current by upsert_snapshots(); this only adds net investment and benchmarks.
+    """
+    # Net investment from the deposit ledger (prefix sums, one index seek)
+    net_investment = net_investment_as_of(db, date)
+
+    summary = db.get(DailySummary, date)
+    if summary is None:
+        # No snapshot value moved the totals (e.g. an empty account)
         summary = DailySummary(
             date=date,
-            snapshot_time=snapshot_time,
-            total_asset_krw=total_asset,
-            total_cost_krw=total_cost,
-            profit_loss_krw=profit_loss,
-            return_rate_pct=return_rate,
-            net_investment_krw=net_investment,
-            kospi_close=kospi,
-            sp500_close=sp500
+            total_asset_krw=0.0,
+            total_cost_krw=0.0,
+            profit_loss_krw=0.0,
+            return_rate_pct=0.0
         )
         db.add(summary)
+    summary.snapshot_time = snapshot_time
+    summary.net_investment_krw = net_investment
+    summary.kospi_close = kospi
+    summary.sp500_close = sp500
+    mark_rollups_dirty(db, date)
+
+
+def write_snapshot(db, date, snapshot_time, holdings, kospi, sp500):
+    """Write job for snapshot_assets: one bulk ingest plus the day's summary."""
+    ingest_snapshots(db, date, snapshot_time, holdings)
+    update_daily_summary(db, date, snapshot_time, kospi, sp500)
 
 
 def snapshot_assets():
@@ -124,129 +82,115 @@ def snapshot_assets():
     today = datetime.date.today()
     print(f"[{now}] Starting Asset Snapshot (closing price)...")
     db = SessionLocal()
+    # Every holding is collected first, then written with one bulk resolve + upsert
+    holdings = []
 
     try:
         # ── 1. Overseas Stocks ──
-        ov_api = OverseasAPI()
+        # FX rates and P/L come from the present balance (CTRP6504R); holdings from every
+        # configured exchange/currency pair (TTZC3013R), queried concurrently
+        # allow_stale=False: a KIS failure must abort the snapshot, not write cached data
+        ov_api = OverseasAPI(allow_stale=False)
         ov_res = ov_api.get_balance_present()
-
-        usd_rate = 1200.0  # Default fallback
-
-        if ov_res and ov_res.get("rt_cd") == "0":
-            # Extract exchange rate
-            for curr in ov_res.get("output2", []):
-                if curr.get("crcy_cd") == "USD":
-                    try:
-                        usd_rate = float(curr.get("frst_bltn_exrt", 1200))
-                    except (ValueError, TypeError):
-                        pass
-                    break
-
-            for item in ov_res.get("output1", []):
-                qty = float(item.get("ccld_qty_smtl1", 0))
-                if qty > 0:
-                    symbol = item.get("pdno", "")
-                    name = item.get("prdt_name", symbol)
-                    close_price = float(item.get("ovrs_now_pric1", 0))
-                    avg_buy = float(item.get("avg_unpr3", 0))
-                    eval_amt = close_price * qty * usd_rate
-                    pl_krw = float(item.get("ovrs_rlzt_pfls_amt2", 0))
-
-                    instrument = get_or_create_instrument(
-                        db, symbol=symbol, name=name,
-                        asset_type=AssetType.STOCK_OVERSEAS,
-                        currency="USD", brokerage="Korea Investment", exchange="NASD"
-                    )
-                    upsert_snapshot(
-                        db, date=today, instrument_id=instrument.id,
-                        snapshot_time=now, quantity=qty,
-                        close_price=close_price, avg_buy_price=avg_buy,
-                        exchange_rate=usd_rate, value_krw=eval_amt,
-                        profit_loss_krw=pl_krw
-                    )
+        if ov_res is None:
+            # A partial snapshot (whole asset class missing) is worse than none
+            raise RuntimeError("Overseas balance unavailable from KIS; snapshot aborted")
+
+        present = decode_overseas_present(ov_res)
+        fx_rates = present.fx_rates
+        usd_rate = fx_rates.get("USD", 1200.0)  # Default fallback
+        # profit_loss_krw keeps its CTRP6504R meaning (ovrs_rlzt_pfls_amt2, already KRW),
+        # not TTZC3013R's unrealized frcr_evlu_pfls_amt
+        pl_krw_by_symbol = defaultdict(float)
+        for item in present.holdings:
+            pl_krw_by_symbol[item.symbol] += item.realized_pl_krw
+
+        by_market, ov_errors = ov_api.get_holdings_by_market()
+        if ov_errors:
+            failed = ", ".join(f"{excg}/{crcy}" for excg, crcy in ov_errors)
+            raise RuntimeError(f"Overseas holdings unavailable for {failed}; snapshot aborted "
+                               f"(remove markets the account doesn't trade from api.overseas_markets)")
+
+        for h in merge_overseas_holdings(by_market):
+            rate = usd_rate if h.currency == "USD" else fx_rates.get(h.currency)
+            if rate is None:
+                raise RuntimeError(f"No {h.currency} exchange rate from KIS for {h.symbol}; snapshot aborted")
+
+            holdings.append(dict(
+                symbol=h.symbol, name=h.name,
+                asset_type=AssetType.STOCK_OVERSEAS,
+                currency=h.currency, brokerage="Korea Investment", exchange=h.exchange,
+                quantity=h.quantity, close_price=h.current_price, avg_buy_price=h.avg_price,
+                exchange_rate=rate, value_krw=h.current_price * h.quantity * rate,
+                profit_loss_krw=pl_krw_by_symbol.get(h.symbol, 0.0)
+            ))
 
         # ── 2. Domestic Stocks ──
-        dom_api = DomesticAPI()
-        dom_res = dom_api.get_balance()
-        if dom_res and dom_res.get("rt_cd") == "0":
-            for item in dom_res.get("output1", []):
-                qty = float(item.get("hldg_qty", 0))
-                if qty > 0:
-                    symbol = item.get("pdno", "")
-                    name = item.get("prdt_name", symbol)
-                    close_price = float(item.get("prpr", 0))
-                    avg_buy = float(item.get("pchs_avg_pric", 0))
-                    eval_amt = float(item.get("evlu_amt", 0))
-                    pl_krw = float(item.get("evlu_pfls_amt", 0))
-
-                    instrument = get_or_create_instrument(
-                        db, symbol=symbol, name=name,
+        # Stream holdings page by page (tr_cont continuation) so large accounts aren't truncated
+        dom_api = DomesticAPI(allow_stale=False)
+        dom_pages = 0
+        for page_no, dom_res in enumerate(dom_api.iter_balance_pages()):
+            dom_pages += 1
+            page = decode_domestic_balance(dom_res)
+            for h in page.holdings:
+                if h.quantity > 0:
+                    holdings.append(dict(
+                        symbol=h.symbol, name=h.name,
                         asset_type=AssetType.STOCK_DOMESTIC,
-                        currency="KRW", brokerage="Korea Investment", exchange="KRX"
-                    )
-                    upsert_snapshot(
-                        db, date=today, instrument_id=instrument.id,
-                        snapshot_time=now, quantity=qty,
-                        close_price=close_price, avg_buy_price=avg_buy,
-                        exchange_rate=1.0, value_krw=eval_amt,
-                        profit_loss_krw=pl_krw
-                    )
+                        currency="KRW", brokerage="Korea Investment", exchange="KRX",
+                        quantity=h.quantity, close_price=h.current_price, avg_buy_price=h.avg_price,
+                        exchange_rate=1.0, value_krw=h.eval_amount,
+                        profit_loss_krw=h.pl_amount
+                    ))
 
             # ── 3. Cash / RP from domestic balance ──
-            for summary in dom_res.get("output2", []):
+            # output2 (account totals) is repeated on every page; read it once
+            if page_no == 0 and page.rp_amount > 0:
                 # CMA/RP balance
-                rp_amt = float(summary.get("cma_evlu_amt", 0))
-                if rp_amt > 0:
-                    instrument = get_or_create_instrument(
-                        db, symbol="RP_MMW", name="RP/어음",
-                        asset_type=AssetType.CASH_KRW,
-                        currency="KRW", brokerage="Korea Investment"
-                    )
-                    upsert_snapshot(
-                        db, date=today, instrument_id=instrument.id,
-                        snapshot_time=now, quantity=1, close_price=rp_amt,
-                        avg_buy_price=rp_amt, exchange_rate=1.0,
-                        value_krw=rp_amt, profit_loss_krw=0.0
-                    )
+                holdings.append(dict(
+                    symbol="RP_MMW", name="RP/어음",
+                    asset_type=AssetType.CASH_KRW,
+                    currency="KRW", brokerage="Korea Investment",
+                    quantity=1, close_price=page.rp_amount,
+                    avg_buy_price=page.rp_amount, exchange_rate=1.0,
+                    value_krw=page.rp_amount, profit_loss_krw=0.0
+                ))
+
+        if dom_pages == 0:
+            raise RuntimeError("Domestic balance unavailable from KIS; snapshot aborted")
 
         # ── 4. Manual Assets ──
         from src.database.models import ManualAsset
         manual_assets = db.query(ManualAsset).all()
         for ma in manual_assets:
-            # Determine asset_type enum
-            type_map = {
-                "STOCK": AssetType.STOCK_DOMESTIC,
-                "STOCK_DOMESTIC": AssetType.STOCK_DOMESTIC,
-                "STOCK_OVERSEAS": AssetType.STOCK_OVERSEAS,
-                "CRYPTO": AssetType.CRYPTO,
-                "REAL_ESTATE": AssetType.MANUAL,
-                "CASH": AssetType.CASH_KRW,
-            }
-            a_type = type_map.get(ma.asset_type, AssetType.MANUAL)
-
-            instrument = get_or_create_instrument(
-                db, symbol=ma.symbol, name=ma.name,
-                asset_type=a_type,
-                currency=ma.currency,
-                brokerage=ma.brokerage if ma.brokerage != "Manual" else None
-            )
+            a_type = map_manual_asset_type(ma.asset_type)
 
-            ex_rate = usd_rate if ma.currency == "USD" else 1.0
+            ex_rate = usd_rate if ma.currency == "USD" else fx_rates.get(ma.currency, 1.0)
             value_krw = ma.current_price * ma.quantity * ex_rate
             cost_krw = ma.buy_price * ma.quantity * ex_rate
 
-            upsert_snapshot(
-                db, date=today, instrument_id=instrument.id,
-                snapshot_time=now, quantity=ma.quantity,
-                close_price=ma.current_price, avg_buy_price=ma.buy_price,
+            holdings.append(dict(
+                symbol=ma.symbol, name=ma.name,
+                asset_type=a_type,
+                currency=ma.currency,
+                brokerage=ma.brokerage if ma.brokerage != "Manual" else None,
+                quantity=ma.quantity, close_price=ma.current_price, avg_buy_price=ma.buy_price,
                 exchange_rate=ex_rate, value_krw=value_krw,
                 profit_loss_krw=value_krw - cost_krw
-            )
-
-        # ── 5. Update Daily Summary ──
-        update_daily_summary(db, today, now)
-
-        db.commit()
+            ))
+
+        # Benchmark indices (network calls stay off the writer thread)
+        kospi = fetch_kospi_close()
+        sp500 = fetch_sp500_close()
+
+        # ── 5. Write snapshots + Daily Summary in one transaction ──
+        try:
+            db_writer.run(write_snapshot, today, now, holdings, kospi, sp500)
+        except IntegrityError as e:
+            # Usually an instrument deleted by another process: the failed write
+            # dropped the instrument index, so one retry resolves from the table
+            print(f"[WARN] Snapshot write failed ({e.orig}); retrying once")
+            db_writer.run(write_snapshot, today, now, holdings, kospi, sp500)
         print(f"[{datetime.datetime.now()}] Snapshot saved successfully.")
 
     except Exception as e:
@@ -269,12 +213,15 @@ def start_scheduler():
     scheduler.add_job(snapshot_assets, CronTrigger(hour=6, minute=10), id='overseas_close')
 
     scheduler.start()
+    # Keep the access token warm so the close snapshots never wait on /oauth2/tokenP
+    token_manager.start_renewal()
     print("Scheduler started (market-close snapshots only).")
 
     try:
         while True:
             time.sleep(2)
     except (KeyboardInterrupt, SystemExit):
+        token_manager.stop_renewal()
         scheduler.shutdown()
 
 
@@ -7,7 +7,7 @@ import json
 import re
 import io
 
-from src.config_loader import load_config
+from src.config_loader import get_gemini_config
 
 
 import time
@@ -29,8 +29,7 @@ def _call_gemini(image_bytes: bytes, prompt: str) -> dict:
             "pip install google-genai 로 설치하세요."
         )
 
-    config = load_config()
-    api_key = config.get("gemini", {}).get("api_key")
+    api_key = get_gemini_config().api_key
     if not api_key:
         raise ValueError("Gemini API key not found in config. Add 'gemini.api_key' to secrets.yaml")
 
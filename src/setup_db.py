@@ -6,10 +6,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database.engine import engine, Base
 from src.database.models import Instrument, DailyPortfolioSnapshot, DepositHistory, DailySummary, TradeLog, ManualAsset
+from src.database.migrations import migrate
 
 def init_db():
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    print(f"Schema migrated to v{migrate(engine)}.")
     print("Database initialization complete.")
     print(f"Database file located at: {engine.url}")
 
@@ -2,15 +2,28 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from src.web.routers import dashboard, trade, assets, returns, ocr
-from src.database.engine import engine, Base
+from src.database.engine import engine, async_engine, Base
 from src.database import models # Ensure models are loaded
+from src.database.instrument_index import instrument_index
+from src.database.migrations import migrate
+from src.database.archive import snapshot_archive, PARQUET_AVAILABLE
+from src.database.summary import verify_summaries_job
+from src.database.retention import snapshot_retention
+from src.database.writer import db_writer
 
 from contextlib import asynccontextmanager
+from datetime import datetime
 from src.scheduler import start_scheduler
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from src.scheduler import snapshot_assets
 from src.logic.strategy import run_strategy
+from src.api.async_client import AsyncBaseAPI
+from src.api.rate_limit import rate_limiter
+from src.api.cache import response_cache
+from src.api.resilience import circuit_breaker
+from src.api import realtime
+from src.auth.token_manager import token_manager
 
 # Global scheduler instance
 scheduler = BackgroundScheduler()
@@ -21,6 +34,7 @@ async def lifespan(app: FastAPI):
     print("Starting Scheduler...")
     # Initialize DB Tables
     Base.metadata.create_all(bind=engine)
+    migrate(engine)
     
     # Market-close snapshots only (no more hourly)
     scheduler.add_job(snapshot_assets, CronTrigger(hour=15, minute=40), id='domestic_close')
@@ -28,12 +42,35 @@ async def lifespan(app: FastAPI):
     
     # Strategy Scheduler (Every minute for monitoring)
     scheduler.add_job(run_strategy, 'interval', minutes=1, id='strategy_check')
+
+    # Export closed months to the Parquet snapshot archive (catch up now, then monthly)
+    if PARQUET_AVAILABLE:
+        scheduler.add_job(snapshot_archive.archive_closed_periods, CronTrigger(day=1, hour=7),
+                          id='snapshot_archive', next_run_time=datetime.now())
+
+    # Check incrementally maintained DailySummary totals against their snapshots
+    scheduler.add_job(verify_summaries_job, CronTrigger(hour=7, minute=30), id='summary_verify')
+
+    # Compact snapshot rows past the detail window (after the monthly archive export)
+    if snapshot_retention.settings()["enabled"]:
+        scheduler.add_job(snapshot_retention.run_job, CronTrigger(day=1, hour=8), id='snapshot_retention')
     
     scheduler.start()
+
+    # Renew the KIS access token in the background, ahead of expiry
+    token_manager.start_renewal()
+
+    # Realtime price stream (only if api.realtime.enabled)
+    realtime.start_realtime_stream()
     yield
     # Shutdown
     print("Shutting down Scheduler...")
     scheduler.shutdown()
+    db_writer.stop()  # Commits writes still queued
+    realtime.stop_realtime_stream()
+    token_manager.stop_renewal()
+    await AsyncBaseAPI.aclose()
+    await async_engine.dispose()
 
 app = FastAPI(title="KIS Asset Manager API", version="1.0.0", lifespan=lifespan)
 
@@ -65,6 +102,21 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/metrics")
+def get_metrics():
+    """KIS transport metrics (rate limiter, response cache, circuit breaker, token renewal), the instrument index, the snapshot archive, retention and the database writer."""
+    return {
+        "kis_token": token_manager.get_metrics(),
+        "kis_rate_limit": rate_limiter.get_metrics(),
+        "kis_cache": response_cache.get_metrics(),
+        "kis_circuit": circuit_breaker.get_metrics(),
+        "kis_realtime": realtime.realtime_client.get_metrics() if realtime.realtime_client else None,
+        "instrument_index": instrument_index.get_metrics(),
+        "snapshot_archive": snapshot_archive.get_metrics(),
+        "snapshot_retention": snapshot_retention.get_metrics(),
+        "db_writer": db_writer.get_metrics(),
+    }
+
 def start():
     """Launched with `poetry run start` at root level"""
     uvicorn.run("src.web.app:app", host="0.0.0.0", port=8000, reload=True)
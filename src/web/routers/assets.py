@@ -1,12 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
-from src.database.engine import get_db
+from src.database.engine import get_async_db
 from src.database.models import ManualAsset
-from src.database.utils import get_or_create_instrument, map_manual_asset_type
+from src.database.utils import (
+    get_or_create_instrument, map_manual_asset_type, manual_asset_spec,
+    refresh_manual_asset_snapshot, remove_manual_asset_snapshot,
+)
+from src.database.writer import db_writer
 
 router = APIRouter(prefix="/api/assets/manual", tags=["manual_assets"])
 
@@ -38,13 +44,17 @@ class ManualAssetResponse(ManualAssetCreate):
         orm_mode = True
 
 @router.get("/", response_model=List[ManualAssetResponse])
-def get_manual_assets(db: Session = Depends(get_db)):
+async def get_manual_assets(db: AsyncSession = Depends(get_async_db)):
     """List all manually added assets."""
-    return db.query(ManualAsset).all()
+    return (await db.execute(select(ManualAsset))).scalars().all()
 
 @router.post("/", response_model=ManualAssetResponse)
-def create_manual_asset(asset: ManualAssetCreate, db: Session = Depends(get_db)):
+def create_manual_asset(asset: ManualAssetCreate):
     """Create a new manual asset and register it in instruments table."""
+    # Runs on the database writer thread; returns once committed
+    return db_writer.run(_create_manual_asset, asset)
+
+def _create_manual_asset(db: Session, asset: ManualAssetCreate):
     # Create manual asset record
     new_asset = ManualAsset(
         asset_type=asset.asset_type,
@@ -68,32 +78,43 @@ def create_manual_asset(asset: ManualAssetCreate, db: Session = Depends(get_db))
         currency=asset.currency,
         brokerage=asset.brokerage if asset.brokerage != "Manual" else None
     )
-    
-    db.commit()
-    db.refresh(new_asset)
+
+    # Today's snapshot and summary reflect it without waiting for the next run
+    refresh_manual_asset_snapshot(db, new_asset)
     return new_asset
 
 @router.put("/{asset_id}", response_model=ManualAssetResponse)
-def update_manual_asset(asset_id: int, asset_update: ManualAssetUpdate, db: Session = Depends(get_db)):
+def update_manual_asset(asset_id: int, asset_update: ManualAssetUpdate):
     """Update an existing manual asset."""
+    return db_writer.run(_update_manual_asset, asset_id, asset_update)
+
+def _update_manual_asset(db: Session, asset_id: int, asset_update: ManualAssetUpdate):
     db_asset = db.query(ManualAsset).filter(ManualAsset.id == asset_id).first()
     if not db_asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
+    old_spec = manual_asset_spec(db_asset)
     for key, value in asset_update.dict(exclude_unset=True).items():
         setattr(db_asset, key, value)
-    
-    db.commit()
-    db.refresh(db_asset)
+
+    # Moved to another instrument: today's row for the old one no longer applies
+    new_spec = manual_asset_spec(db_asset)
+    if any(old_spec[k] != new_spec[k] for k in ("symbol", "asset_type", "brokerage")):
+        remove_manual_asset_snapshot(db, old_spec)
+    refresh_manual_asset_snapshot(db, db_asset)
+    db.flush()  # updated_at
     return db_asset
 
 @router.delete("/{asset_id}")
-def delete_manual_asset(asset_id: int, db: Session = Depends(get_db)):
+def delete_manual_asset(asset_id: int):
     """Delete a manual asset."""
+    db_writer.run(_delete_manual_asset, asset_id)
+    return {"message": "Asset deleted successfully"}
+
+def _delete_manual_asset(db: Session, asset_id: int):
     db_asset = db.query(ManualAsset).filter(ManualAsset.id == asset_id).first()
     if not db_asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
+    remove_manual_asset_snapshot(db, manual_asset_spec(db_asset))
     db.delete(db_asset)
-    db.commit()
-    return {"message": "Asset deleted successfully"}
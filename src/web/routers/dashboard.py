@@ -1,13 +1,20 @@
+import asyncio
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import pandas as pd
 
-from src.database.engine import get_db
+from src.database.engine import get_async_db
 from src.database.models import ManualAsset
-from src.api.overseas import OverseasAPI
-from src.api.domestic import DomesticAPI
+from src.api.async_client import AsyncOverseasAPI, AsyncDomesticAPI
+from src.api.base import PaginationError
+from src.api.rate_limit import Priority
+from src.api.responses import (
+    AccountBalance, decode_account_balance, decode_domestic_balance, decode_overseas_present,
+)
+from src.api.realtime import get_latest_price
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -20,15 +27,59 @@ def clean_profit_rate(val):
     except:
         return 0.0
 
+async def collect_domestic_holdings(dom_api) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Streams every TTTC8434R page (tr_cont continuation) into holding rows.
+    Returns (rows, complete); complete is False when a later page failed and
+    only the pages before it are included.
+    """
+    dom_holdings = []
+    try:
+        async for page in dom_api.iter_balance_pages():
+            for h in decode_domestic_balance(page).holdings:
+                if h.quantity > 0:
+                    dom_holdings.append({
+                        "symbol": h.symbol,
+                        "name": h.name,
+                        "quantity": h.quantity,
+                        "avg_price": h.avg_price,
+                        "current_price": h.current_price,
+                        "pl_amount": h.pl_amount,
+                        "return_rate": clean_profit_rate(h.return_rate),
+                        "currency": "KRW",
+                        "brokerage": "Korea Investment"
+                    })
+    except PaginationError as e:
+        print(f"[WARN] Domestic holdings incomplete: {e}")
+        return dom_holdings, False
+    return dom_holdings, True
+
+def attach_live_prices(holdings):
+    """Adds the latest streamed price (if any) to each holding; O(1) per symbol."""
+    for holding in holdings:
+        live = get_latest_price(holding["symbol"])
+        if live is not None:
+            holding["live_price"] = live.price
+
 @router.get("/summary")
-async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def get_dashboard_summary(db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """
     Returns the aggregated portfolio summary using Integrated Account Balance (CTRP6548R) and Manual Assets.
     """
     
-    # 1. Fetch Integrated Balance (CTRP6548R)
-    dom_api = DomesticAPI()
-    integ_res = dom_api.get_account_balance()
+    # 1. Fetch Integrated Balance (CTRP6548R) together with holdings (CTRP6504R, TTTC8434R)
+    # The three KIS calls are independent, so await them concurrently on the shared async pool
+    # Dashboard polling yields to orders and scheduled snapshots on the rate limiter
+    # Manual assets are read (async session) while the KIS calls are in flight
+    dom_api = AsyncDomesticAPI(priority=Priority.LOW)
+    ov_api = AsyncOverseasAPI(priority=Priority.LOW)
+    integ_res, ov_res, (dom_holdings, dom_complete), manual_assets = await asyncio.gather(
+        dom_api.get_account_balance(),
+        ov_api.get_balance_present(),
+        collect_domestic_holdings(dom_api),
+        db.execute(select(ManualAsset)),
+    )
+    manual_assets = manual_assets.scalars().all()
     
     asset_classification = {
         "domestic_stock": {"amount": 0, "profit": 0, "percent": 0},
@@ -45,27 +96,24 @@ async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]
     }
 
     if integ_res and integ_res.get("rt_cd") == "0":
-        # ... (Parsing logic same as before)
-        out2 = integ_res.get("output2", {})
-        total_summary["total_asset_krw"] = float(out2.get("tot_asst_amt", 0))
-        total_summary["total_pl_krw"] = float(out2.get("evlu_pfls_amt_smtl", 0))
-        total_summary["total_pchs_krw"] = float(out2.get("pchs_amt_smtl", 0))
-        
-        out1 = integ_res.get("output1", [])
-        
+        balance = decode_account_balance(integ_res)
+        total_summary["total_asset_krw"] = balance.total_asset
+        total_summary["total_pl_krw"] = balance.total_pl
+        total_summary["total_pchs_krw"] = balance.total_purchase
+
         def parse_category(idx, key):
-            if idx < len(out1):
-                item = out1[idx]
+            category = balance.category(idx)
+            if category is not None:
                 asset_classification[key] = {
-                    "amount": float(item.get("evlu_amt", 0)),
-                    "profit": float(item.get("evlu_pfls_amt", 0)),
-                    "percent": float(item.get("whol_weit_rt", 0))
+                    "amount": category.amount,
+                    "profit": category.profit,
+                    "percent": category.weight
                 }
 
-        parse_category(0, "domestic_stock")
-        parse_category(7, "rp")
-        parse_category(8, "overseas_stock")
-        parse_category(16, "foreign_currency")
+        parse_category(AccountBalance.DOMESTIC_STOCK, "domestic_stock")
+        parse_category(AccountBalance.RP, "rp")
+        parse_category(AccountBalance.OVERSEAS_STOCK, "overseas_stock")
+        parse_category(AccountBalance.FOREIGN_CURRENCY, "foreign_currency")
         
         tracked_sum = (asset_classification["domestic_stock"]["amount"] + 
                        asset_classification["overseas_stock"]["amount"] + 
@@ -76,8 +124,7 @@ async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]
         if others_val > 100: 
              asset_classification["others"]["amount"] = others_val
 
-    # 1.5 Fetch Manual Assets
-    manual_assets = db.query(ManualAsset).all()
+    # 1.5 Manual Assets (loaded above)
     manual_holdings = []
     
     for ma in manual_assets:
@@ -124,43 +171,27 @@ async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]
     # 2. Fetch Holdings Details (Keep existing logic)
     # ... (Rest of existing logic for overseas/domestic holdings)
     # Overseas Holdings
-    ov_api = OverseasAPI()
-    ov_res = ov_api.get_balance_present()
     ov_holdings = []
     if ov_res and ov_res.get("rt_cd") == "0":
-        for item in ov_res.get("output1", []):
-            qty = float(item.get("ccld_qty_smtl1", 0))
-            if qty > 0:
+        for h in decode_overseas_present(ov_res).holdings:
+            if h.quantity > 0:
                 ov_holdings.append({
-                    "symbol": item.get("pdno"),
-                    "name": item.get("prdt_name"),
-                    "quantity": qty,
-                    "avg_price": float(item.get("avg_unpr3", 0)),
-                    "current_price": float(item.get("ovrs_now_pric1", 0)),
-                    "pl_amount": float(item.get("evlu_pfls_amt2", 0)),
-                    "return_rate": clean_profit_rate(item.get("evlu_pfls_rt1", 0)),
+                    "symbol": h.symbol,
+                    "name": h.name,
+                    "quantity": h.quantity,
+                    "avg_price": h.avg_price,
+                    "current_price": h.current_price,
+                    "pl_amount": h.pl_amount,
+                    "return_rate": clean_profit_rate(h.return_rate),
                     "currency": "USD",
                     "brokerage": "Korea Investment"
                 })
 
-    # Domestic Holdings
-    dom_res_stocks = dom_api.get_balance()
-    dom_holdings = []
-    if dom_res_stocks and dom_res_stocks.get("rt_cd") == "0":
-        for item in dom_res_stocks.get("output1", []):
-            qty = float(item.get("hldg_qty", 0))
-            if qty > 0:
-                dom_holdings.append({
-                    "symbol": item.get("pdno"),
-                    "name": item.get("prdt_name"),
-                    "quantity": qty,
-                    "avg_price": float(item.get("pchs_avg_pric", 0)),
-                    "current_price": float(item.get("prpr", 0)),
-                    "pl_amount": float(item.get("evlu_pfls_amt", 0)),
-                    "return_rate": clean_profit_rate(item.get("evlu_pfls_rt", 0)),
-                    "currency": "KRW",
-                    "brokerage": "Korea Investment"
-                })
+    # Domestic Holdings (collected page by page above; partial if a later page failed)
+
+    # Overlay realtime ticks when the WebSocket stream is running
+    attach_live_prices(ov_holdings)
+    attach_live_prices(dom_holdings)
 
     # 3. Cash Equivalents (RP, Foreign Currency)
     cash_holdings = []
@@ -203,6 +234,7 @@ async def get_dashboard_summary(db: Session = Depends(get_db)) -> Dict[str, Any]
             "domestic": dom_holdings,
             "cash": cash_holdings,
             "manual": manual_holdings
-        }
+        },
+        "domestic_partial": not dom_complete
     }
 
@@ -1,40 +1,57 @@
 """Period returns API with benchmark comparison."""
+import asyncio
 from datetime import datetime, timedelta, date
 from typing import Optional
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 
-from src.database.engine import get_db
-from src.database.models import DailySummary, DailyPortfolioSnapshot, Instrument
-from src.api.fetch_benchmarks import get_kospi_history, get_sp500_history, get_nasdaq_history
+from src.database.engine import get_async_db
+from src.database.models import DailySummary, DepositLedger, Instrument, SummaryRollup
+from src.database.archive import snapshot_archive
+from src.database.rollups import aggregate_period, choose_resolution, period_end, period_start
+from src.api.fetch_benchmarks import get_benchmark_histories
 
 # ... imports ...
 
 router = APIRouter(prefix="/api/returns", tags=["returns"])
 
 @router.get("/period")
-def get_period_returns(
+async def get_period_returns(
     period: str = Query("1M", description="Period: 1D, 1W, 1M, 3M, YTD, 1Y, custom"),
     start_date: Optional[str] = Query(None, description="Start date for custom period (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date for custom period (YYYY-MM-DD)"),
     group_by: str = Query("total", description="Group by: total, instrument, brokerage"),
     benchmark: str = Query("both", description="Benchmark: kospi, sp500, nasdaq, both, all, none"), # Updated description
-    db: Session = Depends(get_db)
+    max_points: int = Query(400, ge=10, le=5000, description="Series point budget; longer ranges use week/month/year rollups"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get period returns with benchmark comparison.
     Iterates through the full requested period to show benchmark data even if portfolio data is missing.
+    The series is daily when the range fits max_points, otherwise one point per
+    week, month or year (the finest that fits), read from summary_rollup.
     """
     try:
         start, end = get_period_dates(period, start_date, end_date)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    resolution = choose_resolution(start, end, max_points)
     
     # 1. Fetch Portfolio Data
-    summaries = db.query(DailySummary).filter(
-        DailySummary.date.between(start, end)
-    ).order_by(DailySummary.date).all()
+    if resolution == "day":
+        summaries = (await db.execute(
+            select(DailySummary).where(DailySummary.date.between(start, end)).order_by(DailySummary.date)
+        )).scalars().all()
+    else:
+        # Only the end points here; the series comes from the rollups
+        first = (await db.execute(
+            select(DailySummary).where(DailySummary.date.between(start, end)).order_by(DailySummary.date).limit(1)
+        )).scalar()
+        last = (await db.execute(
+            select(DailySummary).where(DailySummary.date.between(start, end)).order_by(DailySummary.date.desc()).limit(1)
+        )).scalar()
+        summaries = [first, last] if first else []
     
     # Map portfolio data by date string
     portfolio_map = {str(s.date): s for s in summaries}
@@ -76,21 +93,11 @@ def get_period_returns(
         return data.iloc[0]
 
     # Always fetch all if not 'none' to support flexible frontend toggling
+    # yfinance is blocking and not thread-safe: one download for all three, off the event loop
     if benchmark != "none":
-        try:
-            kospi_data = get_kospi_history(full_start_date, full_end_date)
-        except Exception as e:
-            print(f"KOSPI fetch error: {e}")
-            
-        try:
-            sp500_data = get_sp500_history(full_start_date, full_end_date)
-        except Exception as e:
-            print(f"S&P500 fetch error: {e}")
-
-        try:
-            nasdaq_data = get_nasdaq_history(full_start_date, full_end_date)
-        except Exception as e:
-            print(f"NASDAQ fetch error: {e}")
+        # Never raises: a failed download yields empty series
+        kospi_data, sp500_data, nasdaq_data = await asyncio.to_thread(
+            get_benchmark_histories, full_start_date, full_end_date)
 
     # 3. Prepare Response Structure
     response = {
@@ -98,6 +105,7 @@ def get_period_returns(
             "start": full_start_date,
             "end": full_end_date
         },
+        "resolution": resolution,
         "portfolio": {
             "start_value": start_value,
             "end_value": end_value,
@@ -127,6 +135,27 @@ def get_period_returns(
     add_benchmark_stat("sp500", sp500_data)
     add_benchmark_stat("nasdaq", nasdaq_data)
 
+    # Portfolio base: First available summary value (relative to its own start)
+    # This means portfolio line starts at 0% when it appears.
+    portfolio_base = summaries[0].total_asset_krw if summaries else None
+
+    # Pre-calculate base values for benchmarks (at period start)
+    kospi_base = get_value_on_or_before(kospi_data, full_start_date)
+    sp500_base = get_value_on_or_before(sp500_data, full_start_date)
+    nasdaq_base = get_value_on_or_before(nasdaq_data, full_start_date)
+
+    if resolution != "day":
+        response["daily_series"] = await get_rollup_series(
+            db, start, end, resolution, portfolio_base,
+            {"kospi": (kospi_data, kospi_base), "sp500": (sp500_data, sp500_base),
+             "nasdaq": (nasdaq_data, nasdaq_base)},
+        )
+        if group_by == "instrument":
+            response["breakdown"] = await get_instrument_breakdown(db, start, end)
+        elif group_by == "brokerage":
+            response["breakdown"] = await get_brokerage_breakdown(db, start, end)
+        return response
+
     # 4. Generate Daily Series for Full Period
     daily_series = []
     
@@ -136,15 +165,6 @@ def get_period_returns(
     while current_date <= end:
         date_list.append(current_date)
         current_date += timedelta(days=1)
-        
-    # Pre-calculate base values for benchmarks (at period start)
-    kospi_base = get_value_on_or_before(kospi_data, full_start_date)
-    sp500_base = get_value_on_or_before(sp500_data, full_start_date)
-    nasdaq_base = get_value_on_or_before(nasdaq_data, full_start_date)
-
-    # Portfolio base: First available summary value (relative to its own start)
-    # This means portfolio line starts at 0% when it appears.
-    portfolio_base = summaries[0].total_asset_krw if summaries else None
 
     for d in date_list:
         date_str = str(d)
@@ -194,15 +214,91 @@ def get_period_returns(
 
     # Add breakdown if requested
     if group_by == "instrument":
-        response["breakdown"] = get_instrument_breakdown(db, start, end)
+        response["breakdown"] = await get_instrument_breakdown(db, start, end)
     elif group_by == "brokerage":
-        response["breakdown"] = get_brokerage_breakdown(db, start, end)
+        response["breakdown"] = await get_brokerage_breakdown(db, start, end)
         
     return response
 
 
 
 
+async def get_rollup_series(db: AsyncSession, start: date, end: date, resolution: str, portfolio_base, benchmarks):
+    """
+    One chart point per week/month/year: the period's close (plus high, low
+    and net flow) and the last benchmark close in it. Periods inside the range
+    come from summary_rollup; the partial ones at either edge are aggregated
+    from their DailySummary rows so the range bounds are exact.
+    """
+    periods = {}
+    rollups = (await db.execute(
+        select(SummaryRollup).where(
+            SummaryRollup.resolution == resolution,
+            SummaryRollup.period_start >= start,
+            SummaryRollup.period_end <= end,
+        )
+    )).scalars().all()
+    for rollup in rollups:
+        periods[rollup.period_start] = {
+            "last_date": rollup.last_date, "close": rollup.close_asset_krw, "high": rollup.high_asset_krw,
+            "low": rollup.low_asset_krw, "net_flow": rollup.net_flow_krw,
+        }
+
+    head_start = period_start(resolution, start)
+    tail_start = period_start(resolution, end)
+    edges = []
+    if head_start < start:
+        edges.append((head_start, start, min(period_end(resolution, head_start), end)))
+    # Unless the head edge above already covers it (range inside one period)
+    if period_end(resolution, tail_start) > end and not (tail_start == head_start < start):
+        edges.append((tail_start, tail_start, end))
+    for key, first, last in edges:
+        rows = (await db.execute(
+            select(DailySummary).where(DailySummary.date.between(first, last)).order_by(DailySummary.date)
+        )).scalars().all()
+        if rows:
+            flows = (await db.execute(
+                select(func.sum(DepositLedger.amount_krw)).where(DepositLedger.date.between(first, last))
+            )).scalar()
+            values = aggregate_period(rows, flows or 0.0)
+            periods[key] = {
+                "last_date": values["last_date"], "close": values["close_asset_krw"],
+                "high": values["high_asset_krw"], "low": values["low_asset_krw"], "net_flow": values["net_flow_krw"],
+            }
+
+    # Last benchmark close inside each period (series are indexed by YYYY-MM-DD strings)
+    bench_points = {}
+    for key, (data, base) in benchmarks.items():
+        if data is None or data.empty or not base or base <= 0:
+            continue
+        window = data[(data.index >= str(start)) & (data.index <= str(end))]
+        for date_str, value in window.items():
+            day = date.fromisoformat(date_str)
+            bench_points.setdefault(period_start(resolution, day), {})[key] = (day, ((value / base) - 1) * 100)
+
+    series = []
+    for key in sorted(periods.keys() | bench_points.keys()):
+        portfolio = periods.get(key)
+        bench = bench_points.get(key, {})
+        last_dates = ([portfolio["last_date"]] if portfolio else []) + [day for day, _ in bench.values()]
+        point = {"date": str(max(last_dates)), "period_start": str(key)}
+        if portfolio:
+            point["portfolio_value"] = portfolio["close"]
+            point["portfolio_high"] = portfolio["high"]
+            point["portfolio_low"] = portfolio["low"]
+            point["net_flow"] = portfolio["net_flow"]
+            if portfolio_base and portfolio_base > 0:
+                point["portfolio_return"] = ((portfolio["close"] / portfolio_base) - 1) * 100
+        else:
+            point["portfolio_value"] = None
+            point["portfolio_return"] = None
+        for bench_key, (_, value) in bench.items():
+            point[f"{bench_key}_return"] = value
+        series.append(point)
+    return series
+
+
+
 def get_period_dates(period: str, start_date: Optional[str] = None, end_date: Optional[str] = None):
     """Calculate start/end dates based on period type."""
     today = date.today()
@@ -231,68 +327,55 @@ def get_period_dates(period: str, start_date: Optional[str] = None, end_date: Op
         return today - delta, today
 
 
-def get_instrument_breakdown(db: Session, start: date, end: date):
+async def get_instrument_breakdown(db: AsyncSession, start: date, end: date):
     """Get per-instrument breakdown for the period."""
-    # Get first and last snapshot for each instrument
-    instruments = db.query(Instrument).all()
+    # First and last snapshot value of each instrument in the period, from one
+    # column-pruned scan (Parquet archive for closed months, SQLite for the rest)
+    snapshots = await asyncio.to_thread(snapshot_archive.load, start, end, ("instrument_id", "value_krw"))
+    if snapshots.empty:
+        return []
+    values = snapshots.groupby("instrument_id")["value_krw"]
+    first_values, last_values = values.first(), values.last()
+
+    instruments = (await db.execute(
+        select(Instrument).where(Instrument.id.in_(first_values.index.tolist()))
+    )).scalars().all()
     breakdown = []
     
     for inst in instruments:
-        start_snap = db.query(DailyPortfolioSnapshot).filter(
-            DailyPortfolioSnapshot.instrument_id == inst.id,
-            DailyPortfolioSnapshot.date >= start
-        ).order_by(DailyPortfolioSnapshot.date).first()
-        
-        end_snap = db.query(DailyPortfolioSnapshot).filter(
-            DailyPortfolioSnapshot.instrument_id == inst.id,
-            DailyPortfolioSnapshot.date <= end
-        ).order_by(DailyPortfolioSnapshot.date.desc()).first()
+        start_value = float(first_values[inst.id])
+        end_value = float(last_values[inst.id])
+        profit_loss = end_value - start_value
+        return_pct = ((end_value / start_value) - 1) * 100 if start_value > 0 else 0
         
-        if start_snap and end_snap:
-            start_value = start_snap.value_krw
-            end_value = end_snap.value_krw
-            profit_loss = end_value - start_value
-            return_pct = ((end_value / start_value) - 1) * 100 if start_value > 0 else 0
-            
-            breakdown.append({
-                "name": inst.name,
-                "symbol": inst.symbol,
-                "start_value": start_value,
-                "end_value": end_value,
-                "profit_loss": profit_loss,
-                "return_pct": return_pct
-            })
+        breakdown.append({
+            "name": inst.name,
+            "symbol": inst.symbol,
+            "start_value": start_value,
+            "end_value": end_value,
+            "profit_loss": profit_loss,
+            "return_pct": return_pct
+        })
     
     return sorted(breakdown, key=lambda x: x['return_pct'], reverse=True)
 
 
-def get_brokerage_breakdown(db: Session, start: date, end: date):
+async def get_brokerage_breakdown(db: AsyncSession, start: date, end: date):
     """Get per-brokerage breakdown for the period."""
-    # Group snapshots by brokerage
-    brokerages = db.query(Instrument.brokerage).distinct().all()
+    brokerage_of = dict((await db.execute(
+        select(Instrument.id, Instrument.brokerage).where(Instrument.brokerage.isnot(None))
+    )).all())
+    snapshots = await asyncio.to_thread(snapshot_archive.load, start, end, ("instrument_id", "value_krw"))
+    snapshots["brokerage"] = snapshots["instrument_id"].map(brokerage_of)
+    snapshots = snapshots.dropna(subset=["brokerage"])
+
+    # Brokerage value on its first and last snapshot date in the period
+    daily_totals = snapshots.groupby(["brokerage", "date"])["value_krw"].sum()
     breakdown = []
     
-    for (brokerage,) in brokerages:
-        if not brokerage:
-            continue
-            
-        # Get all instruments for this brokerage
-        inst_ids = [i.id for i in db.query(Instrument).filter(Instrument.brokerage == brokerage).all()]
-        
-        # Sum up start and end values
-        start_value = sum([
-            snap.value_krw for snap in db.query(DailyPortfolioSnapshot).filter(
-                DailyPortfolioSnapshot.instrument_id.in_(inst_ids),
-                DailyPortfolioSnapshot.date >= start
-            ).order_by(DailyPortfolioSnapshot.date).limit(len(inst_ids)).all()
-        ])
-        
-        end_value = sum([
-            snap.value_krw for snap in db.query(DailyPortfolioSnapshot).filter(
-                DailyPortfolioSnapshot.instrument_id.in_(inst_ids),
-                DailyPortfolioSnapshot.date <= end
-            ).order_by(DailyPortfolioSnapshot.date.desc()).limit(len(inst_ids)).all()
-        ])
+    for brokerage, totals in daily_totals.groupby(level="brokerage"):
+        start_value = float(totals.iloc[0])
+        end_value = float(totals.iloc[-1])
         
         if start_value > 0:
             profit_loss = end_value - start_value
@@ -310,13 +393,13 @@ def get_brokerage_breakdown(db: Session, start: date, end: date):
 
 
 @router.get("/period")
-def get_period_returns(
+async def get_period_returns(
     period: str = Query("1M", description="Period: 1D, 1W, 1M, 3M, YTD, 1Y, custom"),
     start_date: Optional[str] = Query(None, description="Start date for custom period (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date for custom period (YYYY-MM-DD)"),
     group_by: str = Query("total", description="Group by: total, instrument, brokerage"),
     benchmark: str = Query("both", description="Benchmark: kospi, sp500, both, none"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get period returns with benchmark comparison.
@@ -334,9 +417,9 @@ def get_period_returns(
         raise HTTPException(status_code=400, detail=str(e))
     
     # Get daily summary for total portfolio
-    summaries = db.query(DailySummary).filter(
-        DailySummary.date.between(start, end)
-    ).order_by(DailySummary.date).all()
+    summaries = (await db.execute(
+        select(DailySummary).where(DailySummary.date.between(start, end)).order_by(DailySummary.date)
+    )).scalars().all()
     
     if not summaries:
         raise HTTPException(status_code=404, detail="No data available for the specified period")
@@ -388,9 +471,9 @@ def get_period_returns(
     
     # Add breakdown if requested
     if group_by == "instrument":
-        response["breakdown"] = get_instrument_breakdown(db, start, end)
+        response["breakdown"] = await get_instrument_breakdown(db, start, end)
     elif group_by == "brokerage":
-        response["breakdown"] = get_brokerage_breakdown(db, start, end)
+        response["breakdown"] = await get_brokerage_breakdown(db, start, end)
     
     # Build daily series for charting
     daily_series = []
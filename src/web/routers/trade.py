@@ -19,7 +19,7 @@ async def place_order(req: OrderRequest):
     """
     atype = AssetType.STOCK_DOMESTIC if req.asset_type == "DOMESTIC" else AssetType.STOCK_OVERSEAS
     
-    success, msg = executor.execute_order(
+    success, msg = await executor.execute_order_async(
         asset_type=atype,
         symbol=req.symbol,
         side=req.side,
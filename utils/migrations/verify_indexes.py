@@ -0,0 +1,104 @@
+"""
+Check that the hot snapshot queries use the indexes from src/database/migrations.py.
+
+Runs EXPLAIN QUERY PLAN for the returns breakdown queries and exits non-zero
+if one of them doesn't use its expected index.
+
+Run from project root:
+    python utils/migrations/verify_indexes.py            # data/assets.db
+    python utils/migrations/verify_indexes.py --fresh    # new temp database
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from src.database.engine import Base, make_engine, DB_URL
+from src.database.migrations import migrate, get_schema_version, LATEST_VERSION
+from src.database.models import DailyPortfolioSnapshot, Instrument
+
+START = datetime.date(2024, 1, 1)
+END = datetime.date(2024, 12, 31)
+
+
+def hot_queries(db):
+    """(name, query, index the plan must use) for the SQLite side of the returns breakdowns."""
+    snapshot_range = select(
+        DailyPortfolioSnapshot.date, DailyPortfolioSnapshot.instrument_id, DailyPortfolioSnapshot.value_krw
+    ).where(DailyPortfolioSnapshot.date.between(START, END))
+    return [
+        # SnapshotArchive.load for months that aren't archived yet
+        ("snapshot date range", snapshot_range, "INDEX ix_daily_portfolio_snapshot_date"),
+        ("instrument date range",
+         snapshot_range.where(DailyPortfolioSnapshot.instrument_id.in_([1, 2, 3])),
+         "COVERING INDEX ix_snapshot_instrument_date"),
+        ("instrument first value",
+         db.query(DailyPortfolioSnapshot.value_krw).filter(
+             DailyPortfolioSnapshot.instrument_id == 1,
+             DailyPortfolioSnapshot.date >= START
+         ).order_by(DailyPortfolioSnapshot.date).limit(1),
+         "COVERING INDEX ix_snapshot_instrument_date"),
+        ("brokerage instruments",
+         db.query(Instrument.id, Instrument.brokerage).filter(Instrument.brokerage.isnot(None)),
+         "COVERING INDEX ix_instruments_brokerage"),
+        ("distinct brokerages",
+         db.query(Instrument.brokerage).distinct(),
+         "COVERING INDEX ix_instruments_brokerage"),
+    ]
+
+
+def explain(db, query):
+    statement = getattr(query, "statement", query)
+    sql = str(statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def verify(url):
+    engine = make_engine(url)
+    db = sessionmaker(bind=engine)()
+    version = get_schema_version(db.connection())
+    print(f"Database: {url} (schema v{version}, latest v{LATEST_VERSION})")
+
+    failures = 0
+    for name, query, expected in hot_queries(db):
+        plan = explain(db, query)
+        ok = any(expected in step for step in plan)
+        failures += not ok
+        print(f"  [{'OK' if ok else 'FAIL'}] {name}: {' | '.join(plan)}")
+
+    db.close()
+    engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify query plans of the hot snapshot queries")
+    parser.add_argument("--fresh", action="store_true", help="Check a new temp database built by create_all + migrate")
+    args = parser.parse_args()
+
+    if args.fresh:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'verify.db')}"
+            engine = make_engine(url)
+            Base.metadata.create_all(bind=engine)
+            migrate(engine)
+            engine.dispose()
+            failures = verify(url)
+    else:
+        failures = verify(DB_URL)
+
+    if failures:
+        print(f"[FAIL] {failures} queries don't use their index; run `python -m src.database.migrations`")
+        sys.exit(1)
+    print("[OK] All hot queries use their indexes")
+
+
+if __name__ == "__main__":
+    main()